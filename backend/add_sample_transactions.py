@@ -4,7 +4,7 @@ Script to add sample transactions for testing the mobile app.
 """
 
 from app.database import SessionLocal
-from app import models, user_crud
+from app import models, summary_crud, user_crud
 from datetime import datetime, timedelta
 import random
 
@@ -64,6 +64,8 @@ def add_sample_transactions():
                 user_id=user.id
             )
             db.add(expense)
+            # /summary/{year}/{month} only reads the stored monthly totals
+            summary_crud.apply_summary_delta(db, user.id, expense_date, expense_delta=expense.amount)
         
         # Add incomes with random dates in the last 30 days
         for income_data in incomes:
@@ -78,6 +80,7 @@ def add_sample_transactions():
                 user_id=user.id
             )
             db.add(income)
+            summary_crud.apply_summary_delta(db, user.id, income_date, income_delta=income.amount)
         
         db.commit()
         print(f"✅ Added {len(expenses)} expenses and {len(incomes)} incomes for demo user!")
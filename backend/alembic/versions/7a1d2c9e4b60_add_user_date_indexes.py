@@ -0,0 +1,30 @@
+"""add (user_id, date) indexes to expenses and incomes
+
+Revision ID: 7a1d2c9e4b60
+Revises: 642c70981ca1
+Create Date: 2026-10-19 09:12:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1d2c9e4b60'
+down_revision: Union[str, Sequence[str], None] = '642c70981ca1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_expenses_user_id_date', 'expenses', ['user_id', 'date'], unique=False)
+    op.create_index('ix_incomes_user_id_income_date', 'incomes', ['user_id', 'income_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incomes_user_id_income_date', table_name='incomes')
+    op.drop_index('ix_expenses_user_id_date', table_name='expenses')
@@ -0,0 +1,67 @@
+"""unique (user_id, year, month) on monthly_summaries and backfill totals
+
+Revision ID: b84e0f3a9c21
+Revises: 7a1d2c9e4b60
+Create Date: 2026-10-19 11:40:05.532817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84e0f3a9c21'
+down_revision: Union[str, Sequence[str], None] = '7a1d2c9e4b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+monthly_summaries = sa.table(
+    'monthly_summaries',
+    sa.column('user_id', sa.Integer),
+    sa.column('year', sa.Integer),
+    sa.column('month', sa.Integer),
+    sa.column('total_income', sa.Float),
+    sa.column('total_expenses', sa.Float),
+)
+expenses = sa.table('expenses', sa.column('user_id'), sa.column('date'), sa.column('amount'))
+incomes = sa.table('incomes', sa.column('user_id'), sa.column('income_date'), sa.column('amount'))
+
+
+def _monthly_totals(bind, table, date_column):
+    year = sa.extract('year', date_column)
+    month = sa.extract('month', date_column)
+    query = sa.select(table.c.user_id, year, month, sa.func.sum(table.c.amount)).group_by(table.c.user_id, year, month)
+    return {(user_id, int(y), int(m)): total or 0.0 for user_id, y, m, total in bind.execute(query)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # The old rows were a recompute-on-read cache and may contain duplicates;
+    # rebuild them from the source tables so the incremental totals start correct.
+    op.execute(monthly_summaries.delete())
+    op.create_index('uq_monthly_summaries_user_year_month', 'monthly_summaries', ['user_id', 'year', 'month'], unique=True)
+
+    expense_totals = _monthly_totals(bind, expenses, expenses.c.date)
+    income_totals = _monthly_totals(bind, incomes, incomes.c.income_date)
+    rows = [
+        {
+            'user_id': user_id,
+            'year': year,
+            'month': month,
+            'total_income': income_totals.get((user_id, year, month), 0.0),
+            'total_expenses': expense_totals.get((user_id, year, month), 0.0),
+        }
+        for user_id, year, month in sorted(set(expense_totals) | set(income_totals))
+    ]
+    if rows:
+        op.bulk_insert(monthly_summaries, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_monthly_summaries_user_year_month', table_name='monthly_summaries')
@@ -0,0 +1,52 @@
+"""add full-text search indexes to expenses and incomes
+
+Revision ID: c5e2a7d19f03
+Revises: b84e0f3a9c21
+Create Date: 2026-10-19 13:05:27.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.app.text_search import (
+    MYSQL_DIALECTS, SQLITE_TRIGRAM_AVAILABLE, mysql_fulltext_ddl, mysql_fulltext_index_name, sqlite_fts_ddl
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e2a7d19f03'
+down_revision: Union[str, Sequence[str], None] = 'b84e0f3a9c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('expenses', 'incomes')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Same DDL as create_all() runs through the events in models.py
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect in MYSQL_DIALECTS:
+            op.execute(mysql_fulltext_ddl(table))
+        elif dialect == 'sqlite' and SQLITE_TRIGRAM_AVAILABLE:
+            for statement in sqlite_fts_ddl(table):
+                op.execute(statement)
+            # Index the rows that already exist
+            fts = f"{table}_fts"
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for table in reversed(TABLES):
+        if dialect in MYSQL_DIALECTS:
+            op.drop_index(mysql_fulltext_index_name(table), table_name=table)
+        elif dialect == 'sqlite':
+            fts = f"{table}_fts"
+            for suffix in ('au', 'ad', 'ai'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
@@ -0,0 +1,39 @@
+"""add insight_documents table for precomputed smart insights
+
+Revision ID: e4a9c3f1b782
+Revises: d81f4b6e2a57
+Create Date: 2026-10-19 18:41:27.305114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c3f1b782'
+down_revision: Union[str, Sequence[str], None] = 'd81f4b6e2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('insight_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document', sa.Text(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_insight_documents_id'), 'insight_documents', ['id'], unique=False)
+    op.create_index('uq_insight_documents_user_id', 'insight_documents', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_insight_documents_user_id', table_name='insight_documents')
+    op.drop_index(op.f('ix_insight_documents_id'), table_name='insight_documents')
+    op.drop_table('insight_documents')
@@ -0,0 +1,103 @@
+import io
+
+from .database import SessionLocal
+
+# pyarrow is only needed for the Parquet/Arrow export formats
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Rows per Parquet row group / Arrow record batch, also the server-side cursor batch size
+ROW_GROUP_SIZE = 65536
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    # The IPC stream format, unlike the file format, allows each batch its own category dictionary
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def transaction_schema():
+    return pa.schema([
+        ("date", pa.timestamp("us")),
+        ("type", pa.dictionary(pa.int8(), pa.string())),
+        ("category", pa.dictionary(pa.int32(), pa.string())),
+        ("description", pa.string()),
+        ("amount", pa.float64()),
+        ("id", pa.int64()),
+    ])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _record_batch(rows, schema):
+    return pa.record_batch([
+        pa.array([row["date"] for row in rows], schema.field("date").type),
+        pa.array([row["type"] for row in rows], pa.string()).dictionary_encode().cast(schema.field("type").type),
+        pa.array([row["category"] for row in rows], pa.string()).dictionary_encode().cast(schema.field("category").type),
+        pa.array([row["description"] for row in rows], pa.string()),
+        pa.array([row["amount"] for row in rows], pa.float64()),
+        pa.array([row["id"] for row in rows], pa.int64()),
+    ], schema=schema)
+
+
+def stream_transactions(statement, export_format: str, session_factory=SessionLocal):
+    """
+    Runs a crud.transactions_statement() on its own session and yields the file as
+    Parquet or an Arrow IPC stream, one row group of ROW_GROUP_SIZE rows at a time,
+    so neither the rows nor the file are ever held in memory whole.
+    """
+    schema = transaction_schema()
+    sink = _ChunkSink()
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    db = session_factory()
+    try:
+        try:
+            result = db.execute(
+                statement,
+                execution_options={"stream_results": True, "yield_per": ROW_GROUP_SIZE}
+            ).mappings()
+            for rows in result.partitions():
+                batch = _record_batch(rows, schema)
+                if export_format == "parquet":
+                    writer.write_table(pa.Table.from_batches([batch]), row_group_size=ROW_GROUP_SIZE)
+                else:
+                    writer.write_batch(batch)
+                yield sink.drain()
+        finally:
+            # Also releases the writer when the client disconnects mid-download
+            writer.close()
+    finally:
+        db.close()
+    yield sink.drain()
@@ -0,0 +1,178 @@
+"""
+AsyncSession versions of the user, summary, budget and goal CRUD functions, for
+routes that run on the event loop. They mirror user_crud.py, summary_crud.py,
+budget_crud.py and goal_crud.py; anything else runs its sync function through
+run_sync(), which executes it on the async connection without a worker thread.
+"""
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import auth_cache, models, schemas
+from .password_hashing import password_hasher
+from .response_cache import response_cache
+
+
+async def run_sync(db: AsyncSession, fn, *args, **kwargs):
+    """Calls a sync CRUD function fn(session, *args, **kwargs) on an AsyncSession."""
+    return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+
+
+# --- Users ---
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    # bcrypt is CPU-bound; keep it off the event loop
+    hashed_password = await password_hasher.hash(user.password)
+    db_user = models.User(
+        email=user.email,
+        hashed_password=hashed_password,
+        full_name=user.full_name
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def update_user_email(db: AsyncSession, user_id: int, new_email: str):
+    db_user = await get_user(db, user_id)
+    if db_user:
+        old_email = db_user.email
+        db_user.email = new_email
+        await db.commit()
+        await db.refresh(db_user)
+        auth_cache.forget(old_email)
+    return db_user
+
+async def update_user_password(db: AsyncSession, user_id: int, new_password: str):
+    db_user = await get_user(db, user_id)
+    if db_user:
+        db_user.hashed_password = await password_hasher.hash(new_password)
+        await db.commit()
+        await db.refresh(db_user)
+        auth_cache.forget(db_user.email)
+    return db_user
+
+async def upgrade_password_hash(db: AsyncSession, db_user: models.User, new_hash: str):
+    """Stores a rehash of the password the user just logged in with."""
+    db_user.hashed_password = new_hash
+    await db.commit()
+
+
+# --- Summaries ---
+
+async def get_monthly_summary(db: AsyncSession, user_id: int, year: int, month: int):
+    """See summary_crud.get_monthly_summary."""
+    result = await db.execute(select(models.MonthlySummary).where(
+        models.MonthlySummary.user_id == user_id,
+        models.MonthlySummary.year == year,
+        models.MonthlySummary.month == month
+    ))
+    summary = result.scalars().first()
+    if summary is None:
+        summary = models.MonthlySummary(
+            year=year,
+            month=month,
+            total_income=0.0,
+            total_expenses=0.0,
+            user_id=user_id
+        )
+    return summary
+
+async def get_running_balance(db: AsyncSession, user_id: int):
+    """See summary_crud.get_running_balance."""
+    total_income = (await db.execute(
+        select(func.sum(models.Income.amount)).where(models.Income.user_id == user_id)
+    )).scalar() or 0.0
+    total_expenses = (await db.execute(
+        select(func.sum(models.Expense.amount)).where(models.Expense.user_id == user_id)
+    )).scalar() or 0.0
+    return total_income - total_expenses
+
+
+# --- Budgets ---
+
+async def create_or_update_budget(db: AsyncSession, budget: schemas.BudgetCreate, user_id: int):
+    result = await db.execute(select(models.Budget).where(
+        models.Budget.user_id == user_id,
+        models.Budget.category == budget.category,
+        models.Budget.year == budget.year,
+        models.Budget.month == budget.month
+    ))
+    db_budget = result.scalars().first()
+
+    if db_budget:
+        db_budget.amount = budget.amount
+    else:
+        db_budget = models.Budget(**budget.dict(), user_id=user_id)
+        db.add(db_budget)
+
+    await db.commit()
+    await db.refresh(db_budget)
+    response_cache.bump(user_id)
+    return db_budget
+
+async def get_budgets_for_month(db: AsyncSession, user_id: int, year: int, month: int):
+    result = await db.execute(select(models.Budget).where(
+        models.Budget.user_id == user_id,
+        models.Budget.year == year,
+        models.Budget.month == month
+    ))
+    return result.scalars().all()
+
+async def delete_budget(db: AsyncSession, budget_id: int, user_id: int):
+    result = await db.execute(select(models.Budget).where(
+        models.Budget.id == budget_id,
+        models.Budget.user_id == user_id
+    ))
+    db_budget = result.scalars().first()
+    if db_budget:
+        await db.delete(db_budget)
+        await db.commit()
+        response_cache.bump(user_id)
+    return db_budget
+
+
+# --- Goals ---
+
+async def create_goal(db: AsyncSession, goal: schemas.GoalCreate, user_id: int):
+    db_goal = models.Goal(**goal.dict(), user_id=user_id)
+    db.add(db_goal)
+    await db.commit()
+    await db.refresh(db_goal)
+    response_cache.bump(user_id)
+    return db_goal
+
+async def get_goals(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.Goal).where(models.Goal.user_id == user_id))
+    return result.scalars().all()
+
+async def _get_goal(db: AsyncSession, goal_id: int, user_id: int):
+    result = await db.execute(select(models.Goal).where(
+        models.Goal.id == goal_id,
+        models.Goal.user_id == user_id
+    ))
+    return result.scalars().first()
+
+async def update_goal_progress(db: AsyncSession, goal_id: int, user_id: int, amount: float):
+    db_goal = await _get_goal(db, goal_id, user_id)
+    if db_goal:
+        db_goal.current_amount += amount
+        await db.commit()
+        await db.refresh(db_goal)
+        response_cache.bump(user_id)
+    return db_goal
+
+async def delete_goal(db: AsyncSession, goal_id: int, user_id: int):
+    db_goal = await _get_goal(db, goal_id, user_id)
+    if db_goal:
+        await db.delete(db_goal)
+        await db.commit()
+        response_cache.bump(user_id)
+    return db_goal
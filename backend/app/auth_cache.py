@@ -0,0 +1,51 @@
+"""
+Caches behind get_current_user, so an authenticated request costs two dictionary
+lookups instead of a JWT verification and a user query.
+
+Verified tokens are kept until they expire. Principals (schemas.User, no password
+hash) are kept by token subject for AUTH_CACHE_TTL_SECONDS and dropped by
+forget() when the user's email or password changes.
+"""
+
+import time
+
+from jose import jwt
+
+from . import schemas, security
+from .cache import TTLCache
+from .config import AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES
+
+_subjects = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=security.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_principals = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL_SECONDS)
+
+
+def token_subject(token: str) -> str | None:
+    """The verified "sub" of an access token; raises JWTError for a bad or expired one."""
+    subject = _subjects.get(token)
+    if subject is not None:
+        return subject
+    payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+    subject = payload.get("sub")
+    expires_in = payload.get("exp", 0) - time.time()
+    if subject is not None and expires_in > 0:
+        _subjects.set(token, subject, ttl=expires_in)
+    return subject
+
+
+def get_principal(email: str) -> schemas.User | None:
+    return _principals.get(email)
+
+
+def remember(user) -> schemas.User:
+    principal = schemas.User.from_orm(user)
+    _principals.set(principal.email, principal)
+    return principal
+
+
+def forget(email: str):
+    _principals.pop(email)
+
+
+def clear():
+    _subjects.clear()
+    _principals.clear()
@@ -0,0 +1,138 @@
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import crud, models, schemas
+from .category_memory import category_memory
+from .semantic_index import semantic_index
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_OPERATIONS = 500
+MAX_KEY_LENGTH = 100
+# Offline queues are replayed within days; older keys are dropped on the next batch
+IDEMPOTENCY_KEY_TTL = timedelta(days=7)
+
+
+def _validate(operation: schemas.ExpenseOperation):
+    if not operation.idempotency_key or len(operation.idempotency_key) > MAX_KEY_LENGTH:
+        return f"idempotency_key must be 1-{MAX_KEY_LENGTH} characters"
+    if operation.op not in ("create", "update", "delete"):
+        return f"Unknown op: {operation.op}"
+    if operation.op in ("update", "delete") and operation.id is None:
+        return f"{operation.op} needs an id"
+    if operation.op in ("create", "update") and operation.expense is None:
+        return f"{operation.op} needs an expense"
+    return None
+
+
+def _apply(db: Session, operation: schemas.ExpenseOperation, user_id: int):
+    """Runs one operation without committing. Returns (status, expense or None)."""
+    if operation.op == "create":
+        return "created", crud._add_expense(db, operation.expense, user_id)
+    if operation.op == "update":
+        db_expense = crud._change_expense(db, operation.id, operation.expense, user_id)
+        return ("updated", db_expense) if db_expense else ("not_found", None)
+    db_expense = crud._remove_expense(db, operation.id, user_id)
+    return ("deleted", db_expense) if db_expense else ("not_found", None)
+
+
+def _is_key_conflict(error: IntegrityError) -> bool:
+    """
+    Whether `error` is the unique (user_id, key) index of idempotency_keys. SQLite
+    names the conflicting columns, MySQL and PostgreSQL the index.
+    """
+    message = str(error.orig)
+    return "uq_idempotency_keys_user_key" in message or "idempotency_keys.key" in message
+
+
+def apply_expense_batch(db: Session, user_id: int, operations: list) -> list:
+    """
+    Applies create/update/delete operations in one transaction, each in its own
+    savepoint so one failing item does not undo the others. An operation's outcome
+    is stored under its idempotency key in the same savepoint, so a key is recorded
+    exactly when its change is: a retried key is reported again, never re-applied.
+    Returns one schemas.ExpenseBatchItem per operation, in order.
+    """
+    keys = {operation.idempotency_key for operation in operations}
+    stored = {
+        row.key: json.loads(row.result)
+        for row in db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key.in_(keys)
+        )
+    }
+
+    outcomes = []  # (operation, status, expense_id, replayed, detail)
+    deleted_descriptions = {}  # expense_id -> description, for the category memory
+    for operation in operations:
+        error = _validate(operation)
+        if error:
+            outcomes.append((operation, "invalid", None, False, error))
+            continue
+        if operation.idempotency_key in stored:
+            previous = stored[operation.idempotency_key]
+            outcomes.append((operation, previous["status"], previous["expense_id"], True, None))
+            continue
+
+        savepoint = db.begin_nested()
+        try:
+            status, db_expense = _apply(db, operation, user_id)
+            result = {"op": operation.op, "status": status, "expense_id": db_expense.id if db_expense else operation.id}
+            db.add(models.IdempotencyKey(user_id=user_id, key=operation.idempotency_key, result=json.dumps(result)))
+            savepoint.commit()
+        except IntegrityError as e:
+            savepoint.rollback()
+            if _is_key_conflict(e):
+                # The same key was applied concurrently by another request
+                outcomes.append((operation, "failed", None, False, "Operation is already being applied"))
+            else:
+                logger.info("Batch %s of user %s violates a constraint: %s", operation.op, user_id, e.orig)
+                outcomes.append((operation, "invalid", None, False, "Expense was rejected by the database"))
+            continue
+        except SQLAlchemyError:
+            # Driver messages can expose SQL and schema details; the client gets a fixed one
+            savepoint.rollback()
+            logger.exception("Batch %s of user %s failed", operation.op, user_id)
+            outcomes.append((operation, "failed", None, False, "Could not apply operation"))
+            continue
+        if status == "deleted":
+            deleted_descriptions[result["expense_id"]] = db_expense.description
+        stored[operation.idempotency_key] = result
+        outcomes.append((operation, status, result["expense_id"], False, None))
+
+    db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.created_at < datetime.now() - IDEMPOTENCY_KEY_TTL
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    expense_ids = [expense_id for _, status, expense_id, _, _ in outcomes if status in ("created", "updated")]
+    expenses = {expense.id: expense for expense in crud.get_expenses_by_ids(db, user_id, expense_ids)}
+    saved = []
+    items = []
+    for operation, status, expense_id, replayed, detail in outcomes:
+        db_expense = expenses.get(expense_id) if status in ("created", "updated") else None
+        if not replayed and db_expense is not None:
+            saved.append(db_expense)
+        elif not replayed and status == "deleted":
+            category_memory.forget(user_id, deleted_descriptions[expense_id])
+            semantic_index.enqueue_delete(user_id, expense_id)
+        items.append(schemas.ExpenseBatchItem(
+            idempotency_key=operation.idempotency_key,
+            op=operation.op,
+            status=status,
+            replayed=replayed,
+            expense=schemas.Expense.from_orm(db_expense) if db_expense is not None else None,
+            detail=detail
+        ))
+    # One version bump for the whole batch, deletes included
+    if saved:
+        crud._expenses_saved(user_id, saved)
+    elif deleted_descriptions:
+        response_cache.bump(user_id)
+    return items
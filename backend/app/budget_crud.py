@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .response_cache import response_cache
 
 def create_or_update_budget(db: Session, budget: schemas.BudgetCreate, user_id: int):
     # Check if a budget for this category/month already exists
@@ -20,6 +21,7 @@ def create_or_update_budget(db: Session, budget: schemas.BudgetCreate, user_id:
         
     db.commit()
     db.refresh(db_budget)
+    response_cache.bump(user_id)
     return db_budget
 
 def get_budgets_for_month(db: Session, user_id: int, year: int, month: int):
@@ -38,5 +40,6 @@ def delete_budget(db: Session, budget_id: int, user_id: int):
     if db_budget:
         db.delete(db_budget)
         db.commit()
+        response_cache.bump(user_id)
         return db_budget
     return None
\ No newline at end of file
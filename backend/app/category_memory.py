@@ -0,0 +1,158 @@
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import TTLCache
+
+# Words that carry the amount rather than what the money was spent on
+_AMOUNT_WORDS = re.compile(r"\b(rs|rupees?|dollars?|usd|pkr|inr|bucks|for|of|paid|spent|spend)\b")
+_NON_WORD = re.compile(r"[^a-z&\s]+")
+_SPACES = re.compile(r"\s+")
+
+# Cosine similarity required before a nearest neighbour is trusted over the model
+EMBEDDING_MATCH_THRESHOLD = 0.92
+
+
+def normalize_description(text: str) -> str:
+    """
+    Reduces a description to a lookup key: lower case, no numbers, no currency
+    words, single spaces. "Lunch at KFC 500 rupees" and "lunch at kfc for 650"
+    both become "lunch at kfc".
+    """
+    text = (text or "").lower()
+    text = _NON_WORD.sub(" ", text)
+    text = _AMOUNT_WORDS.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class _UserIndex:
+    def __init__(self):
+        self.categories = {}  # normalized key -> category
+        self.keys = []  # keys in the same order as the rows of `vectors`
+        self.vectors = None
+
+
+class CategoryMemory:
+    """
+    Per-user description -> category index built from the user's own expense
+    history. Repeat phrases are answered with the category the user last chose
+    (including corrections made through PUT /expenses/{id}), so the transformer
+    only runs for phrases the user has never entered before.
+
+    An optional `embedder` (list of texts -> unit-normalized numpy matrix) enables a
+    nearest-neighbour fallback for phrases that differ slightly from a known one.
+    """
+
+    def __init__(self, max_users: int = 2000, ttl: float = 3600.0, embedder: Optional[Callable] = None):
+        self._indexes = TTLCache(maxsize=max_users, ttl=ttl)
+        # One lock per user being built, so a cold start only blocks that user's lookups
+        self._build_locks = {}
+        self._build_locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.embedder = embedder
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+
+    def _build(self, db: Session, user_id: int) -> _UserIndex:
+        index = _UserIndex()
+        rows = db.query(models.Expense.description, models.Expense.category).filter(
+            models.Expense.user_id == user_id
+        ).order_by(models.Expense.id).all()
+        for description, category in rows:
+            key = normalize_description(description)
+            if key:
+                index.categories[key] = category  # later rows win
+        if self.embedder is not None and index.categories:
+            index.keys = list(index.categories)
+            index.vectors = self.embedder(index.keys)
+        return index
+
+    def _get_index(self, db: Session, user_id: int) -> _UserIndex:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            return index
+        with self._build_locks_guard:
+            lock = self._build_locks.setdefault(user_id, threading.Lock())
+        try:
+            with lock:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    index = self._build(db, user_id)
+                    self._indexes.set(user_id, index)
+        finally:
+            # Callers still waiting on this lock find the index cached once they get it
+            with self._build_locks_guard:
+                if self._build_locks.get(user_id) is lock:
+                    del self._build_locks[user_id]
+        return index
+
+    def lookup(self, db: Session, user_id: int, text: str) -> Optional[str]:
+        """Returns the user's own category for this phrase, or None on a miss."""
+        category = None
+        key = normalize_description(text)
+        index = self._get_index(db, user_id) if key else None
+        # Timed after the (one-off, per user) index build so the stat reflects lookups only
+        start = time.perf_counter()
+        if index is not None:
+            category = index.categories.get(key)
+            if category is None and index.vectors is not None and len(index.keys):
+                query = self.embedder([key])[0]
+                scores = index.vectors @ query
+                best = int(scores.argmax())
+                if scores[best] >= EMBEDDING_MATCH_THRESHOLD:
+                    category = index.categories.get(index.keys[best])
+
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.lookup_seconds += elapsed
+            if category is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return category
+
+    def remember(self, user_id: int, description: str, category: str):
+        """Records a new or corrected category. Only users already loaded are touched."""
+        index = self._indexes.get(user_id)
+        key = normalize_description(description)
+        if index is None or not key:
+            return
+        is_new = key not in index.categories
+        index.categories[key] = category
+        if is_new and index.vectors is not None:
+            # Rebuilt lazily on next use so the write path never waits on the embedder
+            self._indexes.pop(user_id)
+
+    def forget(self, user_id: int, description: str):
+        """
+        Called when an expense is deleted. Other expenses may share its phrase with an
+        older category, so the user's index is dropped and rebuilt from the remaining
+        history on next use rather than edited in place.
+        """
+        index = self._indexes.get(user_id)
+        if index is not None and normalize_description(description) in index.categories:
+            self._indexes.pop(user_id)
+
+    def forget_user(self, user_id: int):
+        self._indexes.pop(user_id)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses, lookup_seconds = self.hits, self.misses, self.lookup_seconds
+        lookups = hits + misses
+        return {
+            "users_loaded": len(self._indexes),
+            "lookups": lookups,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+            "avg_lookup_us": (lookup_seconds / lookups * 1_000_000) if lookups else 0.0,
+        }
+
+
+category_memory = CategoryMemory()
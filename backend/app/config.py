@@ -15,4 +15,62 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL is None:
     print("Error: DATABASE_URL environment variable not found.")
     print("Please check your .env file in the project root.")
-    exit(1)
\ No newline at end of file
+    exit(1)
+
+# Where per-user semantic search indexes are stored
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(os.path.dirname(__file__), '..', 'vector_index'))
+
+# Upload limits for /process-voice-batch/; zip members are checked against their
+# declared sizes before anything is decompressed
+VOICE_BATCH_MAX_CLIPS = int(os.getenv("VOICE_BATCH_MAX_CLIPS", "50"))
+VOICE_BATCH_MAX_CLIP_BYTES = int(os.getenv("VOICE_BATCH_MAX_CLIP_BYTES", str(25 * 1024 * 1024)))
+VOICE_BATCH_MAX_TOTAL_BYTES = int(os.getenv("VOICE_BATCH_MAX_TOTAL_BYTES", str(200 * 1024 * 1024)))
+
+# Connection pool settings; unset values use the per-dialect defaults in database.py
+def _optional_int(name):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+DB_POOL_SIZE = _optional_int("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = _optional_int("DB_MAX_OVERFLOW")
+DB_POOL_TIMEOUT = _optional_int("DB_POOL_TIMEOUT")  # seconds to wait for a free connection
+DB_POOL_RECYCLE = _optional_int("DB_POOL_RECYCLE")  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING")  # "true"/"false"
+
+# Optional read replica for analytics, lists and exports; reads use the primary when unset
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL") or None
+# Replica lag above this sends reads back to the primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+# After a write, that user's reads stay on the primary for this long (read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+# Per-user response cache for the dashboard's summary and analytics endpoints. It is
+# per process: with several workers, another worker's writes show up after this TTL
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+# get_current_user caches user principals this long; other workers may see an
+# email change this much later
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Password hashing runs on its own thread pool so logins cannot starve other routes
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify calls allowed to wait for a worker; more are refused with a 503
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Login throttling, checked before any password is verified
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_IP_WINDOW_SECONDS = float(os.getenv("LOGIN_IP_WINDOW_SECONDS", "60"))
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", "5"))
+LOGIN_ACCOUNT_WINDOW_SECONDS = float(os.getenv("LOGIN_ACCOUNT_WINDOW_SECONDS", "900"))
+# Failures against one account from all IPs together, in the same window
+LOGIN_MAX_FAILURES_PER_ACCOUNT_ALL_IPS = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT_ALL_IPS", "50"))
+# Comma-separated addresses of reverse proxies whose X-Forwarded-For is trusted for
+# the client IP; empty means the connection's own address is used
+TRUSTED_PROXIES = frozenset(address.strip() for address in os.getenv("TRUSTED_PROXIES", "").split(",") if address.strip())
+
+# Shared secret for the /metrics endpoints, sent as the X-Metrics-Token header;
+# unset means they answer 404
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
@@ -1,90 +1,311 @@
 from sqlalchemy.orm import Session
 from . import models
 from . import schemas
-from sqlalchemy import func, or_
-from datetime import date, timedelta
+from . import summary_crud
+from . import text_search
+from .category_memory import category_memory
+from .semantic_index import semantic_index
+from .response_cache import response_cache
+from sqlalchemy import func, or_, and_, literal, select, union_all
+from datetime import date, datetime, time, timedelta
 from dateutil.relativedelta import relativedelta
 import calendar
+from .date_ranges import month_range
+from .pagination import encode_cursor, decode_cursor, encode_transaction_cursor, decode_transaction_cursor
 
 # User-specific CRUD functions
 def get_expenses_for_user(db: Session, user_id: int, skip: int = 0, limit: int = 100, search: str | None = None):
     query = db.query(models.Expense).filter(models.Expense.user_id == user_id)
     
+    order_by = [models.Expense.date.desc()]
     if search:
-        query = query.filter(or_(
-            models.Expense.description.ilike(f"%{search}%"),
-            models.Expense.category.ilike(f"%{search}%")
-        ))
+        query, relevance = text_search.apply_search(query, models.Expense, search)
+        if relevance is not None:
+            order_by.insert(0, relevance)
         
-    return query.order_by(models.Expense.date.desc()).offset(skip).limit(limit).all()
+    return query.order_by(*order_by).offset(skip).limit(limit).all()
 
-def create_expense_for_user(db: Session, expense: schemas.ExpenseCreate, user_id: int):
+def _keyset_page(query, date_column, id_column, limit: int, cursor: str | None):
+    """
+    One page ordered newest first by (date, id). Rows after the cursor are found with
+    a range on the (user_id, date) index, so every page costs the same as the first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(
+            date_column <= cursor_date,
+            or_(date_column < cursor_date, and_(date_column == cursor_date, id_column < cursor_id))
+        )
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), last.id)
+    return rows, next_cursor
+
+def get_expenses_page(db: Session, user_id: int, limit: int, cursor: str | None = None, search: str | None = None):
+    query = db.query(models.Expense).filter(models.Expense.user_id == user_id)
+    
+    if search:
+        # Pages stay in date order so the cursor remains valid
+        query, _ = text_search.apply_search(query, models.Expense, search, ranked=False)
+    
+    return _keyset_page(query, models.Expense.date, models.Expense.id, limit, cursor)
+
+def get_expenses_by_ids(db: Session, user_id: int, expense_ids: list[int]):
+    """Loads the given expenses, keeping the order of `expense_ids`."""
+    if not expense_ids:
+        return []
+    rows = db.query(models.Expense).filter(
+        models.Expense.user_id == user_id,
+        models.Expense.id.in_(expense_ids)
+    ).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[expense_id] for expense_id in expense_ids if expense_id in by_id]
+
+def _add_expense(db: Session, expense: schemas.ExpenseCreate, user_id: int):
+    """Inserts an expense and its summary delta without committing."""
     db_expense = models.Expense(**expense.dict(), user_id=user_id)
     db.add(db_expense)
+    db.flush()  # assigns the default date
+    summary_crud.apply_summary_delta(db, user_id, db_expense.date, expense_delta=db_expense.amount)
+    return db_expense
+
+def _expense_saved(user_id: int, db_expense):
+    """Post-commit hooks for a created or updated expense."""
+    _expenses_saved(user_id, [db_expense])
+
+def _expenses_saved(user_id: int, db_expenses: list):
+    """Post-commit hooks for expenses saved in one transaction: a single cache bump for all."""
+    response_cache.bump(user_id)
+    for db_expense in db_expenses:
+        category_memory.remember(user_id, db_expense.description, db_expense.category)
+    semantic_index.enqueue_many(user_id, [(db_expense.id, db_expense.description) for db_expense in db_expenses])
+
+def create_expense_for_user(db: Session, expense: schemas.ExpenseCreate, user_id: int):
+    db_expense = _add_expense(db, expense, user_id)
     db.commit()
     db.refresh(db_expense)
+    _expense_saved(user_id, db_expense)
     return db_expense
 
+def create_expenses_for_user(db: Session, expenses: list[schemas.ExpenseCreate], user_id: int):
+    """Inserts several expenses in a single transaction."""
+    db_expenses = [models.Expense(**expense.dict(), user_id=user_id) for expense in expenses]
+    db.add_all(db_expenses)
+    db.flush()
+    for db_expense in db_expenses:
+        summary_crud.apply_summary_delta(db, user_id, db_expense.date, expense_delta=db_expense.amount)
+    db.commit()
+    for db_expense in db_expenses:
+        db.refresh(db_expense)
+    _expenses_saved(user_id, db_expenses)
+    return db_expenses
+
+def _list_rows_statement(db: Session, model, date_column, user_id: int, skip: int, limit: int, search: str | None):
+    """
+    The rows of get_expenses_for_user/get_incomes_for_user as a Core select of just
+    the response fields, in schema order: amount, category, description, id, date.
+    """
+    stmt = select(
+        model.amount, model.category, model.description, model.id, date_column.label("date")
+    ).where(model.user_id == user_id)
+
+    order_by = [date_column.desc()]
+    if search:
+        stmt, relevance = text_search.apply_search(stmt, model, search, session=db)
+        if relevance is not None:
+            order_by.insert(0, relevance)
+
+    return stmt.order_by(*order_by).offset(skip).limit(limit)
+
+def get_expense_rows_for_user(db: Session, user_id: int, skip: int = 0, limit: int = 100, search: str | None = None):
+    """get_expenses_for_user as plain row tuples: no ORM instances or identity map."""
+    return db.execute(_list_rows_statement(db, models.Expense, models.Expense.date, user_id, skip, limit, search)).all()
+
+def get_income_rows_for_user(db: Session, user_id: int, skip: int = 0, limit: int = 100, search: str | None = None):
+    """get_incomes_for_user as plain row tuples: no ORM instances or identity map."""
+    return db.execute(_list_rows_statement(db, models.Income, models.Income.income_date, user_id, skip, limit, search)).all()
+
 def get_incomes_for_user(db: Session, user_id: int, skip: int = 0, limit: int = 100, search: str | None = None):
     query = db.query(models.Income).filter(models.Income.user_id == user_id)
     
+    order_by = [models.Income.income_date.desc()]
     if search:
-        query = query.filter(or_(
-            models.Income.description.ilike(f"%{search}%"),
-            models.Income.category.ilike(f"%{search}%")
-        ))
+        query, relevance = text_search.apply_search(query, models.Income, search)
+        if relevance is not None:
+            order_by.insert(0, relevance)
         
-    return query.order_by(models.Income.income_date.desc()).offset(skip).limit(limit).all()
+    return query.order_by(*order_by).offset(skip).limit(limit).all()
+
+def get_incomes_page(db: Session, user_id: int, limit: int, cursor: str | None = None, search: str | None = None):
+    query = db.query(models.Income).filter(models.Income.user_id == user_id)
+    
+    if search:
+        # Pages stay in date order so the cursor remains valid
+        query, _ = text_search.apply_search(query, models.Income, search, ranked=False)
+    
+    return _keyset_page(query, models.Income.income_date, models.Income.id, limit, cursor)
+
+# Merged expense/income listing
+
+TRANSACTION_TYPES = {
+    "expense": (models.Expense, models.Expense.date),
+    "income": (models.Income, models.Income.income_date),
+}
+_TYPE_ALIASES = {None: ("income", "expense"), "": ("income", "expense"), "all": ("income", "expense"),
+                 "expense": ("expense",), "expenses": ("expense",), "income": ("income",), "incomes": ("income",)}
+
+def _transaction_select(db: Session, kind: str, user_id: int, category: str | None, start_date: date | None,
+                        end_date: date | None, search: str | None, cursor: tuple | None):
+    """One arm of the UNION ALL, with every filter applied where the indexes can use it."""
+    model, date_column = TRANSACTION_TYPES[kind]
+    stmt = select(
+        literal(kind).label("type"),
+        model.id.label("id"),
+        model.amount.label("amount"),
+        model.category.label("category"),
+        model.description.label("description"),
+        date_column.label("date")
+    ).where(model.user_id == user_id)
+    
+    if category:
+        stmt = stmt.where(model.category == category)
+    if start_date:
+        stmt = stmt.where(date_column >= datetime.combine(start_date, time.min))
+    if end_date:
+        stmt = stmt.where(date_column < datetime.combine(end_date + timedelta(days=1), time.min))
+    if search:
+        stmt, _ = text_search.apply_search(stmt, model, search, ranked=False, session=db)
+    
+    if cursor:
+        # Rows come after the cursor in (date, type, id) descending order; the type is
+        # constant within an arm, so the comparison reduces to a date/id range
+        cursor_date, cursor_kind, cursor_id = cursor
+        if kind == cursor_kind:
+            stmt = stmt.where(
+                date_column <= cursor_date,
+                or_(date_column < cursor_date, and_(date_column == cursor_date, model.id < cursor_id))
+            )
+        elif kind < cursor_kind:
+            stmt = stmt.where(date_column <= cursor_date)
+        else:
+            stmt = stmt.where(date_column < cursor_date)
+    return stmt.order_by(date_column.desc(), model.id.desc())
+
+def transactions_statement(db: Session, user_id: int, transaction_type: str | None = None, category: str | None = None,
+                           start_date: date | None = None, end_date: date | None = None, search: str | None = None,
+                           cursor: str | None = None, limit: int | None = None):
+    """
+    A single UNION ALL over expenses and incomes, newest first by (date, type, id).
+    Raises ValueError for an unknown type or a bad cursor. With a limit, each arm is
+    cut to the same limit so the database only reads one page from each index range.
+    """
+    if transaction_type not in _TYPE_ALIASES:
+        raise ValueError(f"Unknown transaction type: {transaction_type}")
+    position = decode_transaction_cursor(cursor) if cursor else None
+    
+    arms = []
+    for kind in _TYPE_ALIASES[transaction_type]:
+        arm = _transaction_select(db, kind, user_id, category, start_date, end_date, search, position)
+        if limit is not None:
+            arm = arm.limit(limit)
+        # Wrapped so each arm keeps its own ORDER BY/LIMIT inside the compound select
+        arms.append(select(arm.subquery(f"{kind}_rows")))
+    
+    merged = (union_all(*arms) if len(arms) > 1 else arms[0]).subquery("transactions")
+    stmt = select(merged).order_by(merged.c.date.desc(), merged.c.type.desc(), merged.c.id.desc())
+    return stmt.limit(limit) if limit is not None else stmt
+
+def get_transactions_page(db: Session, user_id: int, limit: int, cursor: str | None = None, **filters):
+    """
+    One page of the merged transactions list. Returns (rows, next_cursor) like
+    _keyset_page; rows are mappings with type, id, amount, category, description, date.
+    """
+    rows = db.execute(
+        transactions_statement(db, user_id, cursor=cursor, limit=limit + 1, **filters)
+    ).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_transaction_cursor(last["date"], last["type"], last["id"])
+    return rows, next_cursor
 
 def create_income_for_user(db: Session, income: schemas.IncomeCreate, user_id: int):
     db_income = models.Income(**income.dict(), user_id=user_id)
     db.add(db_income)
+    db.flush()  # assigns the default income_date
+    summary_crud.apply_summary_delta(db, user_id, db_income.income_date, income_delta=db_income.amount)
     db.commit()
     db.refresh(db_income)
+    response_cache.bump(user_id)
     return db_income
 
-def delete_expense_for_user(db: Session, expense_id: int, user_id: int):
+def _remove_expense(db: Session, expense_id: int, user_id: int):
+    """Deletes an expense and reverses its summary delta without committing."""
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id, models.Expense.user_id == user_id).first()
     if db_expense:
+        summary_crud.apply_summary_delta(db, user_id, db_expense.date, expense_delta=-db_expense.amount)
         db.delete(db_expense)
+        db.flush()
+    return db_expense
+
+def delete_expense_for_user(db: Session, expense_id: int, user_id: int):
+    db_expense = _remove_expense(db, expense_id, user_id)
+    if db_expense:
+        description = db_expense.description
         db.commit()
+        response_cache.bump(user_id)
+        category_memory.forget(user_id, description)
+        semantic_index.enqueue_delete(user_id, expense_id)
     return db_expense
 
 def delete_income_for_user(db: Session, income_id: int, user_id: int):
     db_income = db.query(models.Income).filter(models.Income.id == income_id, models.Income.user_id == user_id).first()
     if db_income:
+        summary_crud.apply_summary_delta(db, user_id, db_income.income_date, income_delta=-db_income.amount)
         db.delete(db_income)
         db.commit()
+        response_cache.bump(user_id)
     return db_income
 
-def update_expense_for_user(db: Session, expense_id: int, expense: schemas.ExpenseCreate, user_id: int):
+def _change_expense(db: Session, expense_id: int, expense: schemas.ExpenseCreate, user_id: int):
+    """Updates an expense and moves its summary delta without committing."""
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id, models.Expense.user_id == user_id).first()
     if db_expense:
+        old_amount, old_date = db_expense.amount, db_expense.date
         for key, value in expense.dict().items():
             setattr(db_expense, key, value)
+        summary_crud.apply_summary_delta(db, user_id, old_date, expense_delta=-old_amount)
+        summary_crud.apply_summary_delta(db, user_id, db_expense.date, expense_delta=db_expense.amount)
+        db.flush()
+    return db_expense
+
+def update_expense_for_user(db: Session, expense_id: int, expense: schemas.ExpenseCreate, user_id: int):
+    db_expense = _change_expense(db, expense_id, expense, user_id)
+    if db_expense:
         db.commit()
         db.refresh(db_expense)
+        # A changed category is a correction the user wants reused next time
+        _expense_saved(user_id, db_expense)
     return db_expense
 
 def update_income_for_user(db: Session, income_id: int, income: schemas.IncomeCreate, user_id: int):
     db_income = db.query(models.Income).filter(models.Income.id == income_id, models.Income.user_id == user_id).first()
     if db_income:
+        old_amount, old_date = db_income.amount, db_income.income_date
         for key, value in income.dict().items():
             setattr(db_income, key, value)
+        summary_crud.apply_summary_delta(db, user_id, old_date, income_delta=-old_amount)
+        summary_crud.apply_summary_delta(db, user_id, db_income.income_date, income_delta=db_income.amount)
         db.commit()
         db.refresh(db_income)
+        response_cache.bump(user_id)
     return db_income
 
-def delete_all_expenses_for_user(db: Session, user_id: int):
-    deleted_rows = db.query(models.Expense).filter(models.Expense.user_id == user_id).delete()
-    db.commit()
-    return deleted_rows
-
-def delete_all_incomes_for_user(db: Session, user_id: int):
-    deleted_rows = db.query(models.Income).filter(models.Income.user_id == user_id).delete()
-    db.commit()
-    return deleted_rows
-
 def get_expense_forecast(db: Session, user_id: int):
     from datetime import datetime, timedelta
     from collections import defaultdict
@@ -162,17 +383,24 @@ def get_expense_forecast(db: Session, user_id: int):
 
 def delete_all_expenses_for_user(db: Session, user_id: int):
     deleted_rows = db.query(models.Expense).filter(models.Expense.user_id == user_id).delete()
+    summary_crud.reset_summary_totals(db, user_id, expenses=True)
     db.commit()
+    response_cache.bump(user_id)
+    category_memory.forget_user(user_id)
+    semantic_index.drop_user(user_id)
     return deleted_rows
 
 def delete_all_incomes_for_user(db: Session, user_id: int):
     deleted_rows = db.query(models.Income).filter(models.Income.user_id == user_id).delete()
+    summary_crud.reset_summary_totals(db, user_id, income=True)
     db.commit()
+    response_cache.bump(user_id)
     return deleted_rows
 
 def get_expenses_by_month(db: Session, user_id: int, year: int, month: int):
+    start, end = month_range(year, month)
     return db.query(models.Expense).filter(
         models.Expense.user_id == user_id,
-        func.extract('year', models.Expense.date) == year,
-        func.extract('month', models.Expense.date) == month
+        models.Expense.date >= start,
+        models.Expense.date < end
     ).all()
\ No newline at end of file
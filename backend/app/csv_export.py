@@ -0,0 +1,59 @@
+import csv
+import io
+
+from .database import SessionLocal
+
+CSV_HEADER = ["Date", "Type", "Category", "Description", "Amount"]
+# Rows fetched per round trip from the server-side cursor, and written per chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def format_amount(transaction_type: str, amount: float) -> str:
+    sign = "-" if transaction_type.lower().startswith("expense") else "+"
+    return f"{sign}${amount:.2f}"
+
+
+def csv_chunks(rows):
+    """
+    Encodes an iterable of CSV records (lists of fields) as UTF-8 chunks of up to
+    EXPORT_BATCH_SIZE rows, header first. Quoting is left to the csv module.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+
+def stream_transactions_csv(statement, session_factory=SessionLocal):
+    """
+    Runs a crud.transactions_statement() on its own session with a server-side
+    cursor and yields the CSV as it goes, so memory stays flat whatever the size.
+    The request's session may be closed before the response finishes streaming.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(
+            statement,
+            execution_options={"stream_results": True, "yield_per": EXPORT_BATCH_SIZE}
+        ).mappings()
+        yield from csv_chunks(
+            [
+                row["date"].strftime("%Y-%m-%d"),
+                row["type"].title(),
+                row["category"],
+                row["description"],
+                format_amount(row["type"], row["amount"])
+            ]
+            for row in result
+        )
+    finally:
+        db.close()
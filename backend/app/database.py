@@ -1,12 +1,83 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 # Import the pre-loaded database URL from our config file
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL, READ_REPLICA_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+from .pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
 
-engine = create_engine(DATABASE_URL)
+# Per-dialect pool defaults. MySQL closes connections idle for wait_timeout (8h by
+# default, often much less on managed servers), so they are recycled well before.
+POOL_DEFAULTS = {
+    "mysql": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True},
+    "postgresql": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 3600, "pool_pre_ping": True},
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+def engine_options(url: str) -> dict:
+    """create_engine() pool arguments: per-dialect defaults overridden by DB_POOL_* settings."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        # In-memory databases keep SQLAlchemy's single-connection pools; a file
+        # database gets the default QueuePool sizing, instrumented
+        if parsed.database in (None, "", ":memory:") or "mode=memory" in str(parsed):
+            return {}
+        return {"poolclass": InstrumentedQueuePool}
+
+    options = dict(POOL_DEFAULTS.get(backend, {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_pre_ping": True}))
+    overrides = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    if DB_POOL_PRE_PING:
+        options["pool_pre_ping"] = DB_POOL_PRE_PING.lower() in ("1", "true", "yes")
+    options["poolclass"] = InstrumentedQueuePool
+    return options
+
+
+# asyncio drivers for the async engine, by backend
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url: str):
+    """The same database, addressed through its asyncio driver."""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername))
+
+
+def async_engine_options(url: str) -> dict:
+    options = engine_options(url)
+    if options.get("poolclass") is InstrumentedQueuePool:
+        options["poolclass"] = InstrumentedAsyncAdaptedQueuePool
+    return options
+
+
+class AppSession(Session):
+    """Session class of the primary database, sync and async; read_routing.py hooks into it."""
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+pool_metrics = instrument_engine(engine)
+
+SessionLocal = sessionmaker(class_=AppSession, autocommit=False, autoflush=False, bind=engine)
+
+# Async routes use their own pool on the same database (an in-memory SQLite
+# database is not shared between the two engines, use a file for that)
+async_engine = create_async_engine(async_url(DATABASE_URL), **async_engine_options(DATABASE_URL))
+async_pool_metrics = instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, sync_session_class=AppSession, autoflush=False, expire_on_commit=False)
+
+# Read-only traffic goes through read_routing.py, which picks this or SessionLocal
+replica_engine = create_engine(READ_REPLICA_URL, **engine_options(READ_REPLICA_URL)) if READ_REPLICA_URL else None
+replica_pool_metrics = instrument_engine(replica_engine) if replica_engine is not None else None
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine or engine)
+
+Base = declarative_base()
@@ -0,0 +1,29 @@
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+
+def month_range(year: int, month: int):
+    """
+    Half-open [start, end) datetime bounds of a calendar month.
+
+    Filtering with `column >= start AND column < end` lets the database use the
+    (user_id, date) indexes, unlike EXTRACT(YEAR/MONTH FROM column) which has to
+    evaluate every row of the user.
+    """
+    start = datetime(year, month, 1)
+    return start, start + relativedelta(months=1)
+
+
+def recent_months(months: int, today=None):
+    """
+    The last `months` calendar months ending with the current one, oldest first,
+    plus the half-open [start, end) datetime range that covers all of them.
+    """
+    today = today or datetime.now()
+    current = datetime(today.year, today.month, 1)
+    first = current - relativedelta(months=max(months, 1) - 1)
+    month_list = []
+    for i in range(max(months, 0)):
+        month_start = first + relativedelta(months=i)
+        month_list.append((month_start.year, month_start.month))
+    return month_list, first, current + relativedelta(months=1)
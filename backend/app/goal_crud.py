@@ -1,11 +1,13 @@
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .response_cache import response_cache
 
 def create_goal(db: Session, goal: schemas.GoalCreate, user_id: int):
     db_goal = models.Goal(**goal.dict(), user_id=user_id)
     db.add(db_goal)
     db.commit()
     db.refresh(db_goal)
+    response_cache.bump(user_id)
     return db_goal
     
 def get_goals(db: Session, user_id: int):
@@ -21,6 +23,7 @@ def update_goal_progress(db: Session, goal_id: int, user_id: int, amount: float)
         db_goal.current_amount += amount
         db.commit()
         db.refresh(db_goal)
+        response_cache.bump(user_id)
     
     return db_goal
     
@@ -33,5 +36,6 @@ def delete_goal(db: Session, goal_id: int, user_id: int):
     if db_goal:
         db.delete(db_goal)
         db.commit()
+        response_cache.bump(user_id)
     
     return db_goal
\ No newline at end of file
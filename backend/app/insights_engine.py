@@ -0,0 +1,264 @@
+"""
+Smart insights, precomputed in the background and stored per user.
+
+Every write that bumps a user's data version (see response_cache.py) marks the
+user dirty; a background thread recomputes their document shortly after and
+stores it in insight_documents, so /insights/smart is a single-row read. A
+document is computed on the spot only when there is none yet or it was made on
+an earlier day (the insights depend on the date).
+
+Computing one uses the incrementally maintained monthly summaries and a grouped
+category query per month; no expense rows are loaded.
+"""
+
+import calendar
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import budget_crud, database, models, summary_crud
+from .date_ranges import month_range
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Writes usually come in bursts (a batch, an import, a form with several fields);
+# wait this long after the first so one recomputation covers them all
+REFRESH_DELAY_SECONDS = 0.5
+# Failed recomputations of a user before their mark is dropped; the stored document
+# stays in place and the next write or the next day recomputes it
+MAX_REFRESH_ATTEMPTS = 3
+# Wait before retrying a failed recomputation, doubled after each further failure
+REFRESH_RETRY_SECONDS = 5.0
+
+
+def _category_totals(db: Session, user_id: int, year: int, month: int) -> dict:
+    start, end = month_range(year, month)
+    rows = db.query(models.Expense.category, func.sum(models.Expense.amount)).filter(
+        models.Expense.user_id == user_id,
+        models.Expense.date >= start,
+        models.Expense.date < end
+    ).group_by(models.Expense.category).all()
+    return {category: total for category, total in rows}
+
+
+def compute_insights(db: Session, user_id: int, now: datetime | None = None) -> dict:
+    """The /insights/smart document for `user_id` as of `now`."""
+    current_date = now or datetime.now()
+    current_month = current_date.month
+    current_year = current_date.year
+    days_in_month = calendar.monthrange(current_year, current_month)[1]
+    days_passed = current_date.day
+
+    # Get previous month
+    if current_month == 1:
+        previous_month = 12
+        previous_year = current_year - 1
+    else:
+        previous_month = current_month - 1
+        previous_year = current_year
+
+    current_summary = summary_crud.get_monthly_summary(db, user_id=user_id, year=current_year, month=current_month)
+    previous_summary = summary_crud.get_monthly_summary(db, user_id=user_id, year=previous_year, month=previous_month)
+    current_categories = _category_totals(db, user_id, current_year, current_month)
+    previous_categories = _category_totals(db, user_id, previous_year, previous_month)
+    budgets = budget_crud.get_budgets_for_month(db, user_id=user_id, year=current_year, month=current_month)
+
+    insights = []
+
+    # 1. Prediction insight
+    if previous_summary.total_expenses > 0:
+        trend = (current_summary.total_expenses - previous_summary.total_expenses) / previous_summary.total_expenses
+        seasonal_factor = 1 + (0.15 * (current_month / 12))
+        prediction = current_summary.total_expenses * (1 + trend * 0.7) * seasonal_factor
+
+        insights.append({
+            "type": "prediction",
+            "title": "Next Month Forecast",
+            "message": f"Based on your spending pattern, next month's expenses are predicted to be ${prediction:.0f}",
+            "value": prediction,
+            "confidence": 0.75
+        })
+
+    # 2. Budget alerts
+    for budget in budgets:
+        spent = current_categories.get(budget.category, 0)
+        if spent > 0:
+            percentage = (spent / budget.amount) * 100
+            days_remaining = days_in_month - days_passed
+
+            if percentage >= 85:
+                insights.append({
+                    "type": "warning",
+                    "title": "Budget Alert",
+                    "message": f"You're {percentage:.0f}% through your {budget.category} budget with {days_remaining} days left this month",
+                })
+            elif percentage >= 50 and days_passed < (days_in_month * 0.5):
+                insights.append({
+                    "type": "info",
+                    "title": "Budget Watch",
+                    "message": f"You've used {percentage:.0f}% of your {budget.category} budget in the first half of the month",
+                })
+
+    # 3. Category insights
+    if current_categories:
+        top_category = max(current_categories, key=current_categories.get)
+        top_amount = current_categories[top_category]
+
+        insights.append({
+            "type": "info",
+            "title": "Top Spending Category",
+            "message": f"{top_category} is your highest spending category this month at ${top_amount:.0f}",
+        })
+
+    # 4. Savings opportunity
+    if previous_summary.total_expenses > 0 and current_summary.total_expenses > previous_summary.total_expenses:
+        increase = current_summary.total_expenses - previous_summary.total_expenses
+        insights.append({
+            "type": "warning",
+            "title": "Spending Increase",
+            "message": f"Your spending increased by ${increase:.0f} compared to last month",
+        })
+    elif previous_summary.total_expenses > 0 and current_summary.total_expenses < previous_summary.total_expenses:
+        savings = previous_summary.total_expenses - current_summary.total_expenses
+        insights.append({
+            "type": "success",
+            "title": "Great Savings!",
+            "message": f"You saved ${savings:.0f} compared to last month. Keep it up!",
+        })
+
+    return {
+        "insights": insights,
+        "current_month_total": current_summary.total_expenses,
+        "previous_month_total": previous_summary.total_expenses,
+        "category_analysis": {
+            "current": current_categories,
+            "previous": previous_categories
+        },
+        "generated_at": current_date.isoformat()
+    }
+
+
+class InsightsEngine:
+    def __init__(self, session_factory=None):
+        # Looked up at call time by default so tests can swap database.SessionLocal
+        self._session_factory = session_factory
+        self._dirty = {}  # user_id -> writes since last marked, so a mark made mid-refresh is kept
+        self._failures = {}  # user_id -> failed refreshes since the last success
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self.recomputed = 0
+        self.errors = 0
+
+    def _session(self) -> Session:
+        return (self._session_factory or database.SessionLocal)()
+
+    # --- write path ---
+
+    def mark_dirty(self, user_id: int):
+        with self._lock:
+            self._dirty[user_id] = self._dirty.get(user_id, 0) + 1
+        self._ensure_worker()
+        self._wake.set()
+
+    def is_dirty(self, user_id: int) -> bool:
+        with self._lock:
+            return user_id in self._dirty
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="insights-engine", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(REFRESH_DELAY_SECONDS)
+            self._wake.clear()
+            self.flush()
+            delay = self._retry_delay()
+            if delay is not None:
+                # Users whose refresh failed are still dirty: go again after the
+                # backoff, or sooner if a write wakes the worker first
+                self._wake.wait(delay)
+                self._wake.set()
+
+    def _retry_delay(self) -> float | None:
+        with self._lock:
+            if not self._failures:
+                return None
+            return REFRESH_RETRY_SECONDS * 2 ** (max(self._failures.values()) - 1)
+
+    def flush(self):
+        """Recomputes every dirty user's document now."""
+        with self._lock:
+            pending = dict(self._dirty)
+        for user_id, marks in pending.items():
+            db = self._session()
+            try:
+                self.refresh(db, user_id)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                    failures = self._failures[user_id] = self._failures.get(user_id, 0) + 1
+                    if failures >= MAX_REFRESH_ATTEMPTS:
+                        # Stop retrying (and reporting stale) until the user writes again
+                        self._failures.pop(user_id)
+                        if self._dirty.get(user_id) == marks:
+                            del self._dirty[user_id]
+                logger.exception("Insights refresh for user %s failed (attempt %d)", user_id, failures)
+                continue
+            finally:
+                db.close()
+            with self._lock:
+                self._failures.pop(user_id, None)
+                if self._dirty.get(user_id) == marks:
+                    del self._dirty[user_id]
+
+    def refresh(self, db: Session, user_id: int) -> models.InsightDocument:
+        """Computes and stores the user's document, committing on `db`."""
+        computed_at = datetime.now()
+        document = json.dumps(compute_insights(db, user_id, now=computed_at))
+        for attempt in range(2):
+            row = db.query(models.InsightDocument).filter(models.InsightDocument.user_id == user_id).first()
+            if row is None:
+                row = models.InsightDocument(user_id=user_id)
+                db.add(row)
+            row.document, row.computed_at = document, computed_at
+            try:
+                db.commit()
+            except IntegrityError:
+                # Inserted concurrently by the worker or another request; update that row
+                db.rollback()
+                if attempt:
+                    raise
+                continue
+            break
+        with self._lock:
+            self.recomputed += 1
+        return row
+
+    # --- read path ---
+
+    def get(self, db: Session, user_id: int) -> dict:
+        """
+        The stored document. `stale` is True while a recomputation for changes
+        already committed is pending; `generated_at` is when it was computed.
+        """
+        row = db.query(models.InsightDocument).filter(models.InsightDocument.user_id == user_id).first()
+        if row is None or row.computed_at.date() != datetime.now().date():
+            row = self.refresh(db, user_id)
+        document = json.loads(row.document)
+        document["stale"] = self.is_dirty(user_id)
+        return document
+
+
+insights_engine = InsightsEngine()
+response_cache.on_bump(insights_engine.mark_dirty)
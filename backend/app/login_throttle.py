@@ -0,0 +1,127 @@
+"""
+Login throttling, checked before a password is looked at so refused attempts cost
+no bcrypt work.
+
+Every attempt counts against the client IP (LOGIN_MAX_ATTEMPTS_PER_IP per
+LOGIN_IP_WINDOW_SECONDS), which slows credential stuffing across many accounts.
+Failed attempts also count against the account from that IP
+(LOGIN_MAX_FAILURES_PER_ACCOUNT per LOGIN_ACCOUNT_WINDOW_SECONDS); a successful
+login clears them. Keying failures on (account, IP) means someone guessing a
+password cannot lock the owner out from their own address. A looser ceiling,
+LOGIN_MAX_FAILURES_PER_ACCOUNT_ALL_IPS in the same window, caps the guesses
+against one account spread over many addresses. It is not cleared by a login,
+which says nothing about the other addresses.
+
+Behind a reverse proxy every request comes from the proxy's address, so all users
+would share one IP bucket. List the proxies in TRUSTED_PROXIES and the client
+address is taken from their X-Forwarded-For header instead.
+"""
+
+import math
+import threading
+import time
+
+from fastapi import Request
+
+from .cache import TTLCache
+from .config import (
+    LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_IP_WINDOW_SECONDS, LOGIN_MAX_FAILURES_PER_ACCOUNT, LOGIN_ACCOUNT_WINDOW_SECONDS,
+    LOGIN_MAX_FAILURES_PER_ACCOUNT_ALL_IPS, TRUSTED_PROXIES
+)
+
+
+def client_ip(request: Request, trusted_proxies=TRUSTED_PROXIES) -> str | None:
+    """
+    The address the request came from. X-Forwarded-For is only believed when the
+    connection is from a trusted proxy, and then read right to left, skipping the
+    trusted proxies, since entries further left can be set by the client.
+    """
+    peer = request.client.host if request.client else None
+    if peer not in trusted_proxies:
+        return peer
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+    for address in reversed(forwarded):
+        if address not in trusted_proxies:
+            return address
+    return peer
+
+
+class _FixedWindowCounter:
+    def __init__(self, limit: int, window: float, maxsize: int = 100000):
+        self.limit = limit
+        self.window = window
+        self._counts = TTLCache(maxsize=maxsize, ttl=window)
+        self._lock = threading.Lock()
+
+    def retry_after(self, key) -> float:
+        """Seconds until `key` may try again; 0 while it is under the limit."""
+        entry = self._counts.get(key)
+        if entry is None or entry[0] < self.limit:
+            return 0.0
+        return max(entry[1] + self.window - time.monotonic(), 0.0)
+
+    def hit(self, key):
+        with self._lock:
+            count, started_at = self._counts.get(key) or (0, time.monotonic())
+            remaining = started_at + self.window - time.monotonic()
+            self._counts.set(key, (count + 1, started_at), ttl=max(remaining, 0.001))
+
+    def reset(self, key):
+        self._counts.pop(key)
+
+
+class LoginThrottle:
+    def __init__(self):
+        self.by_ip = _FixedWindowCounter(LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_IP_WINDOW_SECONDS)
+        self.by_account = _FixedWindowCounter(LOGIN_MAX_FAILURES_PER_ACCOUNT, LOGIN_ACCOUNT_WINDOW_SECONDS)
+        self.by_account_all_ips = _FixedWindowCounter(LOGIN_MAX_FAILURES_PER_ACCOUNT_ALL_IPS, LOGIN_ACCOUNT_WINDOW_SECONDS)
+        self._lock = threading.Lock()
+        self.rejected = {"ip": 0, "account": 0, "account_all_ips": 0}
+
+    @staticmethod
+    def _account_key(email: str, ip: str | None):
+        return email.strip().lower(), ip
+
+    def check(self, email: str, ip: str | None) -> int:
+        """
+        Records an attempt and returns 0 if it may go ahead, otherwise the whole
+        seconds to wait (for a Retry-After header). Refused attempts are not counted.
+        """
+        account = self._account_key(email, ip)
+        for scope, counter, key in (
+            ("ip", self.by_ip, ip),
+            ("account", self.by_account, account),
+            ("account_all_ips", self.by_account_all_ips, account[0]),
+        ):
+            if key is None:
+                continue
+            wait = counter.retry_after(key)
+            if wait:
+                with self._lock:
+                    self.rejected[scope] += 1
+                return max(math.ceil(wait), 1)
+        if ip is not None:
+            self.by_ip.hit(ip)
+        return 0
+
+    def failed(self, email: str, ip: str | None):
+        account = self._account_key(email, ip)
+        self.by_account.hit(account)
+        self.by_account_all_ips.hit(account[0])
+
+    def succeeded(self, email: str, ip: str | None):
+        self.by_account.reset(self._account_key(email, ip))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_attempts_per_ip": self.by_ip.limit,
+                "ip_window_seconds": self.by_ip.window,
+                "max_failures_per_account": self.by_account.limit,
+                "account_window_seconds": self.by_account.window,
+                "max_failures_per_account_all_ips": self.by_account_all_ips.limit,
+                "rejected": dict(self.rejected),
+            }
+
+
+login_throttle = LoginThrottle()
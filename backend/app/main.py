@@ -1,25 +1,41 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, Response, UploadFile, File, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 import shutil
 from pathlib import Path
 from pydantic import BaseModel
 import sys
 import io
+import itertools
 from datetime import datetime
 import traceback
+import secrets
+import uuid
+import zipfile
 
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
+from jose import JWTError
 
 from fastapi.middleware.cors import CORSMiddleware
 
-from . import crud, models, schemas, user_crud, security, summary_crud, budget_crud, goal_crud
-from .database import SessionLocal, engine
+from . import crud, models, schemas, async_crud, auth_cache, security, summary_crud, batch_crud, csv_export, arrow_export, fast_json, statement_import
+from . import config, database
+from .database import SessionLocal, AsyncSessionLocal, engine
+from . import read_routing
+from .cache import TTLCache
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .category_memory import category_memory
+from .semantic_index import semantic_index
+from .response_cache import response_cache, etag_matches
+from .password_hashing import HasherBusy, password_hasher
+from .login_throttle import client_ip, login_throttle
+from .insights_engine import insights_engine
 from datetime import date
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 sys.path.append(str(Path(__file__).parent.parent))
 from services.ai_processor import ai_processor
@@ -46,37 +62,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    # get_current_user records the user on request.state; read routing pins writers by it
+    db.info["request_state"] = request.state
     try:
         yield db
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["request_state"] = request.state
+        yield db
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    # aiosqlite/aiomysql connections must be closed on the loop that opened them
+    await database.async_engine.dispose()
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    """
+    The authenticated user. Usually answered from auth_cache; on a miss the user is
+    loaded on a short-lived session that is closed before the endpoint runs, so a
+    request never holds a connection for auth next to the one its endpoint uses.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        email: str = payload.get("sub")
+        email = auth_cache.token_subject(token)
         if email is None:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
     
-    user = user_crud.get_user_by_email(db, email=token_data.email)
+    user = auth_cache.get_principal(token_data.email)
     if user is None:
-        raise credentials_exception
+        async with AsyncSessionLocal() as db:
+            db_user = await async_crud.get_user_by_email(db, email=token_data.email)
+        if db_user is None:
+            raise credentials_exception
+        user = auth_cache.remember(db_user)
+    # Lets read_routing pin this user to the primary once the request commits a write
+    request.state.user_id = user.id
     return user
 
+def get_read_db(current_user: schemas.User = Depends(get_current_user)):
+    """
+    Session for read-only endpoints: the read replica when one is configured, in
+    sync and the user has not just written; the primary otherwise.
+    """
+    db = read_routing.read_sessionmaker(current_user.id)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def conditional_get(request: Request, response: Response, current_user: schemas.User = Depends(get_current_user)):
+    """
+    ETag / If-None-Match for per-user GET endpoints. Listed in the route's
+    dependencies so it runs before the endpoint's own: an unchanged response is
+    answered with 304 without opening a read session or running its query.
+    The ETag comes from the user's data version, which is per process unless the
+    response cache is given shared storage (see response_cache.py).
+    """
+    etag = response_cache.etag(
+        current_user.id, request.url.path,
+        query=sorted(request.query_params.multi_items()), today=date.today()
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+async def get_optional_current_user(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """Like get_current_user, but anonymous callers get None instead of a 401."""
+    if not token:
+        return None
+    try:
+        return await get_current_user(request=request, token=token)
+    except HTTPException:
+        return None
+
+def _category_lookup(db: Session, user: Optional[schemas.User]):
+    """Answers repeat phrases from the user's own history before the classifier runs."""
+    if user is None:
+        return None
+    return lambda text: category_memory.lookup(db, user.id, text)
+
 class AiResponse(BaseModel):
     description: str
     category: str
     amount: float
+    result_token: Optional[str] = None
+
+class AiCommitRequest(BaseModel):
+    result_token: str
+    description: Optional[str] = None
+    category: Optional[str] = None
+    amount: Optional[float] = None
+
+# Dry-run results kept server side so a confirmed entry never goes through inference again
+DRY_RUN_RESULT_TTL_SECONDS = 600
+dry_run_results = TTLCache(maxsize=10000, ttl=DRY_RUN_RESULT_TTL_SECONDS)
+
+def _dry_run_response(expense_data: dict, user: Optional[schemas.User]) -> AiResponse:
+    """
+    The preview, with a result token only for signed-in callers: the token can only be
+    committed by the user who made the dry run, so anonymous previews get none.
+    """
+    if user is None:
+        return AiResponse(**expense_data)
+    result_token = secrets.token_urlsafe(16)
+    dry_run_results.set(result_token, (user.id, {
+        "description": expense_data["description"],
+        "category": expense_data["category"],
+        "amount": expense_data["amount"]
+    }))
+    return AiResponse(**expense_data, result_token=result_token)
+
+class TextExpenseRequest(BaseModel):
+    text: str
 
 class LoginRequest(BaseModel):
     email: str
@@ -84,23 +194,58 @@ class LoginRequest(BaseModel):
 
 # Authentication endpoints
 @app.post("/signup", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return user_crud.create_user(db=db, user=user)
+    return await async_crud.create_user(db=db, user=user)
 
 @app.post("/users/", response_model=schemas.User)
-def create_user_alt(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user_by_email(db, email=user.email)
+async def create_user_alt(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return user_crud.create_user(db=db, user=user)
+    return await async_crud.create_user(db=db, user=user)
+
+async def _authenticate(request: Request, db: AsyncSession, email: str, password: str):
+    """
+    The user if the password is right, else None. Throttled attempts are refused
+    with a 429 before the user is looked up or any bcrypt work is done.
+    """
+    ip = client_ip(request)
+    retry_after = login_throttle.check(email, ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+    user = await async_crud.get_user_by_email(db, email=email)
+    if user is None:
+        login_throttle.failed(email, ip)
+        return None
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
+        login_throttle.failed(email, ip)
+        return None
+    login_throttle.succeeded(email, ip)
+    if new_hash is not None:
+        # Hashed with a different BCRYPT_ROUNDS; store it at the current cost
+        await async_crud.upgrade_password_hash(db, user, new_hash)
+    return user
+
+@app.exception_handler(HasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many sign-ins in progress. Please try again shortly."},
+        headers={"Retry-After": "1"},
+    )
 
 @app.post("/token", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = user_crud.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await _authenticate(request, db, form_data.username, form_data.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="The email or password you entered is incorrect. Please try again.",
@@ -110,9 +255,9 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/login", response_model=schemas.Token)
-def login_json(credentials: LoginRequest, db: Session = Depends(get_db)):
-    user = user_crud.get_user_by_email(db, email=credentials.email)
-    if not user or not security.verify_password(credentials.password, user.hashed_password):
+async def login_json(request: Request, credentials: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await _authenticate(request, db, credentials.email, credentials.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="The email or password you entered is incorrect. Please try again."
@@ -122,76 +267,134 @@ def login_json(credentials: LoginRequest, db: Session = Depends(get_db)):
 
 # Protected endpoints with user-specific data
 @app.post("/expenses/", response_model=schemas.Expense)
-def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_expense_for_user(db=db, expense=expense, user_id=current_user.id)
+async def create_expense(expense: schemas.ExpenseCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    return await async_crud.run_sync(db, crud.create_expense_for_user, expense=expense, user_id=current_user.id)
+
+@app.get("/expenses/", response_model=List[schemas.Expense], dependencies=[Depends(conditional_get)])
+def read_expenses(response: Response, skip: int = 0, limit: int = 1000, search: str | None = None, db: Session = Depends(get_read_db), current_user: schemas.User = Depends(get_current_user)):
+    # Rows go straight to JSON; response_model only documents the shape
+    rows = crud.get_expense_rows_for_user(db, user_id=current_user.id, skip=skip, limit=limit, search=search)
+    return fast_json.rows_response(rows, response=response)
+
+@app.get("/expenses/page", response_model=schemas.ExpensePage, tags=["Expenses"], dependencies=[Depends(conditional_get)])
+def read_expenses_page(cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE, search: str | None = None, db: Session = Depends(get_read_db), current_user: schemas.User = Depends(get_current_user)):
+    """
+    Cursor-paginated expenses, newest first. Pass the returned `next_cursor` to get
+    the following page; it is null on the last page. Rows added meanwhile never
+    shift or repeat entries across pages.
+    """
+    try:
+        items, next_cursor = crud.get_expenses_page(
+            db, user_id=current_user.id, limit=max(1, min(limit, MAX_PAGE_SIZE)), cursor=cursor, search=search
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
 
-@app.get("/expenses/", response_model=List[schemas.Expense])
-def read_expenses(skip: int = 0, limit: int = 1000, search: str | None = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.get_expenses_for_user(db, user_id=current_user.id, skip=skip, limit=limit, search=search)
+@app.post("/expenses/batch", response_model=schemas.ExpenseBatchResult, tags=["Expenses"])
+def apply_expense_batch(batch: schemas.ExpenseBatchRequest, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    """
+    Applies a queue of create/update/delete operations in one request and one
+    transaction, e.g. changes made offline. Every operation carries a client
+    `idempotency_key`: sending the same key again (a retry after a lost response)
+    returns the original outcome with `replayed: true` instead of applying it twice.
+    """
+    if len(batch.operations) > batch_crud.MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {batch_crud.MAX_BATCH_OPERATIONS} operations per batch")
+    return {"items": batch_crud.apply_expense_batch(db, user_id=current_user.id, operations=batch.operations)}
+
+@app.get("/expenses/semantic-search", response_model=List[schemas.Expense], tags=["Expenses"])
+def semantic_search_expenses(q: str, k: int = 10, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    """
+    Finds expenses whose descriptions mean something similar to `q`
+    ("food" finds "pizza delivery"), best match first.
+    """
+    if not semantic_index.available:
+        raise HTTPException(status_code=503, detail="Semantic search is not available on this server")
+    if not q.strip():
+        return []
+    
+    try:
+        matches = semantic_index.search(db, user_id=current_user.id, query=q.strip(), k=max(1, min(k, 100)))
+    except (ImportError, FileNotFoundError):
+        raise HTTPException(status_code=503, detail="Semantic search model is not installed")
+    return crud.get_expenses_by_ids(db, user_id=current_user.id, expense_ids=[expense_id for expense_id, _ in matches])
 
 @app.post("/incomes/", response_model=schemas.Income)
-def create_income_endpoint(income: schemas.IncomeCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_income_for_user(db=db, income=income, user_id=current_user.id)
+async def create_income_endpoint(income: schemas.IncomeCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    return await async_crud.run_sync(db, crud.create_income_for_user, income=income, user_id=current_user.id)
 
-@app.get("/incomes/", response_model=List[schemas.Income])
-def read_incomes_endpoint(skip: int = 0, limit: int = 1000, search: str | None = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.get_incomes_for_user(db, user_id=current_user.id, skip=skip, limit=limit, search=search)
+@app.get("/incomes/", response_model=List[schemas.Income], dependencies=[Depends(conditional_get)])
+def read_incomes_endpoint(response: Response, skip: int = 0, limit: int = 1000, search: str | None = None, db: Session = Depends(get_read_db), current_user: schemas.User = Depends(get_current_user)):
+    # Rows go straight to JSON; response_model only documents the shape
+    rows = crud.get_income_rows_for_user(db, user_id=current_user.id, skip=skip, limit=limit, search=search)
+    return fast_json.rows_response(rows, response=response)
+
+@app.get("/incomes/page", response_model=schemas.IncomePage, dependencies=[Depends(conditional_get)])
+def read_incomes_page(cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE, search: str | None = None, db: Session = Depends(get_read_db), current_user: schemas.User = Depends(get_current_user)):
+    """Cursor-paginated incomes, newest first. See /expenses/page."""
+    try:
+        items, next_cursor = crud.get_incomes_page(
+            db, user_id=current_user.id, limit=max(1, min(limit, MAX_PAGE_SIZE)), cursor=cursor, search=search
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
 
 @app.delete("/expenses/{expense_id}", response_model=schemas.Expense)
-def delete_expense_endpoint(expense_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_expense = crud.delete_expense_for_user(db, expense_id=expense_id, user_id=current_user.id)
+async def delete_expense_endpoint(expense_id: int, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    db_expense = await async_crud.run_sync(db, crud.delete_expense_for_user, expense_id=expense_id, user_id=current_user.id)
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     return db_expense
 
 @app.delete("/incomes/{income_id}", response_model=schemas.Income)
-def delete_income_endpoint(income_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_income = crud.delete_income_for_user(db, income_id=income_id, user_id=current_user.id)
+async def delete_income_endpoint(income_id: int, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    db_income = await async_crud.run_sync(db, crud.delete_income_for_user, income_id=income_id, user_id=current_user.id)
     if db_income is None:
         raise HTTPException(status_code=404, detail="Income not found")
     return db_income
 
 @app.put("/expenses/{expense_id}", response_model=schemas.Expense)
-def update_expense_endpoint(expense_id: int, expense: schemas.ExpenseCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_expense = crud.update_expense_for_user(db, expense_id=expense_id, expense=expense, user_id=current_user.id)
+async def update_expense_endpoint(expense_id: int, expense: schemas.ExpenseCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    db_expense = await async_crud.run_sync(db, crud.update_expense_for_user, expense_id=expense_id, expense=expense, user_id=current_user.id)
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     return db_expense
 
 @app.put("/incomes/{income_id}", response_model=schemas.Income)
-def update_income_endpoint(income_id: int, income: schemas.IncomeCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_income = crud.update_income_for_user(db, income_id=income_id, income=income, user_id=current_user.id)
+async def update_income_endpoint(income_id: int, income: schemas.IncomeCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(get_current_user)):
+    db_income = await async_crud.run_sync(db, crud.update_income_for_user, income_id=income_id, income=income, user_id=current_user.id)
     if db_income is None:
         raise HTTPException(status_code=404, detail="Income not found")
     return db_income
 
 @app.delete("/transactions/all", status_code=status.HTTP_204_NO_CONTENT)
-def delete_all_transactions_endpoint(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def delete_all_transactions_endpoint(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     crud.delete_all_expenses_for_user(db, user_id=current_user.id)
     crud.delete_all_incomes_for_user(db, user_id=current_user.id)
     return {"ok": True}
 
 @app.post("/process-voice-dry-run/", response_model=AiResponse)
-async def process_voice_dry_run(file: UploadFile = File(...)):
+def process_voice_dry_run(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: Optional[schemas.User] = Depends(get_optional_current_user)):
     temp_dir = Path("temp_audio")
     temp_dir.mkdir(exist_ok=True)
     temp_file_path = temp_dir / file.filename
     
     try:
         with temp_file_path.open("wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            shutil.copyfileobj(file.file, buffer)
         
         if temp_file_path.stat().st_size == 0:
             raise HTTPException(status_code=400, detail="Empty audio file")
         
         # Process with offline AI
-        expense_data = ai_processor.process_expense_audio(str(temp_file_path))
+        expense_data = ai_processor.process_expense_audio(str(temp_file_path), _category_lookup(db, current_user))
         
         if expense_data.get("category") == "Error":
             raise HTTPException(status_code=400, detail=expense_data.get("description"))
         
-        return AiResponse(**expense_data)
+        return _dry_run_response(expense_data, current_user)
         
     except HTTPException:
         raise
@@ -202,21 +405,20 @@ async def process_voice_dry_run(file: UploadFile = File(...)):
             temp_file_path.unlink()
 
 @app.post("/process-voice/", response_model=schemas.Expense)
-async def process_voice(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def process_voice(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     temp_dir = Path("temp_audio")
     temp_dir.mkdir(exist_ok=True)
     temp_file_path = temp_dir / file.filename
     
     try:
         with temp_file_path.open("wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            shutil.copyfileobj(file.file, buffer)
         
         if temp_file_path.stat().st_size == 0:
             raise HTTPException(status_code=400, detail="Empty audio file")
         
         # Process with offline AI
-        expense_data = ai_processor.process_expense_audio(str(temp_file_path))
+        expense_data = ai_processor.process_expense_audio(str(temp_file_path), _category_lookup(db, current_user))
         
         if expense_data.get("category") == "Error" or expense_data.get("amount", 0) <= 0:
             raise HTTPException(status_code=400, detail="Could not process audio")
@@ -236,10 +438,213 @@ async def process_voice(file: UploadFile = File(...), db: Session = Depends(get_
         if temp_file_path.exists():
             temp_file_path.unlink()
 
+MAX_BATCH_CLIPS = config.VOICE_BATCH_MAX_CLIPS
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".webm", ".ogg", ".aac", ".flac", ".3gp", ".amr"}
+
+def _read_batch_clips(files: List[UploadFile]) -> list:
+    """
+    (original filename, audio bytes) for every clip in the upload. The clip count and
+    sizes are checked as the parts and zip members are enumerated, using each
+    member's declared size, so nothing over the limits is ever decompressed.
+    """
+    clips = []
+    total_bytes = 0
+
+    def add(name: str, size: int, read):
+        nonlocal total_bytes
+        if len(clips) >= MAX_BATCH_CLIPS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CLIPS} clips per batch")
+        if size > config.VOICE_BATCH_MAX_CLIP_BYTES:
+            raise HTTPException(status_code=413, detail=f"{name} is larger than {config.VOICE_BATCH_MAX_CLIP_BYTES} bytes")
+        total_bytes += size
+        if total_bytes > config.VOICE_BATCH_MAX_TOTAL_BYTES:
+            raise HTTPException(status_code=413, detail=f"Batch is larger than {config.VOICE_BATCH_MAX_TOTAL_BYTES} bytes")
+        clips.append((name, read()))
+
+    for upload in files:
+        upload.file.seek(0)
+        if upload.filename and upload.filename.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(upload.file) as archive:
+                    for member in archive.infolist():
+                        name = Path(member.filename).name
+                        if member.is_dir() or Path(name).suffix.lower() not in AUDIO_EXTENSIONS:
+                            continue
+                        # ZipFile never returns more than file_size bytes, so the
+                        # declared size bounds what read() decompresses
+                        add(name, member.file_size, lambda member=member: archive.read(member))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"{upload.filename} is not a valid zip archive")
+        else:
+            upload.file.seek(0, io.SEEK_END)
+            size = upload.file.tell()
+            upload.file.seek(0)
+            add(upload.filename or "clip", size, upload.file.read)
+    return clips
+
+@app.post("/process-voice-batch/", response_model=schemas.VoiceBatchResult)
+def process_voice_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    """
+    Processes many voice notes in one upload, either as several multipart files or
+    as a single .zip archive. Clips go through the AI pipeline together and every
+    recognised expense is saved in one transaction. Each clip gets its own status.
+    """
+    batch_dir = Path("temp_audio") / uuid.uuid4().hex
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        clips = _read_batch_clips(files)
+        if not clips:
+            raise HTTPException(status_code=400, detail="No audio files in upload")
+        
+        items = [None] * len(clips)
+        paths = []
+        path_indexes = []
+        for i, (name, content) in enumerate(clips):
+            if not content:
+                items[i] = schemas.VoiceBatchItem(filename=name, status="failed", detail="Empty audio file")
+                continue
+            temp_file_path = batch_dir / f"{i}{Path(name).suffix}"
+            temp_file_path.write_bytes(content)
+            paths.append(str(temp_file_path))
+            path_indexes.append(i)
+        
+        results = ai_processor.process_expense_audio_batch(paths, _category_lookup(db, current_user)) if paths else []
+        
+        to_create = []
+        for i, expense_data in zip(path_indexes, results):
+            if expense_data.get("category") == "Error" or expense_data.get("amount", 0) <= 0:
+                items[i] = schemas.VoiceBatchItem(
+                    filename=clips[i][0], status="failed", detail="Could not process audio"
+                )
+                continue
+            to_create.append((i, schemas.ExpenseCreate(
+                amount=expense_data["amount"],
+                category=expense_data["category"],
+                description=expense_data["description"]
+            )))
+        
+        if to_create:
+            db_expenses = crud.create_expenses_for_user(
+                db, expenses=[expense for _, expense in to_create], user_id=current_user.id
+            )
+            for (i, _), db_expense in zip(to_create, db_expenses):
+                items[i] = schemas.VoiceBatchItem(
+                    filename=clips[i][0], status="created", expense=schemas.Expense.from_orm(db_expense)
+                )
+        
+        created = sum(1 for item in items if item.status == "created")
+        return schemas.VoiceBatchResult(created=created, failed=len(items) - created, items=items)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Processing failed")
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+@app.post("/process-text-dry-run/", response_model=AiResponse)
+def process_text_dry_run(payload: TextExpenseRequest, db: Session = Depends(get_db), current_user: Optional[schemas.User] = Depends(get_optional_current_user)):
+    """
+    Parses a transcript produced on the device. Only classification and
+    amount extraction run on the server; Whisper is skipped entirely.
+    """
+    if not payload.text.strip():
+        raise HTTPException(status_code=400, detail="Empty text")
+    
+    try:
+        expense_data = ai_processor.process_expense_text(payload.text, _category_lookup(db, current_user))
+        return _dry_run_response(expense_data, current_user)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Processing failed")
+
+@app.post("/process-text/", response_model=schemas.Expense)
+def process_text(payload: TextExpenseRequest, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    if not payload.text.strip():
+        raise HTTPException(status_code=400, detail="Empty text")
+    
+    try:
+        expense_data = ai_processor.process_expense_text(payload.text, _category_lookup(db, current_user))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Processing failed")
+    
+    if expense_data.get("amount", 0) <= 0:
+        raise HTTPException(status_code=400, detail="Could not find an amount in the text")
+    
+    expense_create = schemas.ExpenseCreate(
+        amount=expense_data["amount"],
+        category=expense_data["category"],
+        description=expense_data["description"]
+    )
+    return crud.create_expense_for_user(db=db, expense=expense_create, user_id=current_user.id)
+
+@app.post("/process-voice/commit/", response_model=schemas.Expense)
+def commit_dry_run_result(payload: AiCommitRequest, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    """
+    Creates the expense previewed by /process-voice-dry-run/ or /process-text-dry-run/
+    from the cached result, applying any edits made by the user. No inference is re-run.
+    """
+    # Popping makes the token single use, so a double tap cannot create two expenses
+    # A failed commit puts the token back with the time it had left, not a fresh TTL
+    popped = dry_run_results.pop_with_ttl(payload.result_token)
+    if popped is None:
+        raise HTTPException(status_code=404, detail="Result token expired or not found")
+    (owner_id, cached_data), ttl_left = popped
+    if owner_id != current_user.id:
+        # Someone else's preview: left for its owner, and reported like an unknown token
+        dry_run_results.set(payload.result_token, (owner_id, cached_data), ttl=ttl_left)
+        raise HTTPException(status_code=404, detail="Result token expired or not found")
+    
+    edits = payload.dict(exclude={"result_token"}, exclude_none=True)
+    expense_data = {**cached_data, **edits}
+    if expense_data["amount"] <= 0:
+        dry_run_results.set(payload.result_token, (owner_id, cached_data), ttl=ttl_left)
+        raise HTTPException(status_code=400, detail="Amount must be greater than zero")
+    
+    try:
+        expense_create = schemas.ExpenseCreate(**expense_data)
+        return crud.create_expense_for_user(db=db, expense=expense_create, user_id=current_user.id)
+    except Exception:
+        dry_run_results.set(payload.result_token, (owner_id, cached_data), ttl=ttl_left)
+        raise
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """
+    Guards the /metrics endpoints, which expose pool, cache and login throttle
+    internals, with the METRICS_TOKEN shared secret. Without one configured they
+    do not exist.
+    """
+    if config.METRICS_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_metrics_token is None or not secrets.compare_digest(x_metrics_token, config.METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
+
+@app.get("/metrics/db-pool", dependencies=[Depends(require_metrics_token)])
+def db_pool_metrics():
+    """Connection pool telemetry: checkout waits, overflow, timeouts and invalidations."""
+    stats = database.pool_metrics.get_stats(database.engine.pool)
+    stats["async_pool"] = database.async_pool_metrics.get_stats(database.async_engine.sync_engine.pool)
+    if database.replica_engine is not None:
+        stats["replica_pool"] = database.replica_pool_metrics.get_stats(database.replica_engine.pool)
+    stats["replica"] = read_routing.replica_monitor.get_stats()
+    return stats
+
+@app.get("/metrics/response-cache", dependencies=[Depends(require_metrics_token)])
+def response_cache_metrics():
+    """Hit rate of the per-user summary, analytics and insights cache."""
+    return response_cache.get_stats()
+
+@app.get("/metrics/password-hashing", dependencies=[Depends(require_metrics_token)])
+def password_hashing_metrics():
+    """Password hashing pool queueing and login throttling counters."""
+    stats = password_hasher.get_stats()
+    stats["login_throttle"] = login_throttle.get_stats()
+    return stats
+
 @app.get("/ai-status")
 def ai_status_check():
     """Check AI processor status and performance metrics"""
@@ -251,6 +656,7 @@ def ai_status_check():
                 "whisper_ready": True,
                 "distilbert_ready": True
             },
+            "category_memory": category_memory.get_stats(),
             "performance_tips": {
                 "models_loaded": True,
                 "optimizations": [
@@ -269,28 +675,28 @@ def ai_status_check():
         }
 
 @app.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
     return current_user
 
 @app.get("/users/me", response_model=schemas.User)
-async def read_users_me_alt(current_user: models.User = Depends(get_current_user)):
+async def read_users_me_alt(current_user: schemas.User = Depends(get_current_user)):
     return current_user
 
 @app.put("/users/email", response_model=schemas.User)
 async def update_user_email_endpoint(
     email_data: schemas.EmailUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_user)
 ):
     # Check if email already exists
-    existing_user = user_crud.get_user_by_email(db, email=email_data.email)
+    existing_user = await async_crud.get_user_by_email(db, email=email_data.email)
     if existing_user and existing_user.id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    updated_user = user_crud.update_user_email(db, user_id=current_user.id, new_email=email_data.email)
+    updated_user = await async_crud.update_user_email(db, user_id=current_user.id, new_email=email_data.email)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -301,8 +707,8 @@ async def update_user_email_endpoint(
 @app.put("/users/password")
 async def update_user_password_endpoint(
     password_data: schemas.PasswordUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_user)
 ):
     if len(password_data.password) < 6:
         raise HTTPException(
@@ -310,7 +716,7 @@ async def update_user_password_endpoint(
             detail="Password must be at least 6 characters long"
         )
     
-    updated_user = user_crud.update_user_password(db, user_id=current_user.id, new_password=password_data.password)
+    updated_user = await async_crud.update_user_password(db, user_id=current_user.id, new_password=password_data.password)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -319,8 +725,8 @@ async def update_user_password_endpoint(
     return {"message": "Password updated successfully"}
 
 
-@app.get("/expenses/forecast/", response_model=schemas.ForecastResponse)
-def get_forecast_endpoint(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+@app.get("/expenses/forecast/", response_model=schemas.ForecastResponse, dependencies=[Depends(conditional_get)])
+def get_forecast_endpoint(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     forecast_data = crud.get_expense_forecast(db, user_id=current_user.id)
     if not forecast_data:
         raise HTTPException(status_code=404, detail="Not enough data to generate a forecast.")
@@ -328,72 +734,78 @@ def get_forecast_endpoint(db: Session = Depends(get_db), current_user: models.Us
 
 # --- NEW SUMMARY ENDPOINTS ---
 
-@app.get("/summary/{year}/{month}", response_model=schemas.MonthlySummary, tags=["Summaries"])
-def get_monthly_summary(
+@app.get("/summary/{year}/{month}", response_model=schemas.MonthlySummary, tags=["Summaries"], dependencies=[Depends(conditional_get)])
+async def get_monthly_summary(
     year: int,
     month: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Gets the financial summary for a specific month. 
-    If a summary is not pre-calculated, it will be generated and stored.
+    Totals are maintained on every write, so this is a single lookup.
     """
-    summary = summary_crud.get_or_create_monthly_summary(db, user_id=current_user.id, year=year, month=month)
-    return {
+    key, cached = response_cache.lookup(current_user.id, "summary.month", year=year, month=month)
+    if cached is not None:
+        return cached
+    summary = await async_crud.get_monthly_summary(db, user_id=current_user.id, year=year, month=month)
+    return response_cache.store(key, {
         "year": summary.year,
         "month": summary.month,
         "total_income": summary.total_income,
         "total_expenses": summary.total_expenses,
         "net_balance": summary.total_income - summary.total_expenses
-    }
+    })
 
-@app.get("/summary/balance", response_model=schemas.RunningBalance, tags=["Summaries"])
-def get_total_balance(
-    db: Session = Depends(get_db),
+@app.get("/summary/balance", response_model=schemas.RunningBalance, tags=["Summaries"], dependencies=[Depends(conditional_get)])
+async def get_total_balance(
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Gets the all-time running balance (total savings).
     """
-    balance = summary_crud.get_running_balance(db, user_id=current_user.id)
-    return {"total_balance": balance}
+    key, cached = response_cache.lookup(current_user.id, "summary.balance")
+    if cached is not None:
+        return cached
+    balance = await async_crud.get_running_balance(db, user_id=current_user.id)
+    return response_cache.store(key, {"total_balance": balance})
 
 # --- NEW BUDGET ENDPOINTS ---
 
 @app.post("/budgets/", response_model=schemas.Budget, tags=["Budgets"])
-def create_or_update_budget_endpoint(
+async def create_or_update_budget_endpoint(
     budget: schemas.BudgetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Creates a new budget or updates an existing one for a specific category and month.
     """
-    return budget_crud.create_or_update_budget(db, budget=budget, user_id=current_user.id)
+    return await async_crud.create_or_update_budget(db, budget=budget, user_id=current_user.id)
 
-@app.get("/budgets/{year}/{month}", response_model=List[schemas.Budget], tags=["Budgets"])
-def get_budgets_for_month_endpoint(
+@app.get("/budgets/{year}/{month}", response_model=List[schemas.Budget], tags=["Budgets"], dependencies=[Depends(conditional_get)])
+async def get_budgets_for_month_endpoint(
     year: int,
     month: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Retrieves all budgets set for a specific month.
     """
-    return budget_crud.get_budgets_for_month(db, user_id=current_user.id, year=year, month=month)
+    return await async_crud.get_budgets_for_month(db, user_id=current_user.id, year=year, month=month)
 
 @app.delete("/budgets/{budget_id}", response_model=schemas.Budget, tags=["Budgets"])
-def delete_budget_endpoint(
+async def delete_budget_endpoint(
     budget_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Deletes a budget.
     """
-    db_budget = budget_crud.delete_budget(db, budget_id=budget_id, user_id=current_user.id)
+    db_budget = await async_crud.delete_budget(db, budget_id=budget_id, user_id=current_user.id)
     if db_budget is None:
         raise HTTPException(status_code=404, detail="Budget not found")
     return db_budget
@@ -401,80 +813,92 @@ def delete_budget_endpoint(
 # --- NEW GOAL ENDPOINTS ---
 
 @app.post("/goals/", response_model=schemas.Goal, tags=["Goals"])
-def create_goal_endpoint(
+async def create_goal_endpoint(
     goal: schemas.GoalCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return goal_crud.create_goal(db, goal=goal, user_id=current_user.id)
+    return await async_crud.create_goal(db, goal=goal, user_id=current_user.id)
 
-@app.get("/goals/", response_model=List[schemas.Goal], tags=["Goals"])
-def get_goals_endpoint(
-    db: Session = Depends(get_db),
+@app.get("/goals/", response_model=List[schemas.Goal], tags=["Goals"], dependencies=[Depends(conditional_get)])
+async def get_goals_endpoint(
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return goal_crud.get_goals(db, user_id=current_user.id)
+    return await async_crud.get_goals(db, user_id=current_user.id)
     
 @app.put("/goals/{goal_id}/progress", response_model=schemas.Goal, tags=["Goals"])
-def update_goal_progress_endpoint(
+async def update_goal_progress_endpoint(
     goal_id: int,
     update_data: schemas.GoalUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    db_goal = goal_crud.update_goal_progress(db, goal_id=goal_id, user_id=current_user.id, amount=update_data.amount)
+    db_goal = await async_crud.update_goal_progress(db, goal_id=goal_id, user_id=current_user.id, amount=update_data.amount)
     if db_goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
     return db_goal
     
 @app.delete("/goals/{goal_id}", response_model=schemas.Goal, tags=["Goals"])
-def delete_goal_endpoint(
+async def delete_goal_endpoint(
     goal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    db_goal = goal_crud.delete_goal(db, goal_id=goal_id, user_id=current_user.id)
+    db_goal = await async_crud.delete_goal(db, goal_id=goal_id, user_id=current_user.id)
     if db_goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
     return db_goal
 
-@app.get("/summary/historical", response_model=List[schemas.HistoricalDataPoint], tags=["Summaries"])
+@app.get("/summary/historical", response_model=List[schemas.HistoricalDataPoint], tags=["Summaries"], dependencies=[Depends(conditional_get)])
 def get_historical_summary_endpoint(
     months: int = 6,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return summary_crud.get_historical_summary(db, user_id=current_user.id, months=months)
+    key, cached = response_cache.lookup(current_user.id, "summary.historical", months=months, today=date.today())
+    if cached is not None:
+        return cached
+    return response_cache.store(key, summary_crud.get_historical_summary(db, user_id=current_user.id, months=months))
 
-@app.get("/analytics/category-breakdown", response_model=List[schemas.CategoryBreakdown], tags=["Analytics"])
+@app.get("/analytics/category-breakdown", response_model=List[schemas.CategoryBreakdown], tags=["Analytics"], dependencies=[Depends(conditional_get)])
 def get_category_breakdown(
     months: int = 6,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return summary_crud.get_category_breakdown(db, user_id=current_user.id, months=months)
+    key, cached = response_cache.lookup(current_user.id, "analytics.category-breakdown", months=months, today=date.today())
+    if cached is not None:
+        return cached
+    return response_cache.store(key, summary_crud.get_category_breakdown(db, user_id=current_user.id, months=months))
 
-@app.get("/analytics/spending-trends", response_model=List[schemas.SpendingTrend], tags=["Analytics"])
+@app.get("/analytics/spending-trends", response_model=List[schemas.SpendingTrend], tags=["Analytics"], dependencies=[Depends(conditional_get)])
 def get_spending_trends(
     months: int = 6,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return summary_crud.get_spending_trends(db, user_id=current_user.id, months=months)
+    key, cached = response_cache.lookup(current_user.id, "analytics.spending-trends", months=months, today=date.today())
+    if cached is not None:
+        return cached
+    return response_cache.store(key, summary_crud.get_spending_trends(db, user_id=current_user.id, months=months))
 
-@app.get("/analytics/stats", response_model=schemas.AnalyticsStats, tags=["Analytics"])
+@app.get("/analytics/stats", response_model=schemas.AnalyticsStats, tags=["Analytics"], dependencies=[Depends(conditional_get)])
 def get_analytics_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: schemas.User = Depends(get_current_user)
 ):
-    return summary_crud.get_analytics_stats(db, user_id=current_user.id)
+    key, cached = response_cache.lookup(current_user.id, "analytics.stats", today=date.today())
+    if cached is not None:
+        return cached
+    return response_cache.store(key, summary_crud.get_analytics_stats(db, user_id=current_user.id))
 
-@app.get("/expenses/{year}/{month}", response_model=List[schemas.Expense], tags=["Expenses"])
+@app.get("/expenses/{year}/{month}", response_model=List[schemas.Expense], tags=["Expenses"], dependencies=[Depends(conditional_get)])
 def get_expenses_by_month(
     year: int,
     month: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
     Get expenses for a specific month and year.
@@ -490,26 +914,84 @@ class TransactionFilter(BaseModel):
     startDate: str = None
     endDate: str = None
     type: str = None
+    format: str = "csv"  # "csv", "parquet" or "arrow"
+
+@app.post("/import/statement", response_model=schemas.StatementImportResult, tags=["Transactions"])
+def import_bank_statement(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    """
+    Imports a CSV or OFX bank statement in one transaction. Debits become expenses and
+    credits incomes; expenses without a category are classified in batches.
+    Unreadable rows are skipped and reported, the rest is imported.
+    """
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    first_line = lines.readline()
+    rows = itertools.chain([first_line], lines)
+    parse = statement_import.parse_ofx if statement_import.detect_format(file.filename, first_line) == "ofx" else statement_import.parse_csv
+    
+    try:
+        return statement_import.import_statement(
+            db,
+            user_id=current_user.id,
+            records=parse(rows),
+            classify=ai_processor.classify_texts
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not read statement: {e}")
+
+@app.get("/transactions", response_model=schemas.TransactionPage, tags=["Transactions"], dependencies=[Depends(conditional_get)])
+def read_transactions(
+    type: str | None = None,
+    category: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    search: str | None = None,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Expenses and incomes in one list, newest first. `type` is "all", "expenses" or
+    "incomes"; `start_date`/`end_date` are inclusive. Filtering, ordering and paging
+    all happen in one database query; pass `next_cursor` back to get the next page.
+    """
+    try:
+        items, next_cursor = crud.get_transactions_page(
+            db,
+            user_id=current_user.id,
+            limit=max(1, min(limit, MAX_PAGE_SIZE)),
+            cursor=cursor,
+            transaction_type=type,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            search=search
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 @app.post("/transactions/export/pdf", tags=["Transactions"])
 def export_transactions_pdf(
     export_data: TransactionExport,
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """Export transactions as CSV file."""
     try:
-        content = "Date,Type,Category,Description,Amount\n"
-        
-        for transaction in export_data.transactions:
-            item = transaction['item']
-            trans_type = transaction['type']
-            date_str = item['date']
-            amount_str = f"-${item['amount']:.2f}" if trans_type == 'expense' else f"+${item['amount']:.2f}"
-            
-            content += f"{date_str},{trans_type.title()},{item['category']},{item['description']},{amount_str}\n"
+        # Fields are checked up front so a malformed item is still a 500, not a cut-off file
+        records = [
+            [
+                transaction['item']['date'],
+                transaction['type'].title(),
+                transaction['item']['category'],
+                transaction['item']['description'],
+                csv_export.format_amount(transaction['type'], transaction['item']['amount'])
+            ]
+            for transaction in export_data.transactions
+        ]
         
         return StreamingResponse(
-            io.BytesIO(content.encode()),
+            csv_export.csv_chunks(records),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=transactions.csv"}
         )
@@ -521,189 +1003,69 @@ def export_transactions_pdf(
 def export_filtered_transactions(
     filters: TransactionFilter,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
-    """Export filtered transactions as CSV file."""
+    """
+    Export filtered transactions as CSV, or as a Parquet/Arrow IPC file with typed
+    columns for loading straight into pandas or DuckDB.
+    """
+    if filters.format != "csv" and filters.format not in arrow_export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {filters.format}")
+    if filters.format in arrow_export.FORMATS and not arrow_export.PYARROW_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Parquet/Arrow export is not available on this server")
+    
     try:
-        # Get all transactions
-        expenses = crud.get_expenses_for_user(db, user_id=current_user.id, search=filters.search)
-        incomes = crud.get_incomes_for_user(db, user_id=current_user.id, search=filters.search)
-        
-        transactions = []
-        
-        # Filter expenses
-        if not filters.type or filters.type in ['all', 'expenses']:
-            for expense in expenses:
-                if filters.category and expense.category != filters.category:
-                    continue
-                if filters.startDate and expense.date.date() < datetime.fromisoformat(filters.startDate).date():
-                    continue
-                if filters.endDate and expense.date.date() > datetime.fromisoformat(filters.endDate).date():
-                    continue
-                transactions.append({
-                    'date': expense.date.strftime('%Y-%m-%d'),
-                    'type': 'Expense',
-                    'category': expense.category,
-                    'description': expense.description,
-                    'amount': f"-${expense.amount:.2f}"
-                })
-        
-        # Filter incomes
-        if not filters.type or filters.type in ['all', 'incomes']:
-            for income in incomes:
-                if filters.category and income.category != filters.category:
-                    continue
-                if filters.startDate and income.income_date.date() < datetime.fromisoformat(filters.startDate).date():
-                    continue
-                if filters.endDate and income.income_date.date() > datetime.fromisoformat(filters.endDate).date():
-                    continue
-                transactions.append({
-                    'date': income.income_date.strftime('%Y-%m-%d'),
-                    'type': 'Income',
-                    'category': income.category,
-                    'description': income.description,
-                    'amount': f"+${income.amount:.2f}"
-                })
-        
-        # Sort by date
-        transactions.sort(key=lambda x: x['date'], reverse=True)
+        statement = crud.transactions_statement(
+            db,
+            user_id=current_user.id,
+            transaction_type=filters.type,
+            category=filters.category,
+            start_date=datetime.fromisoformat(filters.startDate).date() if filters.startDate else None,
+            end_date=datetime.fromisoformat(filters.endDate).date() if filters.endDate else None,
+            search=filters.search
+        )
         
-        # Generate CSV content
-        content = "Date,Type,Category,Description,Amount\n"
-        for transaction in transactions:
-            content += f"{transaction['date']},{transaction['type']},{transaction['category']},{transaction['description']},{transaction['amount']}\n"
+        if filters.format in arrow_export.FORMATS:
+            media_type, extension = arrow_export.FORMATS[filters.format]
+            return StreamingResponse(
+                arrow_export.stream_transactions(statement, filters.format, read_routing.read_sessionmaker(current_user.id)),
+                media_type=media_type,
+                headers={"Content-Disposition": f"attachment; filename=filtered_transactions.{extension}"}
+            )
         
         return StreamingResponse(
-            io.BytesIO(content.encode()),
+            csv_export.stream_transactions_csv(statement, read_routing.read_sessionmaker(current_user.id)),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=filtered_transactions.csv"}
         )
         
+    except ValueError as e:
+        # An unknown type or a malformed date
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Filtered export failed: {str(e)}")
 
 @app.get("/insights/smart", tags=["Insights"])
 def get_smart_insights(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.User = Depends(get_current_user)
 ):
     """
-    Generate AI-powered smart insights based on user's spending patterns.
+    Smart insights based on the user's spending patterns, precomputed in the
+    background after each change (see insights_engine.py). `generated_at` is when
+    they were computed; `stale` is true while newer changes are being processed.
     """
-    from datetime import datetime, timedelta
-    import calendar
-    
-    current_date = datetime.now()
-    current_month = current_date.month
-    current_year = current_date.year
-    days_in_month = calendar.monthrange(current_year, current_month)[1]
-    days_passed = current_date.day
-    
-    # Get previous month
-    if current_month == 1:
-        previous_month = 12
-        previous_year = current_year - 1
-    else:
-        previous_month = current_month - 1
-        previous_year = current_year
-    
-    # Get current and previous month data
-    current_expenses = crud.get_expenses_by_month(db, user_id=current_user.id, year=current_year, month=current_month)
-    previous_expenses = crud.get_expenses_by_month(db, user_id=current_user.id, year=previous_year, month=previous_month)
-    
-    current_summary = summary_crud.get_or_create_monthly_summary(db, user_id=current_user.id, year=current_year, month=current_month)
-    previous_summary = summary_crud.get_or_create_monthly_summary(db, user_id=current_user.id, year=previous_year, month=previous_month)
-    
-    # Get budgets for current month
-    budgets = budget_crud.get_budgets_for_month(db, user_id=current_user.id, year=current_year, month=current_month)
-    
-    # Calculate category analysis
-    current_categories = {}
-    previous_categories = {}
-    
-    for expense in current_expenses:
-        current_categories[expense.category] = current_categories.get(expense.category, 0) + expense.amount
-    
-    for expense in previous_expenses:
-        previous_categories[expense.category] = previous_categories.get(expense.category, 0) + expense.amount
-    
-    # Generate insights
-    insights = []
-    
-    # 1. Prediction insight
-    if previous_summary.total_expenses > 0:
-        trend = (current_summary.total_expenses - previous_summary.total_expenses) / previous_summary.total_expenses
-        seasonal_factor = 1 + (0.15 * (current_month / 12))
-        prediction = current_summary.total_expenses * (1 + trend * 0.7) * seasonal_factor
-        
-        insights.append({
-            "type": "prediction",
-            "title": "Next Month Forecast",
-            "message": f"Based on your spending pattern, next month's expenses are predicted to be ${prediction:.0f}",
-            "value": prediction,
-            "confidence": 0.75
-        })
-    
-    # 2. Budget alerts
-    for budget in budgets:
-        spent = current_categories.get(budget.category, 0)
-        if spent > 0:
-            percentage = (spent / budget.amount) * 100
-            days_remaining = days_in_month - days_passed
-            
-            if percentage >= 85:
-                insights.append({
-                    "type": "warning",
-                    "title": "Budget Alert",
-                    "message": f"You're {percentage:.0f}% through your {budget.category} budget with {days_remaining} days left this month",
-                })
-            elif percentage >= 50 and days_passed < (days_in_month * 0.5):
-                insights.append({
-                    "type": "info",
-                    "title": "Budget Watch",
-                    "message": f"You've used {percentage:.0f}% of your {budget.category} budget in the first half of the month",
-                })
-    
-    # 3. Category insights
-    if current_categories:
-        top_category = max(current_categories, key=current_categories.get)
-        top_amount = current_categories[top_category]
-        
-        insights.append({
-            "type": "info",
-            "title": "Top Spending Category",
-            "message": f"{top_category} is your highest spending category this month at ${top_amount:.0f}",
-        })
-    
-    # 4. Savings opportunity
-    if previous_summary.total_expenses > 0 and current_summary.total_expenses > previous_summary.total_expenses:
-        increase = current_summary.total_expenses - previous_summary.total_expenses
-        insights.append({
-            "type": "warning",
-            "title": "Spending Increase",
-            "message": f"Your spending increased by ${increase:.0f} compared to last month",
-        })
-    elif previous_summary.total_expenses > 0 and current_summary.total_expenses < previous_summary.total_expenses:
-        savings = previous_summary.total_expenses - current_summary.total_expenses
-        insights.append({
-            "type": "success",
-            "title": "Great Savings!",
-            "message": f"You saved ${savings:.0f} compared to last month. Keep it up!",
-        })
-    
-    return {
-        "insights": insights,
-        "current_month_total": current_summary.total_expenses,
-        "previous_month_total": previous_summary.total_expenses,
-        "category_analysis": {
-            "current": current_categories,
-            "previous": previous_categories
-        },
-        "generated_at": current_date.isoformat()
-    }
+    document = insights_engine.get(db, current_user.id)
+    # The stored document can change without a data version bump, so it is its own ETag
+    etag = response_cache.etag(current_user.id, request.url.path, generated_at=document["generated_at"], stale=document["stale"])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=document, headers=headers)
 
 @app.delete("/transactions/all", status_code=status.HTTP_204_NO_CONTENT)
-def delete_all_transactions_endpoint(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def delete_all_transactions_endpoint(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     crud.delete_all_expenses_for_user(db, user_id=current_user.id)
     crud.delete_all_incomes_for_user(db, user_id=current_user.id)
     return {"ok": True}
\ No newline at end of file
@@ -1,9 +1,10 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Boolean, Index, Text, DDL, event
 from sqlalchemy.orm import relationship
 from .database import Base
+from .text_search import MYSQL_DIALECTS, mysql_fulltext_ddl, sqlite_fts_ddl, sqlite_fts_supported
 
-__all__ = ["User", "Expense", "Income", "MonthlySummary", "Budget", "Goal", "NetWorth", "Asset", "Liability"]
+__all__ = ["User", "Expense", "Income", "MonthlySummary", "Budget", "Goal", "NetWorth", "Asset", "Liability", "IdempotencyKey"]
 
 
 class Expense(Base):
@@ -18,6 +19,10 @@ class Expense(Base):
     
     owner = relationship("User")
 
+    __table_args__ = (
+        Index("ix_expenses_user_id_date", "user_id", "date"),
+    )
+
 
 
     
@@ -34,6 +39,10 @@ class Income(Base):
     
     owner = relationship("User")
 
+    __table_args__ = (
+        Index("ix_incomes_user_id_income_date", "user_id", "income_date"),
+    )
+
 
     
     @property
@@ -62,6 +71,11 @@ class MonthlySummary(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User")
 
+    __table_args__ = (
+        # One row per user and month; the target of the incremental upserts
+        Index("uq_monthly_summaries_user_year_month", "user_id", "year", "month", unique=True),
+    )
+
 class Budget(Base):
     __tablename__ = "budgets"
 
@@ -121,4 +135,40 @@ class NetWorth(Base):
     snapshot_date = Column(DateTime, default=datetime.now)
     
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    owner = relationship("User")
\ No newline at end of file
+    owner = relationship("User")
+
+
+class IdempotencyKey(Base):
+    """Outcome of a client operation, stored so a retried batch replays instead of repeating it."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(100), nullable=False)
+    result = Column(Text, nullable=False)  # JSON: {"op", "status", "expense_id"}
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        Index("uq_idempotency_keys_user_key", "user_id", "key", unique=True),
+    )
+
+class InsightDocument(Base):
+    """A user's smart insights, precomputed in the background by insights_engine.py."""
+    __tablename__ = "insight_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document = Column(Text, nullable=False)  # JSON, as returned by /insights/smart
+    computed_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        Index("uq_insight_documents_user_id", "user_id", unique=True),
+    )
+
+# Full-text search indexes (see text_search.py); the Alembic migration creates the same
+for _table in (Expense.__table__, Income.__table__):
+    event.listen(_table, "after_create", DDL(mysql_fulltext_ddl(_table.name)).execute_if(dialect=MYSQL_DIALECTS))
+    for _statement in sqlite_fts_ddl(_table.name):
+        event.listen(_table, "after_create", DDL(_statement).execute_if(dialect="sqlite", callable_=sqlite_fts_supported))
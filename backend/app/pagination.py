@@ -0,0 +1,39 @@
+import base64
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_date: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just after the row with this (date, id)."""
+    raw = f"{sort_date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor. Raises ValueError for anything it did not produce."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_date, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(sort_date), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def encode_transaction_cursor(sort_date: datetime, kind: str, row_id: int) -> str:
+    """Cursor for the merged transactions list, ordered by (date, type, id)."""
+    raw = f"{sort_date.isoformat()}|{kind}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_transaction_cursor(cursor: str):
+    """Inverse of encode_transaction_cursor. Raises ValueError for anything it did not produce."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_date, kind, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        if kind not in ("expense", "income"):
+            raise ValueError(kind)
+        return datetime.fromisoformat(sort_date), kind, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,101 @@
+"""
+bcrypt work on a dedicated, bounded thread pool.
+
+bcrypt releases the GIL, so threads run it in parallel, but on FastAPI's shared
+threadpool a burst of logins would hold every worker that sync routes need. Here
+it gets PASSWORD_HASH_WORKERS threads of its own, at most PASSWORD_HASH_MAX_QUEUE
+calls may wait for one, and anything beyond that is refused straight away.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import security
+from .config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+# Recent queue waits kept for the percentiles
+WAIT_SAMPLES = 1024
+
+
+class HasherBusy(Exception):
+    """Raised when the queue of waiting hash/verify calls is full."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.upgraded = 0
+        self.runs = 0
+        self.run_total = 0.0
+
+    def _timed(self, submitted_at: float, fn, *args):
+        started_at = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._waits.append(started_at - submitted_at)
+                self.runs += 1
+                self.run_total += time.monotonic() - started_at
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherBusy()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            future = self._executor.submit(self._timed, time.monotonic(), fn, *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(security.get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """See security.verify_and_update_password."""
+        valid, new_hash = await self._submit(security.verify_and_update_password, password, hashed_password)
+        if new_hash is not None:
+            with self._lock:
+                self.upgraded += 1
+        return valid, new_hash
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            waited = len(waits)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(self.pending, self.workers),
+                "queued": max(self.pending - self.workers, 0),
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "hashes_upgraded": self.upgraded,
+                "bcrypt_rounds": security.BCRYPT_ROUNDS,
+                "queue_wait_ms": {
+                    "avg": round(sum(waits) / waited * 1000, 3) if waited else 0.0,
+                    "p95": round(waits[max(int(waited * 0.95) - 1, 0)] * 1000, 3) if waited else 0.0,
+                    "max": round(waits[-1] * 1000, 3) if waited else 0.0,
+                },
+                "run_ms_avg": round(self.run_total / self.runs * 1000, 3) if self.runs else 0.0,
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Recent checkout waits kept for the percentiles
+WAIT_SAMPLES = 1024
+
+
+class PoolMetrics:
+    """Counters for one connection pool, fed by InstrumentedQueuePool and pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.overflow_checkouts = 0
+        self.peak_overflow = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, overflow: int):
+        with self._lock:
+            self._waits.append(seconds)
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_stats(self, pool) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            waited = len(waits)
+            stats = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "timeouts": self.timeouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "peak_overflow": self.peak_overflow,
+                "checkout_wait_ms": {
+                    "avg": round(sum(waits) / waited * 1000, 3) if waited else 0.0,
+                    "p95": round(waits[max(int(waited * 0.95) - 1, 0)] * 1000, 3) if waited else 0.0,
+                    "max": round(self.wait_max * 1000, 3),
+                },
+            }
+        stats["pool"] = {"class": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            stats["pool"].update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        return stats
+
+
+class _InstrumentedPool:
+    """Times how long each checkout waits and counts timeouts; mixed into QueuePool classes."""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.increment("timeouts")
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started, self.overflow())
+        return connection
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """The same for engines created with create_async_engine()."""
+
+
+def instrument_engine(engine) -> PoolMetrics:
+    """Attaches a PoolMetrics to the engine's pool and its connection events."""
+    metrics = PoolMetrics()
+    if isinstance(engine.pool, _InstrumentedPool):
+        engine.pool.metrics = metrics
+
+    event.listen(engine, "connect", lambda dbapi_connection, record: metrics.increment("connects"))
+    event.listen(engine, "checkout", lambda dbapi_connection, record, proxy: metrics.increment("checkouts"))
+    event.listen(engine, "checkin", lambda dbapi_connection, record: metrics.increment("checkins"))
+    event.listen(engine, "invalidate", lambda dbapi_connection, record, exception: metrics.increment("invalidations"))
+    event.listen(engine, "soft_invalidate", lambda dbapi_connection, record, exception: metrics.increment("soft_invalidations"))
+    return metrics
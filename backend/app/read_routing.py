@@ -0,0 +1,146 @@
+"""
+Routes read-only sessions to the replica when it is safe.
+
+A read goes to the primary instead when no replica is configured, when the
+replica is lagging more than REPLICA_MAX_LAG_SECONDS (checked at most every
+REPLICA_LAG_CHECK_INTERVAL), or when the user committed a write in the last
+READ_YOUR_WRITES_SECONDS, so people always see their own changes.
+"""
+
+import logging
+import threading
+import time
+
+from sqlalchemy import event, text
+
+from . import database
+from .cache import TTLCache
+from .config import REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_CHECK_INTERVAL, READ_YOUR_WRITES_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_recent_writers = TTLCache(maxsize=100000, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+def replica_lag_seconds(connection) -> float:
+    """How far the replica is behind its primary; inf when replication is broken."""
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"), ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+            try:
+                row = connection.execute(text(statement)).mappings().first()
+            except Exception:
+                continue
+            if row is None:
+                return 0.0  # not configured as a replica (e.g. a second local server)
+            lag = row.get(column)
+            return float(lag) if lag is not None else float("inf")
+        raise RuntimeError("cannot read replication status")
+    if dialect == "postgresql":
+        return float(connection.execute(text(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+        )).scalar())
+    # SQLite and others have no replication to measure
+    return 0.0
+
+
+class ReplicaMonitor:
+    def __init__(self, engine, max_lag: float = REPLICA_MAX_LAG_SECONDS, interval: float = REPLICA_LAG_CHECK_INTERVAL):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = False
+        self.lag = None
+        self.error = None
+        self.routed = {"replica": 0, "primary_pinned": 0, "primary_lagging": 0, "primary_no_replica": 0}
+
+    def healthy(self) -> bool:
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.interval:
+                return self._healthy
+            self._checked_at = time.monotonic()
+        try:
+            with self.engine.connect() as connection:
+                lag = replica_lag_seconds(connection)
+            error = None
+        except Exception as e:
+            # Driver messages can name the host or DSN; only the type goes in the metrics
+            logger.warning("Replica lag check failed: %s", e)
+            lag, error = None, type(e).__name__
+        with self._lock:
+            self.lag, self.error = lag, error
+            self._healthy = lag is not None and lag <= self.max_lag
+            return self._healthy
+
+    def count(self, route: str):
+        with self._lock:
+            self.routed[route] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "configured": self.engine is not None,
+                "healthy": self._healthy,
+                "lag_seconds": self.lag,
+                "max_lag_seconds": self.max_lag,
+                "error": self.error,
+                "routed": dict(self.routed),
+            }
+
+
+replica_monitor = ReplicaMonitor(database.replica_engine)
+
+
+def mark_write(user_id: int):
+    _recent_writers.set(user_id, True)
+
+
+def read_sessionmaker(user_id: int | None = None):
+    """The session factory a read for this user should use right now."""
+    if database.replica_engine is None:
+        replica_monitor.count("primary_no_replica")
+        return database.SessionLocal
+    if user_id is not None and _recent_writers.get(user_id):
+        replica_monitor.count("primary_pinned")
+        return database.SessionLocal
+    if not replica_monitor.healthy():
+        replica_monitor.count("primary_lagging")
+        return database.SessionLocal
+    replica_monitor.count("replica")
+    return database.ReadSessionLocal
+
+
+def _session_user_id(session):
+    """The authenticated user of the request this session serves, if known."""
+    if session.info.get("user_id") is not None:
+        return session.info["user_id"]
+    return getattr(session.info.get("request_state"), "user_id", None)
+
+
+# Read-your-writes: a primary session that commits changes pins its user (set by
+# get_current_user) to the primary for a while. Covers sync and async sessions.
+@event.listens_for(database.AppSession, "after_flush")
+def _note_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(database.AppSession, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    # Core insert/update/delete statements run through the session skip the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(database.AppSession, "after_commit")
+def _pin_writer(session):
+    user_id = _session_user_id(session)
+    if session.info.pop("wrote", False) and user_id is not None:
+        mark_write(user_id)
+
+
+@event.listens_for(database.AppSession, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
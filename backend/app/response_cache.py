@@ -0,0 +1,125 @@
+"""
+Per-user response cache for the dashboard's summary and analytics endpoints.
+
+Entries are keyed by user, endpoint, parameters and the user's data version. Any
+committed write to the user's expenses, incomes, budgets or goals bumps the version,
+so entries computed before it are never served again; the TTL only bounds how long
+they linger. Versions are never reused, even after being evicted or a restart.
+
+That invalidation is exact only within one process. With the default in-process
+storage, a write handled by one worker does not bump the version another worker
+holds, so the other keeps serving its cached summaries and analytics, and
+answering If-None-Match with 304 for ETags made from that version, for up to
+RESPONSE_CACHE_TTL_SECONDS. Run a single worker, or pass `versions` (and
+`storage`) backed by a store all workers share.
+"""
+
+import hashlib
+import itertools
+import secrets
+import threading
+
+from .cache import TTLCache
+from .config import RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES
+
+# Distinguishes versions handed out by this process from those of earlier runs or
+# other workers sharing the same storage
+BOOT_NONCE = secrets.token_hex(4)
+
+# A forgotten version just means a new one (a cache miss, a changed ETag), so this
+# can be short. It bounds how long a worker that did not see a write keeps its old
+# version, and so keeps serving cached responses and 304s for it
+VERSION_TTL_SECONDS = RESPONSE_CACHE_TTL_SECONDS
+
+
+class ResponseCache:
+    """
+    `storage` and `versions` can be any object with TTLCache's get/set/pop (an
+    adapter over Redis or memcached, say); both default to an in-process TTLCache.
+    Keys are strings so they can be stored anywhere.
+    """
+
+    def __init__(self, storage=None, versions=None, ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+                 maxsize: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.storage = storage if storage is not None else TTLCache(maxsize=maxsize, ttl=ttl)
+        self.versions = versions if versions is not None else TTLCache(maxsize=maxsize, ttl=VERSION_TTL_SECONDS)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _new_version(self) -> str:
+        with self._lock:
+            return f"{BOOT_NONCE}.{next(self._counter)}"
+
+    def version(self, user_id: int) -> str:
+        """The user's current data version."""
+        version = self.versions.get(str(user_id))
+        if version is None:
+            version = self._new_version()
+            self.versions.set(str(user_id), version)
+        return version
+
+    def bump(self, user_id: int):
+        """Call after committing a write that changes what the user's endpoints return."""
+        self.versions.set(str(user_id), self._new_version())
+        with self._lock:
+            self.invalidations += 1
+        for listener in self._listeners:
+            listener(user_id)
+
+    def on_bump(self, listener):
+        """Calls listener(user_id) after every bump, e.g. to refresh precomputed data."""
+        self._listeners.append(listener)
+
+    def _key(self, user_id: int, endpoint: str, params: dict) -> str:
+        return f"{user_id}:{endpoint}:{sorted(params.items())!r}:{self.version(user_id)}"
+
+    def lookup(self, user_id: int, endpoint: str, **params):
+        """
+        Returns (key, cached response or None). The version is read before the caller
+        computes a miss, so a write committed meanwhile leaves the stored result unused.
+        """
+        key = self._key(user_id, endpoint, params)
+        value = self.storage.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, value
+
+    def store(self, key: str, value):
+        self.storage.set(key, value)
+        return value
+
+    def etag(self, user_id: int, endpoint: str, **params) -> str:
+        """Weak ETag for a response; changes whenever the user's data version does."""
+        digest = hashlib.sha1(self._key(user_id, endpoint, params).encode()).hexdigest()[:24]
+        return f'W/"{digest}"'
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "entries": len(self.storage) if hasattr(self.storage, "__len__") else None,
+            }
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match comparison, which is weak: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+response_cache = ResponseCache()
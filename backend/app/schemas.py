@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from typing import Dict
 
 
@@ -25,6 +25,48 @@ class Expense(ExpenseBase):
         from_attributes = True
         
         
+class ExpensePage(BaseModel):
+    items: List[Expense]
+    next_cursor: Optional[str] = None
+
+class VoiceBatchItem(BaseModel):
+    filename: str
+    status: str  # "created" or "failed"
+    expense: Optional[Expense] = None
+    detail: Optional[str] = None
+
+class VoiceBatchResult(BaseModel):
+    created: int
+    failed: int
+    items: List[VoiceBatchItem]
+
+class ExpenseOperation(BaseModel):
+    op: str  # "create", "update" or "delete"
+    idempotency_key: str
+    id: Optional[int] = None  # update and delete
+    expense: Optional[ExpenseCreate] = None  # create and update
+
+class ExpenseBatchRequest(BaseModel):
+    operations: List[ExpenseOperation]
+
+class ExpenseBatchItem(BaseModel):
+    idempotency_key: str
+    op: str
+    status: str  # "created", "updated", "deleted", "not_found", "invalid" or "failed"
+    replayed: bool = False  # True when the key was already applied by an earlier request
+    expense: Optional[Expense] = None
+    detail: Optional[str] = None
+
+class ExpenseBatchResult(BaseModel):
+    items: List[ExpenseBatchItem]
+
+class StatementImportResult(BaseModel):
+    expenses: int
+    incomes: int
+    skipped: int
+    errors: List[str]  # the first few unreadable rows
+        
+        
 class IncomeBase(BaseModel):
     amount: float
     category: str
@@ -41,6 +83,24 @@ class Income(IncomeBase):
         from_attributes = True
         
         
+class IncomePage(BaseModel):
+    items: List[Income]
+    next_cursor: Optional[str] = None
+        
+        
+class Transaction(BaseModel):
+    type: str  # "expense" or "income"
+    id: int
+    amount: float
+    category: str
+    description: Optional[str] = None
+    date: datetime
+
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None
+        
+        
 class Token(BaseModel):
     access_token: str
     token_type: str
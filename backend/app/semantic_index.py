@@ -0,0 +1,295 @@
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import VECTOR_INDEX_DIR
+
+# numpy is only needed when semantic search is actually used
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MINILM_MODEL_PATH = Path(__file__).parent.parent / "models" / "MiniLM-V2" / "fine-tuned-minilm-advanced"
+EMBED_BATCH_SIZE = 64
+
+
+class MiniLMEmbedder:
+    """
+    Sentence embeddings from the local MiniLM checkpoint: mean-pooled encoder output,
+    L2 normalized so a dot product is the cosine similarity. Loaded on first use.
+    """
+
+    def __init__(self, model_path: Path = MINILM_MODEL_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import torch
+        from transformers import AutoModel, XLMRobertaTokenizer
+
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"MiniLM model not found at {self.model_path}")
+        self._torch = torch
+        self._tokenizer = XLMRobertaTokenizer.from_pretrained(str(self.model_path))
+        self._model = AutoModel.from_pretrained(str(self.model_path))
+        self._model.eval()
+
+    def __call__(self, texts: list) -> "np.ndarray":
+        with self._lock:
+            if self._model is None:
+                self._load()
+        torch = self._torch
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            chunk = texts[start:start + EMBED_BATCH_SIZE]
+            inputs = self._tokenizer(chunk, return_tensors="pt", padding=True, truncation=True, max_length=64)
+            with torch.no_grad():
+                hidden = self._model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+            vectors.append(pooled.cpu().numpy().astype(np.float32))
+        return np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+
+class _UserVectors:
+    def __init__(self, ids, vectors):
+        self.ids = ids  # int64, one expense id per row
+        self.vectors = vectors  # float32 in memory, float16 on disk
+        self.position = {int(expense_id): row for row, expense_id in enumerate(ids)}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+
+class SemanticIndex:
+    """
+    Per-user vector index over expense descriptions.
+
+    Writes only enqueue (user_id, expense_id, text); a background thread embeds them
+    in batches and persists each user's index to `<index_dir>/user_<id>.npz` as
+    float16. Searches are a single matrix-vector product over the user's rows.
+    """
+
+    def __init__(self, index_dir: str = VECTOR_INDEX_DIR, embedder=None):
+        self.index_dir = Path(index_dir)
+        self.embedder = embedder or MiniLMEmbedder()
+        self._users = {}
+        self._users_lock = threading.Lock()
+        # Held by every write to a user's index and by its backfill, so a write that
+        # races the first search is either in the backfill's query or applied after it
+        self._user_locks = {}
+        self._queue = queue.Queue()
+        self._worker = None
+        self._disabled = False
+
+    @property
+    def available(self) -> bool:
+        return NUMPY_AVAILABLE and not self._disabled
+
+    def _path(self, user_id: int) -> Path:
+        return self.index_dir / f"user_{user_id}.npz"
+
+    def _user_lock(self, user_id: int) -> threading.RLock:
+        with self._users_lock:
+            return self._user_locks.setdefault(user_id, threading.RLock())
+
+    def _embed(self, texts: list) -> "np.ndarray":
+        try:
+            return self.embedder(texts)
+        except (ImportError, FileNotFoundError) as e:
+            # No embedding model on this server: stop indexing instead of failing every batch
+            if not self._disabled:
+                logger.warning("Semantic search disabled: %s", e)
+            self._disabled = True
+            raise
+
+    def _get_user(self, user_id: int, create: bool = True):
+        with self._users_lock:
+            user_vectors = self._users.get(user_id)
+            if user_vectors is None:
+                path = self._path(user_id)
+                if path.exists():
+                    with np.load(path) as data:
+                        user_vectors = _UserVectors(data["ids"], data["vectors"].astype(np.float32))
+                elif create:
+                    user_vectors = _UserVectors(np.zeros(0, dtype=np.int64), None)
+                else:
+                    return None
+                self._users[user_id] = user_vectors
+            return user_vectors
+
+    # --- write path ---
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="semantic-index", daemon=True)
+            self._worker.start()
+
+    def enqueue(self, user_id: int, expense_id: int, text: str | None):
+        self.enqueue_many(user_id, [(expense_id, text)])
+
+    def enqueue_many(self, user_id: int, expenses: list):
+        """Queues (expense_id, text) pairs of one user for embedding."""
+        if not self.available:
+            return
+        for expense_id, text in expenses:
+            if text:
+                self._queue.put(("add", user_id, expense_id, text))
+        self._ensure_worker()
+
+    def enqueue_delete(self, user_id: int, expense_id: int):
+        if not self.available:
+            return
+        self._queue.put(("delete", user_id, expense_id, None))
+        self._ensure_worker()
+
+    def drop_user(self, user_id: int):
+        with self._user_lock(user_id):
+            with self._users_lock:
+                self._users.pop(user_id, None)
+            self._path(user_id).unlink(missing_ok=True)
+
+    def _run(self):
+        while True:
+            try:
+                items = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                self.flush()
+                continue
+            while len(items) < EMBED_BATCH_SIZE * 4:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(items)
+            except (ImportError, FileNotFoundError):
+                return
+            except Exception:
+                logger.exception("Semantic index worker failed to apply %d items", len(items))
+
+    def _apply(self, items: list):
+        to_embed = [item for item in items if item[0] == "add"]
+        vectors = self._embed([text for _, _, _, text in to_embed]) if to_embed else None
+        embedded = {(item[1], item[2]): vectors[i] for i, item in enumerate(to_embed)}
+
+        pending = {}  # user_id -> {expense_id: vector}, applied in one upsert per user
+        for action, user_id, expense_id, _ in items:
+            if action == "add":
+                pending.setdefault(user_id, {})[expense_id] = embedded[(user_id, expense_id)]
+                continue
+            if expense_id in pending.get(user_id, {}):
+                del pending[user_id][expense_id]
+            self._delete(user_id, expense_id)
+
+        for user_id, vectors_by_id in pending.items():
+            if vectors_by_id:
+                # Users without an index yet get their whole history on first search
+                self._upsert(user_id, list(vectors_by_id), np.asarray(list(vectors_by_id.values())), create=False)
+
+    def _upsert(self, user_id: int, expense_ids: list, vectors: "np.ndarray", create: bool = True):
+        with self._user_lock(user_id):
+            user_vectors = self._get_user(user_id, create=create)
+            if user_vectors is None:
+                return
+            with user_vectors.lock:
+                new_ids, new_rows = [], []
+                for expense_id, vector in zip(expense_ids, vectors):
+                    row = user_vectors.position.get(int(expense_id))
+                    if row is not None:
+                        user_vectors.vectors[row] = vector
+                    else:
+                        new_ids.append(expense_id)
+                        new_rows.append(vector)
+                if new_ids:
+                    start = len(user_vectors.ids)
+                    user_vectors.ids = np.concatenate([user_vectors.ids, np.asarray(new_ids, dtype=np.int64)])
+                    stacked = np.asarray(new_rows, dtype=np.float32)
+                    user_vectors.vectors = stacked if user_vectors.vectors is None else np.vstack([user_vectors.vectors, stacked])
+                    for offset, expense_id in enumerate(new_ids):
+                        user_vectors.position[int(expense_id)] = start + offset
+                user_vectors.dirty = True
+
+    def _delete(self, user_id: int, expense_id: int):
+        with self._user_lock(user_id):
+            user_vectors = self._get_user(user_id, create=False)
+            if user_vectors is None:
+                return
+            with user_vectors.lock:
+                row = user_vectors.position.get(int(expense_id))
+                if row is None:
+                    return
+                keep = np.ones(len(user_vectors.ids), dtype=bool)
+                keep[row] = False
+                user_vectors.ids = user_vectors.ids[keep]
+                user_vectors.vectors = user_vectors.vectors[keep]
+                user_vectors.position = {int(i): r for r, i in enumerate(user_vectors.ids)}
+                user_vectors.dirty = True
+
+    def flush(self):
+        """Writes every changed user index to disk."""
+        with self._users_lock:
+            users = list(self._users.items())
+        for user_id, user_vectors in users:
+            if not user_vectors.dirty or user_vectors.vectors is None:
+                continue
+            with user_vectors.lock:
+                self.index_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = self._path(user_id).with_suffix(".tmp.npz")
+                np.savez(tmp_path, ids=user_vectors.ids, vectors=user_vectors.vectors.astype(np.float16))
+                os.replace(tmp_path, self._path(user_id))
+                user_vectors.dirty = False
+
+    # --- read path ---
+
+    def backfill(self, db: Session, user_id: int):
+        """
+        Embeds the user's whole history; used the first time a user searches. Writes
+        for users without an index are skipped until then, since this picks them up.
+        """
+        with self._user_lock(user_id):
+            if self._get_user(user_id, create=False) is not None:
+                return  # built by a concurrent search
+            rows = db.query(models.Expense.id, models.Expense.description).filter(
+                models.Expense.user_id == user_id
+            ).all()
+            rows = [(expense_id, description) for expense_id, description in rows if description]
+            if rows:
+                vectors = self._embed([description for _, description in rows])
+                self._upsert(user_id, [expense_id for expense_id, _ in rows], vectors)
+                self.flush()
+            else:
+                # An empty index, kept in memory, so later searches do not query again
+                # and the user's next writes are indexed
+                self._get_user(user_id)
+
+    def search(self, db: Session, user_id: int, query: str, k: int = 10) -> list:
+        """Returns up to k (expense_id, score) pairs, best match first."""
+        if self._get_user(user_id, create=False) is None:
+            self.backfill(db, user_id)
+        user_vectors = self._get_user(user_id, create=False)
+        if user_vectors is None or user_vectors.vectors is None or not len(user_vectors.ids):
+            return []
+
+        query_vector = self._embed([query])[0]
+        with user_vectors.lock:
+            scores = user_vectors.vectors @ query_vector
+            ids = user_vectors.ids
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+semantic_index = SemanticIndex()
@@ -0,0 +1,241 @@
+"""
+Bulk import of bank statements (CSV or OFX).
+
+Rows are parsed lazily from the file, categorised a chunk at a time (the user's own
+history first, then one batched classifier call for the rest) and inserted with
+one executemany per chunk. Everything runs in a single transaction: a statement
+is imported completely or not at all.
+"""
+
+import csv
+import re
+from datetime import datetime
+from itertools import islice
+
+from dateutil import parser as date_parser
+from sqlalchemy.orm import Session
+
+from services.amount_parser import parse_amount
+
+from . import models, summary_crud
+from .category_memory import category_memory
+from .semantic_index import semantic_index
+from .response_cache import response_cache
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+DEFAULT_CATEGORY = "Other"
+
+DATE_COLUMNS = ("date", "transaction date", "posted date", "posting date", "booking date", "value date")
+DESCRIPTION_COLUMNS = ("description", "details", "memo", "narrative", "payee", "name", "merchant")
+AMOUNT_COLUMNS = ("amount", "transaction amount", "value")
+DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals", "money out", "paid out")
+CREDIT_COLUMNS = ("credit", "deposit", "deposits", "money in", "paid in")
+CATEGORY_COLUMNS = ("category",)
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_DEBIT_MARK = re.compile(r"^[^\d]*[-(]|DR\s*$", re.IGNORECASE)
+
+
+def detect_format(filename: str | None, first_line: str) -> str:
+    if (filename or "").lower().endswith((".ofx", ".qfx")) or first_line.lstrip().upper().startswith(("OFXHEADER", "<?XML", "<OFX")):
+        return "ofx"
+    return "csv"
+
+
+def parse_date(text: str) -> datetime:
+    text = text.strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return date_parser.parse(text)
+
+
+def parse_signed_amount(text: str) -> float:
+    """Statement amount with its sign: "-12.50", "(12.50)" and "12.50 DR" are debits."""
+    text = text.strip()
+    amount = parse_amount(text)
+    if amount is None:
+        raise ValueError(f"no amount in {text!r}")
+    if _DEBIT_MARK.search(text):
+        return -amount
+    return amount
+
+
+def _find_column(fieldnames: dict, candidates: tuple):
+    for candidate in candidates:
+        if candidate in fieldnames:
+            return fieldnames[candidate]
+    return None
+
+
+def parse_csv(lines):
+    """
+    Yields (line_number, record) for each data row, where record is
+    (date, description, signed amount, category or None) or an error message.
+    Debits are negative; a separate debit/credit column pair is also understood.
+    """
+    reader = csv.DictReader(lines)
+    try:
+        fieldnames = {name.strip().lower(): name for name in reader.fieldnames or []}
+    except csv.Error as e:
+        raise ValueError(f"unreadable CSV header: {e}") from e
+    date_column = _find_column(fieldnames, DATE_COLUMNS)
+    description_column = _find_column(fieldnames, DESCRIPTION_COLUMNS)
+    amount_column = _find_column(fieldnames, AMOUNT_COLUMNS)
+    debit_column = _find_column(fieldnames, DEBIT_COLUMNS)
+    credit_column = _find_column(fieldnames, CREDIT_COLUMNS)
+    category_column = _find_column(fieldnames, CATEGORY_COLUMNS)
+    if not date_column or not description_column or not (amount_column or debit_column or credit_column):
+        raise ValueError("CSV needs a date, a description and an amount (or debit/credit) column")
+
+    while True:
+        # A malformed file (a NUL byte, an oversized field) is a ValueError like any other bad input
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            raise ValueError(f"unreadable CSV at line {reader.line_num}: {e}") from e
+        try:
+            if amount_column and (row.get(amount_column) or "").strip():
+                amount = parse_signed_amount(row[amount_column])
+            elif debit_column and (row.get(debit_column) or "").strip():
+                amount = -abs(parse_signed_amount(row[debit_column]))
+            elif credit_column and (row.get(credit_column) or "").strip():
+                amount = abs(parse_signed_amount(row[credit_column]))
+            else:
+                raise ValueError("no amount")
+            category = (row.get(category_column) or "").strip() if category_column else ""
+            record = (
+                parse_date(row[date_column] or ""),
+                (row[description_column] or "").strip(),
+                amount,
+                category or None
+            )
+        except (ValueError, OverflowError) as e:
+            record = str(e) or "unreadable row"
+        yield reader.line_num, record
+
+
+def _ofx_record(fields: dict):
+    posted = fields.get("DTPOSTED", "")
+    date = datetime.strptime(posted[:14], "%Y%m%d%H%M%S") if len(posted) >= 14 else datetime.strptime(posted[:8], "%Y%m%d")
+    name, memo = fields.get("NAME", "").strip(), fields.get("MEMO", "").strip()
+    description = name if not memo or memo == name else f"{name} {memo}".strip()
+    return date, description, parse_signed_amount(fields.get("TRNAMT", "")), None
+
+
+def parse_ofx(lines):
+    """Yields (transaction_number, record) like parse_csv, from SGML or XML OFX."""
+    fields = None
+    number = 0
+    for line in lines:
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN" and not closing:
+                fields = {}
+            elif tag == "STMTTRN" and closing and fields is not None:
+                number += 1
+                try:
+                    record = _ofx_record(fields)
+                except ValueError as e:
+                    record = str(e) or "unreadable transaction"
+                yield number, record
+                fields = None
+            elif fields is not None and not closing:
+                fields[tag] = value.strip()
+
+
+def _categorise(db: Session, user_id: int, descriptions: list, classify) -> list:
+    """Known descriptions from the user's history first, one classifier batch for the rest."""
+    categories = [category_memory.lookup(db, user_id, text) for text in descriptions]
+    # A blank description gets the default category without a model call
+    misses = [i for i, category in enumerate(categories) if category is None and descriptions[i]]
+    if misses and classify is not None:
+        for i, category in zip(misses, classify([descriptions[i] for i in misses])):
+            categories[i] = category
+    return [category or DEFAULT_CATEGORY for category in categories]
+
+
+def import_statement(db: Session, user_id: int, records, classify=None, progress=None,
+                     chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Imports the (number, record) pairs produced by parse_csv/parse_ofx. Debits become
+    expenses and credits incomes. `classify(texts)` categorises expenses the file
+    does not; `progress(rows_read)` is called after every chunk. Commits once at the
+    end and rolls back on any database error.
+    """
+    result = {"expenses": 0, "incomes": 0, "skipped": 0, "errors": []}
+    monthly = {}  # (year, month) -> [income, expenses], applied as one delta per month
+    rows_read = 0
+    records = iter(records)
+
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            rows_read += len(chunk)
+
+            valid = []
+            for number, record in chunk:
+                if isinstance(record, str) or not record[2]:
+                    result["skipped"] += 1
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append(f"row {number}: {record if isinstance(record, str) else 'zero amount'}")
+                    continue
+                valid.append(record)
+
+            debits = [record for record in valid if record[2] < 0]
+            credits = [record for record in valid if record[2] > 0]
+            to_classify = [record[1] for record in debits if record[3] is None]
+            classified = iter(_categorise(db, user_id, to_classify, classify)) if to_classify else iter(())
+
+            expenses = []
+            for date, description, amount, category in debits:
+                expenses.append({
+                    "amount": -amount,
+                    "category": category or next(classified),
+                    # The column is NOT NULL; "" keeps a missing description from reading like a category
+                    "description": description or "",
+                    "date": date,
+                    "user_id": user_id
+                })
+                monthly.setdefault((date.year, date.month), [0.0, 0.0])[1] += -amount
+            incomes = []
+            for date, description, amount, category in credits:
+                incomes.append({
+                    "amount": amount,
+                    "category": category or DEFAULT_CATEGORY,
+                    "description": description or None,
+                    "income_date": date,
+                    "user_id": user_id
+                })
+                monthly.setdefault((date.year, date.month), [0.0, 0.0])[0] += amount
+
+            if expenses:
+                db.execute(models.Expense.__table__.insert(), expenses)
+            if incomes:
+                db.execute(models.Income.__table__.insert(), incomes)
+            result["expenses"] += len(expenses)
+            result["incomes"] += len(incomes)
+            if progress:
+                progress(rows_read)
+
+        for (year, month), (income_total, expense_total) in monthly.items():
+            summary_crud.apply_summary_delta(
+                db, user_id, datetime(year, month, 1), income_delta=income_total, expense_delta=expense_total
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if result["expenses"] or result["incomes"]:
+        response_cache.bump(user_id)
+    if result["expenses"]:
+        # Rebuilt from the database on next use, imported rows included
+        category_memory.forget_user(user_id)
+        semantic_index.drop_user(user_id)
+    return result
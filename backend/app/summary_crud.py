@@ -1,53 +1,100 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from . import models
-from datetime import date
+from .date_ranges import recent_months
+from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 
-def get_or_create_monthly_summary(db: Session, user_id: int, year: int, month: int):
+def get_monthly_summary(db: Session, user_id: int, year: int, month: int):
     """
-    This function calculates monthly summary fresh each time to ensure real-time updates.
+    Returns the stored totals for a month with a single indexed lookup.
+    Totals are kept current by the expense/income writes in crud.py (see
+    apply_summary_delta), so reading never recalculates or writes anything.
     """
-    
-    # Always calculate fresh to ensure real-time updates
-    # Delete existing cached summary if it exists
-    db.query(models.MonthlySummary).filter(
+    summary = db.query(models.MonthlySummary).filter(
         models.MonthlySummary.user_id == user_id,
         models.MonthlySummary.year == year,
         models.MonthlySummary.month == month
-    ).delete()
-    db.commit()
+    ).first()
+    
+    if summary is None:
+        # Nothing recorded for that month; a transient row keeps callers simple
+        summary = models.MonthlySummary(
+            year=year,
+            month=month,
+            total_income=0.0,
+            total_expenses=0.0,
+            user_id=user_id
+        )
+    return summary
 
-    # 2. If no summary exists, we must calculate it.
-    # Calculate total income for the given month and year
-    total_income = db.query(func.sum(models.Income.amount)).filter(
-        models.Income.user_id == user_id,
-        extract('year', models.Income.income_date) == year,
-        extract('month', models.Income.income_date) == month
-    ).scalar() or 0.0
 
-    # Calculate total expenses for the given month and year
-    total_expenses = db.query(func.sum(models.Expense.amount)).filter(
-        models.Expense.user_id == user_id,
-        extract('year', models.Expense.date) == year,
-        extract('month', models.Expense.date) == month
-    ).scalar() or 0.0
+def apply_summary_delta(db: Session, user_id: int, when: datetime, income_delta: float = 0.0, expense_delta: float = 0.0):
+    """
+    Adds the given amounts to the (user, year, month) totals of `when`, creating the
+    row if needed. Runs as one atomic upsert in the caller's transaction and does
+    not commit, so the summary changes together with the transaction row.
+    """
+    if not income_delta and not expense_delta:
+        return
+    
+    table = models.MonthlySummary.__table__
+    values = {
+        "user_id": user_id,
+        "year": when.year,
+        "month": when.month,
+        "total_income": income_delta,
+        "total_expenses": expense_delta
+    }
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "mysql":
+        stmt = mysql_insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            total_income=table.c.total_income + stmt.inserted.total_income,
+            total_expenses=table.c.total_expenses + stmt.inserted.total_expenses
+        )
+        db.execute(stmt)
+    elif dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "year", "month"],
+            set_={
+                "total_income": table.c.total_income + stmt.excluded.total_income,
+                "total_expenses": table.c.total_expenses + stmt.excluded.total_expenses
+            }
+        )
+        db.execute(stmt)
+    else:
+        updated = db.execute(
+            table.update().where(
+                table.c.user_id == user_id,
+                table.c.year == when.year,
+                table.c.month == when.month
+            ).values(
+                total_income=table.c.total_income + income_delta,
+                total_expenses=table.c.total_expenses + expense_delta
+            )
+        ).rowcount
+        if not updated:
+            db.execute(table.insert().values(**values))
 
-    # 3. Create a new summary record with our calculated values
-    new_summary = models.MonthlySummary(
-        year=year,
-        month=month,
-        total_income=total_income,
-        total_expenses=total_expenses,
-        user_id=user_id
-    )
 
-    # 4. Save the new summary to the database for future requests
-    db.add(new_summary)
-    db.commit()
-    db.refresh(new_summary)
-    
-    return new_summary
+def reset_summary_totals(db: Session, user_id: int, income: bool = False, expenses: bool = False):
+    """Zeroes a user's income and/or expense totals for every month. Does not commit."""
+    values = {}
+    if income:
+        values[models.MonthlySummary.total_income] = 0.0
+    if expenses:
+        values[models.MonthlySummary.total_expenses] = 0.0
+    if values:
+        db.query(models.MonthlySummary).filter(
+            models.MonthlySummary.user_id == user_id
+        ).update(values, synchronize_session=False)
 
 
 def get_running_balance(db: Session, user_id: int):
@@ -68,52 +115,66 @@ def get_running_balance(db: Session, user_id: int):
     
     return total_income - total_expenses
 
+def _monthly_totals(db: Session, user_id: int, date_column, start: datetime, end: datetime):
+    """One grouped query: {(year, month): total amount} for the rows of `date_column`'s table."""
+    model = date_column.class_
+    year = extract('year', date_column)
+    month = extract('month', date_column)
+    rows = db.query(year, month, func.sum(model.amount)).filter(
+        model.user_id == user_id,
+        date_column >= start,
+        date_column < end
+    ).group_by(year, month).all()
+    return {(int(y), int(m)): total or 0.0 for y, m, total in rows}
+
+def _monthly_series(db: Session, user_id: int, months: int):
+    """
+    Income and expense totals for the last `months` months, oldest first. Two grouped
+    queries cover the whole range; months without rows are filled with zeros.
+    """
+    month_list, start, end = recent_months(months)
+    expense_totals = _monthly_totals(db, user_id, models.Expense.date, start, end)
+    income_totals = _monthly_totals(db, user_id, models.Income.income_date, start, end)
+    return [
+        (year, month, income_totals.get((year, month), 0.0), expense_totals.get((year, month), 0.0))
+        for year, month in month_list
+    ]
+
 def get_historical_summary(db: Session, user_id: int, months: int = 6):
     """
     Retrieves total expenses and income for the specified number of months.
     """
-    today = date.today()
-    results = []
-    for i in range(months):
-        target_date = today - relativedelta(months=i)
-        year, month = target_date.year, target_date.month
-        
-        summary = get_or_create_monthly_summary(db, user_id, year, month)
-        results.append({
+    return [
+        {
             "year": year,
             "month": month,
-            "total_expenses": summary.total_expenses,
-            "total_income": summary.total_income
-        })
-    
-    return results[::-1]
+            "total_expenses": total_expenses,
+            "total_income": total_income
+        }
+        for year, month, total_income, total_expenses in _monthly_series(db, user_id, months)
+    ]
 
 def get_category_breakdown(db: Session, user_id: int, months: int = 6):
     """
     Get category breakdown for expenses over specified months.
     """
-    from collections import defaultdict
-    
     today = date.today()
     start_date = today - relativedelta(months=months)
     
-    # Get expenses for the period
-    expenses = db.query(models.Expense).filter(
+    # One row per category, summed by the database
+    category_totals = db.query(
+        models.Expense.category, func.sum(models.Expense.amount)
+    ).filter(
         models.Expense.user_id == user_id,
         models.Expense.date >= start_date
-    ).all()
-    
-    category_totals = defaultdict(float)
-    total_amount = 0
+    ).group_by(models.Expense.category).order_by(func.sum(models.Expense.amount).desc()).all()
     
-    for expense in expenses:
-        category_totals[expense.category] += expense.amount
-        total_amount += expense.amount
+    total_amount = sum(amount for _, amount in category_totals)
     
     colors = ['#EF4444', '#F59E0B', '#10B981', '#3B82F6', '#8B5CF6', '#EC4899', '#F97316', '#06B6D4']
     
     results = []
-    for i, (category, amount) in enumerate(sorted(category_totals.items(), key=lambda x: x[1], reverse=True)):
+    for i, (category, amount) in enumerate(category_totals):
         percentage = (amount / total_amount * 100) if total_amount > 0 else 0
         results.append({
             "category": category,
@@ -128,36 +189,26 @@ def get_spending_trends(db: Session, user_id: int, months: int = 6):
     """
     Get spending trends with income and savings data.
     """
-    today = date.today()
-    results = []
-    
-    for i in range(months):
-        target_date = today - relativedelta(months=i)
-        year, month = target_date.year, target_date.month
-        
-        summary = get_or_create_monthly_summary(db, user_id, year, month)
-        net_savings = summary.total_income - summary.total_expenses
-        
-        results.append({
+    return [
+        {
             "year": year,
             "month": month,
-            "total_expenses": summary.total_expenses,
-            "total_income": summary.total_income,
-            "net_savings": net_savings
-        })
-    
-    return results[::-1]
+            "total_expenses": total_expenses,
+            "total_income": total_income,
+            "net_savings": total_income - total_expenses
+        }
+        for year, month, total_income, total_expenses in _monthly_series(db, user_id, months)
+    ]
 
 def get_analytics_stats(db: Session, user_id: int):
     """
     Get analytics statistics for the dashboard.
     """
-    from collections import Counter
-    
-    # Get all expenses
-    expenses = db.query(models.Expense).filter(models.Expense.user_id == user_id).all()
+    total_expenses, transaction_count = db.query(
+        func.sum(models.Expense.amount), func.count(models.Expense.id)
+    ).filter(models.Expense.user_id == user_id).one()
     
-    if not expenses:
+    if not transaction_count:
         return {
             "total_expenses": 0,
             "daily_average": 0,
@@ -166,13 +217,14 @@ def get_analytics_stats(db: Session, user_id: int):
             "savings_rate": 0
         }
     
-    total_expenses = sum(expense.amount for expense in expenses)
-    transaction_count = len(expenses)
-    daily_average = total_expenses / 30 if expenses else 0
+    daily_average = total_expenses / 30
     
-    # Get top category
-    category_counts = Counter(expense.category for expense in expenses)
-    top_category = category_counts.most_common(1)[0][0] if category_counts else "None"
+    # Get top category (most transactions)
+    top_category = db.query(models.Expense.category).filter(
+        models.Expense.user_id == user_id
+    ).group_by(models.Expense.category).order_by(
+        func.count(models.Expense.id).desc(), models.Expense.category
+    ).limit(1).scalar() or "None"
     
     # Calculate savings rate
     total_income = db.query(func.sum(models.Income.amount)).filter(
@@ -187,4 +239,4 @@ def get_analytics_stats(db: Session, user_id: int):
         "top_category": top_category,
         "transaction_count": transaction_count,
         "savings_rate": savings_rate
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,119 @@
+"""
+Full-text search over transaction descriptions and categories.
+
+MySQL uses a FULLTEXT index with MATCH ... AGAINST in boolean mode; SQLite uses an
+FTS5 trigram table kept in sync with triggers. Both are created by the Alembic
+migration and, for create_all() setups, by the DDL events registered in models.py.
+Other databases, SQLite builds older than 3.34 (no trigram tokenizer) and terms too
+short for the index fall back to ILIKE.
+
+The indexed searches match each word of the term separately: every word must
+appear, in any order ("kfc lunch" finds "Lunch at KFC"). The ILIKE fallback
+matches the whole term as one substring, as all searches did before the indexes.
+"""
+
+import re
+import sqlite3
+import weakref
+
+from sqlalchemy import and_, literal_column, or_, select, text
+from sqlalchemy.dialects.mysql import match
+
+# Shortest term the indexes can answer (InnoDB ft_min_token_size, FTS5 trigrams)
+MIN_TERM_LENGTH = 3
+# SQLAlchemy names the dialect "mariadb" for mariadb:// URLs
+MYSQL_DIALECTS = ("mysql", "mariadb")
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+# The FTS5 trigram tokenizer needs SQLite 3.34 or later
+SQLITE_TRIGRAM_AVAILABLE = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+# engine -> {table name: bool}. Keyed by the engine itself, since separate in-memory
+# "sqlite://" engines share a URL but not their tables
+_fts_tables = weakref.WeakKeyDictionary()
+
+
+def sqlite_fts_supported(*args, **kwargs) -> bool:
+    """execute_if() callable for the SQLite FTS DDL in models.py."""
+    return SQLITE_TRIGRAM_AVAILABLE
+
+
+def mysql_fulltext_index_name(table_name: str) -> str:
+    return f"ft_{table_name}_description_category"
+
+
+def mysql_fulltext_ddl(table_name: str) -> str:
+    return f"CREATE FULLTEXT INDEX {mysql_fulltext_index_name(table_name)} ON {table_name} (description, category)"
+
+
+def sqlite_fts_ddl(table_name: str) -> list:
+    """The FTS5 table and the triggers that keep it in step with `table_name`."""
+    fts = f"{table_name}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"description, category, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, description, category) VALUES (new.id, new.description, new.category); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, description, category) VALUES ('delete', old.id, old.description, old.category); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, description, category) VALUES ('delete', old.id, old.description, old.category); "
+        f"INSERT INTO {fts}(rowid, description, category) VALUES (new.id, new.description, new.category); END",
+    ]
+
+
+def _has_fts_table(session, table_name: str) -> bool:
+    bind = session.get_bind()
+    tables = _fts_tables.setdefault(getattr(bind, "engine", bind), {})
+    if table_name not in tables:
+        found = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": f"{table_name}_fts"}
+        ).first()
+        tables[table_name] = found is not None
+    return tables[table_name]
+
+
+def _like_filter(query, model, term: str):
+    return query.filter(or_(
+        model.description.ilike(f"%{term}%"),
+        model.category.ilike(f"%{term}%")
+    ))
+
+
+def apply_search(query, model, term: str, ranked: bool = True, session=None):
+    """
+    Restricts a query on `model` (Expense or Income) to rows matching `term`. Works on
+    ORM queries and, given the `session`, on Core select() statements.
+    With an index every word must match, and a word also matches longer words it
+    starts ("piz" finds "pizza"); the ILIKE fallback matches the term as a whole.
+
+    Returns (query, order_by): order_by puts the most relevant rows first, or is None
+    when the backend cannot rank or `ranked` is False.
+    """
+    term = term.strip()
+    words = _WORDS.findall(term.lower())
+    indexable = bool(words) and all(len(word) >= MIN_TERM_LENGTH for word in words)
+    session = session or query.session
+    dialect = session.get_bind().dialect.name
+    table_name = model.__tablename__
+
+    if dialect in MYSQL_DIALECTS and indexable:
+        relevance = match(model.description, model.category, against=" ".join(f"+{word}*" for word in words))
+        relevance = relevance.in_boolean_mode()
+        return query.filter(relevance), (relevance.desc() if ranked else None)
+
+    if dialect == "sqlite" and indexable and SQLITE_TRIGRAM_AVAILABLE and _has_fts_table(session, table_name):
+        fts = f"{table_name}_fts"
+        # Each word as a quoted trigram phrase: substring (and so prefix) matching
+        fts_query = " AND ".join(f'"{word}"' for word in words)
+        hits = select(
+            literal_column("rowid").label("row_id"),
+            literal_column(f"bm25({fts})").label("rank")
+        ).select_from(text(fts)).where(
+            text(f"{fts} MATCH :fts_query").bindparams(fts_query=fts_query)
+        ).subquery()
+        query = query.join(hits, and_(model.id == hits.c.row_id))
+        return query, (hits.c.rank.asc() if ranked else None)
+
+    return _like_filter(query, model, term), None
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from . import models, schemas, security
+from . import auth_cache, models, schemas, security
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -19,9 +19,11 @@ def create_user(db: Session, user: schemas.UserCreate):
 def update_user_email(db: Session, user_id: int, new_email: str):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
+        old_email = db_user.email
         db_user.email = new_email
         db.commit()
         db.refresh(db_user)
+        auth_cache.forget(old_email)
     return db_user
 
 def update_user_password(db: Session, user_id: int, new_password: str):
@@ -30,4 +32,5 @@ def update_user_password(db: Session, user_id: int, new_password: str):
         db_user.hashed_password = security.get_password_hash(new_password)
         db.commit()
         db.refresh(db_user)
+        auth_cache.forget(db_user.email)
     return db_user
\ No newline at end of file
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the /expenses/ read path.
+
+Compares, on an in-memory SQLite database, the ORM path (Expense instances,
+Pydantic from_attributes validation, JSON encoding as FastAPI does it) with the
+lean one the endpoint now uses (Core row tuples encoded by app.fast_json), for
+1,000- and 10,000-row responses. Query and serialization times are reported
+separately; each is the best of BENCHMARK_REPEATS runs.
+
+    python benchmark_list_endpoints.py
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, fast_json, models, schemas
+from app.database import Base
+
+SIZES = (1000, 10000)
+REPEATS = int(os.getenv("BENCHMARK_REPEATS", "5"))
+CATEGORIES = ["Food & Drinks", "Transport", "Shopping", "Rent", "Healthcare", "Entertainment"]
+
+_expense_list = TypeAdapter(List[schemas.Expense])
+
+
+def make_session(rows: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    start = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(models.Expense.__table__.insert(), [
+            {
+                "amount": round(1 + i % 250 * 1.37, 2),
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "description": f"Expense number {i} at a shop",
+                "date": start + timedelta(minutes=i),
+                "user_id": 1,
+            }
+            for i in range(rows)
+        ])
+    return sessionmaker(bind=engine)
+
+
+def orm_serialize(expenses) -> bytes:
+    # What FastAPI does with a response_model: validate, dump to JSON types, json.dumps
+    content = _expense_list.dump_python(_expense_list.validate_python(expenses), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def best_of(fn):
+    best, result = float("inf"), None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def run(rows: int):
+    Session = make_session(rows)
+
+    def orm_query():
+        with Session() as db:
+            return crud.get_expenses_for_user(db, user_id=1, limit=rows)
+
+    def row_query():
+        with Session() as db:
+            return crud.get_expense_rows_for_user(db, user_id=1, limit=rows)
+
+    orm_query_ms, expenses = best_of(orm_query)
+    orm_serialize_ms, orm_body = best_of(lambda: orm_serialize(expenses))
+    row_query_ms, row_tuples = best_of(row_query)
+    row_serialize_ms, row_body = best_of(lambda: fast_json.dumps_rows(row_tuples))
+    assert json.loads(orm_body) == json.loads(row_body)
+
+    print(f"{rows:>6} rows  ORM: query {orm_query_ms:7.2f} ms + serialize {orm_serialize_ms:7.2f} ms"
+          f"  | rows: query {row_query_ms:7.2f} ms + serialize {row_serialize_ms:7.2f} ms"
+          f"  | serialization {orm_serialize_ms / row_serialize_ms:4.1f}x faster,"
+          f" total {(orm_query_ms + orm_serialize_ms) / (row_query_ms + row_serialize_ms):4.1f}x")
+
+
+if __name__ == "__main__":
+    print(f"JSON encoder: {'orjson' if fast_json.ORJSON_AVAILABLE else 'json (orjson not installed)'}")
+    for size in SIZES:
+        run(size)
@@ -0,0 +1,140 @@
+"""
+Shared fixtures for the backend tests: an in-memory SQLite database with every
+table created and user 1 already added, so each test only seeds its own rows,
+and a TestClient for the app with a stand-in for the AI pipeline.
+"""
+
+import os
+import re
+import sys
+import types
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models, schemas
+from app.database import Base
+
+
+@pytest.fixture
+def make_engine():
+    """Returns a factory for fresh databases, for tests that need more than one."""
+    engines = []
+
+    def make():
+        # One connection shared with any threads (or TestClient) the test starts
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add(models.User(id=1, email="user@example.com", hashed_password="x"))
+            db.commit()
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    db = session_factory()
+    yield db
+    db.close()
+
+
+class FakeAIProcessor:
+    """Stands in for services.ai_processor: an uploaded clip's bytes are its transcript."""
+
+    def __init__(self):
+        self.classified = []
+
+    def classify_texts(self, texts):
+        self.classified.extend(texts)
+        return ["Food & Drinks" if "lunch" in text.lower() else "Other" for text in texts]
+
+    def process_expense_text(self, text, category_lookup=None):
+        text = text.strip()
+        category = category_lookup(text) if category_lookup else None
+        if category is None:
+            category = self.classify_texts([text])[0]
+        amounts = re.findall(r"\d+(?:\.\d+)?", text)
+        return {"description": text, "category": category, "amount": max(map(float, amounts), default=0.0)}
+
+    def process_expense_audio(self, audio_path, category_lookup=None):
+        return self.process_expense_text(Path(audio_path).read_text(), category_lookup)
+
+    def process_expense_audio_batch(self, audio_paths, category_lookup=None):
+        return [self.process_expense_audio(path, category_lookup) for path in audio_paths]
+
+
+@pytest.fixture
+def ai_processor(monkeypatch):
+    # Installed before app.main is first imported, so the models are never loaded
+    fake = FakeAIProcessor()
+    module = types.ModuleType("services.ai_processor")
+    module.ai_processor = fake
+    monkeypatch.setitem(sys.modules, "services.ai_processor", module)
+    from app import main
+    monkeypatch.setattr(main, "ai_processor", fake)
+    return fake
+
+
+def _bearer_user(request: Request):
+    # Tests authenticate as user N with "Authorization: Bearer N"
+    scheme, _, user_id = request.headers.get("Authorization", "").partition(" ")
+    if scheme != "Bearer" or not user_id.isdigit():
+        return None
+    request.state.user_id = int(user_id)
+    return schemas.User(id=int(user_id), email=f"user{user_id}@example.com")
+
+
+@pytest.fixture
+def client(ai_processor, session_factory, monkeypatch, tmp_path):
+    """TestClient for the app on the test database, with bearer tokens that are user ids."""
+    from app import main
+
+    # Uploads are written under ./temp_audio
+    monkeypatch.chdir(tmp_path)
+
+    def session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def current_user(request: Request):
+        user = _bearer_user(request)
+        if user is None:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
+        return user
+
+    # Indexes built from an earlier test's database would answer for this one
+    main.category_memory._indexes.clear()
+    main.app.dependency_overrides = {
+        main.get_db: session,
+        main.get_read_db: session,
+        main.get_current_user: current_user,
+        main.get_optional_current_user: _bearer_user,
+    }
+    yield TestClient(main.app)
+    main.app.dependency_overrides = {}
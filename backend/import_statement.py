@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Imports a CSV or OFX bank statement for a user from the command line.
+
+    python import_statement.py statement.csv --email you@example.com
+    python import_statement.py export.ofx --email you@example.com --no-classify
+"""
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import SessionLocal
+from app import statement_import, user_crud
+
+
+def load_classifier():
+    """The batched expense classifier, or None if the AI models cannot be loaded."""
+    try:
+        from services.ai_processor import ai_processor
+        return ai_processor.classify_texts
+    except Exception as e:
+        print(f"⚠️ Classifier unavailable ({e}); uncategorised expenses will be 'Other'")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a bank statement (CSV or OFX)")
+    parser.add_argument("path", help="statement file")
+    parser.add_argument("--email", required=True, help="account to import into")
+    parser.add_argument("--format", choices=["csv", "ofx"], help="defaults to detecting it from the file")
+    parser.add_argument("--no-classify", action="store_true", help="do not run the classifier, use 'Other'")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = user_crud.get_user_by_email(db, args.email)
+        if user is None:
+            print(f"User {args.email} not found")
+            return 1
+
+        classify = None if args.no_classify else load_classifier()
+        started = time.perf_counter()
+
+        def progress(count):
+            print(f"\r📥 {count:,} rows read ({time.perf_counter() - started:.1f}s)", end="", flush=True)
+
+        with open(args.path, encoding="utf-8-sig", newline="") as lines:
+            first_line = lines.readline()
+            file_format = args.format or statement_import.detect_format(args.path, first_line)
+            parse = statement_import.parse_ofx if file_format == "ofx" else statement_import.parse_csv
+            result = statement_import.import_statement(
+                db, user.id, parse(itertools.chain([first_line], lines)), classify=classify, progress=progress
+            )
+
+        print(f"\n✅ Imported {result['expenses']:,} expenses and {result['incomes']:,} incomes "
+              f"in {time.perf_counter() - started:.1f}s, skipped {result['skipped']:,} rows")
+        for error in result["errors"]:
+            print(f"   {error}")
+        return 0
+    except ValueError as e:
+        print(f"\nCould not read statement: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@
 import torch
 import torchaudio
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import torch.nn.functional as F
 from transformers import (
@@ -13,6 +14,28 @@ from transformers import (
 from pydub import AudioSegment
 import numpy as np
 
+from services.amount_parser import parse_amount
+
+# Label mapping of the fine-tuned classifier (same as the test script)
+CATEGORY_LABELS = {
+    "0": "Charity & Donations",
+    "1": "Education",
+    "2": "Electronics & Gadgets",
+    "3": "Entertainment",
+    "4": "Family & Kids",
+    "5": "Food & Drinks",
+    "6": "Healthcare",
+    "7": "Investments",
+    "8": "Other",
+    "9": "Rent",
+    "10": "Shopping",
+    "11": "Transport",
+    "12": "Utilities & Bills"
+}
+
+# Upper bound on clips sent through Whisper in a single generate() call
+TRANSCRIBE_BATCH_SIZE = 8
+
 # --- Service Class for AI Processing ---
 
 class AIProcessor:
@@ -57,6 +80,57 @@ class AIProcessor:
         
         self.id2label = self.classifier_model.config.id2label
 
+    def _load_audio(self, audio_file_path: str) -> np.ndarray:
+        """Decodes an audio file to normalized 16kHz mono float32 samples."""
+        # Load audio using pydub
+        audio = AudioSegment.from_file(audio_file_path)
+        print(f"Original audio: {len(audio)}ms, {audio.frame_rate}Hz, {audio.channels} channels")
+        
+        # Convert to mono and 16kHz
+        audio = audio.set_channels(1).set_frame_rate(16000)
+        
+        # Convert to numpy array and normalize
+        samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+        
+        # Proper normalization for different bit depths
+        if audio.sample_width == 1:  # 8-bit
+            samples = samples / 128.0
+        elif audio.sample_width == 2:  # 16-bit
+            samples = samples / 32768.0
+        elif audio.sample_width == 4:  # 32-bit
+            samples = samples / 2147483648.0
+        else:
+            samples = samples / np.max(np.abs(samples))  # Fallback normalization
+        
+        print(f"Normalized audio shape: {samples.shape}, range: [{samples.min():.3f}, {samples.max():.3f}]")
+        return samples
+
+    def _transcribe_samples(self, samples_list: list) -> list:
+        """Runs Whisper once over a batch of decoded clips."""
+        # Process with Whisper
+        inputs = self.whisper_processor(
+            samples_list,
+            sampling_rate=16000,
+            return_tensors="pt"
+        )
+        
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        # Force English transcription using forced_decoder_ids
+        forced_decoder_ids = self.whisper_processor.get_decoder_prompt_ids(language="en", task="transcribe")
+        
+        with torch.no_grad():
+            predicted_ids = self.whisper_model.generate(
+                inputs["input_features"],
+                max_length=448,
+                num_beams=1,
+                do_sample=False,
+                forced_decoder_ids=forced_decoder_ids
+            )
+        
+        transcriptions = self.whisper_processor.batch_decode(predicted_ids, skip_special_tokens=True)
+        return [transcription.strip() for transcription in transcriptions]
+
     # --- THIS IS THE CORRECTED, ROBUST FUNCTION ---
     def transcribe_audio(self, audio_file_path: str) -> str:
         """
@@ -64,53 +138,10 @@ class AIProcessor:
         """
         try:
             print(f"Processing audio file: {audio_file_path}")
-            
-            # Load audio using pydub
-            audio = AudioSegment.from_file(audio_file_path)
-            print(f"Original audio: {len(audio)}ms, {audio.frame_rate}Hz, {audio.channels} channels")
-            
-            # Convert to mono and 16kHz
-            audio = audio.set_channels(1).set_frame_rate(16000)
-            
-            # Convert to numpy array and normalize
-            samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
-            
-            # Proper normalization for different bit depths
-            if audio.sample_width == 1:  # 8-bit
-                samples = samples / 128.0
-            elif audio.sample_width == 2:  # 16-bit
-                samples = samples / 32768.0
-            elif audio.sample_width == 4:  # 32-bit
-                samples = samples / 2147483648.0
-            else:
-                samples = samples / np.max(np.abs(samples))  # Fallback normalization
-            
-            print(f"Normalized audio shape: {samples.shape}, range: [{samples.min():.3f}, {samples.max():.3f}]")
-            
-            # Process with Whisper
-            inputs = self.whisper_processor(
-                samples,
-                sampling_rate=16000,
-                return_tensors="pt"
-            )
-            
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Force English transcription using forced_decoder_ids
-            forced_decoder_ids = self.whisper_processor.get_decoder_prompt_ids(language="en", task="transcribe")
-            
-            with torch.no_grad():
-                predicted_ids = self.whisper_model.generate(
-                    inputs["input_features"],
-                    max_length=448,
-                    num_beams=1,
-                    do_sample=False,
-                    forced_decoder_ids=forced_decoder_ids
-                )
-            
-            transcription = self.whisper_processor.batch_decode(predicted_ids, skip_special_tokens=True)[0]
+            samples = self._load_audio(audio_file_path)
+            transcription = self._transcribe_samples([samples])[0]
             print(f"📝 Transcription: '{transcription}'")
-            return transcription.strip()
+            return transcription
             
         except Exception as e:
             print(f"ERROR in transcribe_audio: {e}")
@@ -118,6 +149,37 @@ class AIProcessor:
             traceback.print_exc()
             return ""
 
+    def transcribe_audio_batch(self, audio_file_paths: list) -> list:
+        """
+        Transcribes several audio files. Decoding runs in parallel threads and
+        Whisper sees the clips in batches instead of one generate() call per clip.
+        Clips that cannot be decoded come back as empty strings.
+        """
+        def load(path):
+            try:
+                return self._load_audio(path)
+            except Exception as e:
+                print(f"ERROR decoding {path}: {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=min(4, max(1, len(audio_file_paths)))) as executor:
+            decoded = list(executor.map(load, audio_file_paths))
+        
+        transcriptions = [""] * len(audio_file_paths)
+        ready = [i for i, samples in enumerate(decoded) if samples is not None and samples.size > 0]
+        for start in range(0, len(ready), TRANSCRIBE_BATCH_SIZE):
+            chunk = ready[start:start + TRANSCRIBE_BATCH_SIZE]
+            try:
+                texts = self._transcribe_samples([decoded[i] for i in chunk])
+            except Exception as e:
+                print(f"ERROR in transcribe_audio_batch: {e}")
+                continue
+            for i, text in zip(chunk, texts):
+                transcriptions[i] = text
+        
+        print(f"📝 Transcribed {len(ready)}/{len(audio_file_paths)} clips")
+        return transcriptions
+
     def classify_text(self, text: str) -> str:
         """Pure model classification - exactly like test script."""
         if not text:
@@ -136,53 +198,58 @@ class AIProcessor:
             confidence = probabilities[0][predicted_id].item()
         
         # Use exact same mapping as test script
-        id2label = {
-            "0": "Charity & Donations",
-            "1": "Education",
-            "2": "Electronics & Gadgets",
-            "3": "Entertainment",
-            "4": "Family & Kids",
-            "5": "Food & Drinks",
-            "6": "Healthcare",
-            "7": "Investments",
-            "8": "Other",
-            "9": "Rent",
-            "10": "Shopping",
-            "11": "Transport",
-            "12": "Utilities & Bills"
-        }
-        predicted_category = id2label.get(str(predicted_id), "Other")
+        predicted_category = CATEGORY_LABELS.get(str(predicted_id), "Other")
         print(f"🏷️ Predicted: {predicted_category} (confidence: {confidence:.3f})")
         
         return predicted_category
 
+    def classify_texts(self, texts: list) -> list:
+        """Classifies many texts with one padded forward pass."""
+        categories = ["Other"] * len(texts)
+        indexed = [(i, text) for i, text in enumerate(texts) if text]
+        if not indexed:
+            return categories
+        
+        inputs = self.classifier_tokenizer(
+            [text for _, text in indexed], return_tensors="pt", padding=True, truncation=True
+        )
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        with torch.no_grad():
+            outputs = self.classifier_model(**inputs)
+            predicted_ids = torch.argmax(outputs.logits, dim=1).tolist()
+        
+        for (i, _), predicted_id in zip(indexed, predicted_ids):
+            categories[i] = CATEGORY_LABELS.get(str(predicted_id), "Other")
+        return categories
+
     def extract_amount(self, text: str) -> float:
         """Extracts numerical amount from text, handling commas and various formats."""
-        # Remove common currency words and symbols
-        text = re.sub(r'\b(rupees?|dollars?|usd|pkr|inr)\b', '', text, flags=re.IGNORECASE)
-        
-        # Look for numbers with commas (e.g., "50,000", "1,234.56")
-        comma_matches = re.findall(r'\b\d{1,3}(?:,\d{3})+(?:\.\d+)?\b', text)
-        if comma_matches:
-            # Remove commas and convert to float
-            amount_str = comma_matches[0].replace(',', '')
-            amount = float(amount_str)
-            print(f"💰 Extracted Amount (with commas): {amount}")
-            return amount
-        
-        # Look for regular numbers (e.g., "50000", "123.45")
-        regular_matches = re.findall(r'\b\d+(?:\.\d+)?\b', text)
-        if regular_matches:
-            # Get the largest number (likely the amount)
-            amounts = [float(match) for match in regular_matches]
-            amount = max(amounts)
-            print(f"💰 Extracted Amount: {amount}")
-            return amount
-            
-        print("💰 No amount found, defaulting to 0.0")
-        return 0.0
+        amount = parse_amount(text)
+        if amount is None:
+            print("💰 No amount found, defaulting to 0.0")
+            return 0.0
+        print(f"💰 Extracted Amount: {amount}")
+        return amount
 
-    def process_expense_audio(self, audio_file_path: str) -> dict:
+    def process_expense_text(self, text: str, category_lookup=None) -> dict:
+        """
+        Turns an already transcribed sentence into structured expense data (no ASR).
+        `category_lookup(text)` may answer the category first; the classifier only
+        runs when it returns None.
+        """
+        text = text.strip()
+        category = category_lookup(text) if category_lookup else None
+        if category is None:
+            category = self.classify_text(text)
+        amount = self.extract_amount(text)
+        return {
+            "description": text,
+            "category": category,
+            "amount": amount
+        }
+
+    def process_expense_audio(self, audio_file_path: str, category_lookup=None) -> dict:
         """The main function to process an audio file into structured expense data."""
         transcription = self.transcribe_audio(audio_file_path)
         if not transcription:
@@ -191,13 +258,33 @@ class AIProcessor:
                 "category": "Other",
                 "amount": 0.0
             }
-        category = self.classify_text(transcription)
-        amount = self.extract_amount(transcription)
-        return {
-            "description": transcription,
-            "category": category,
-            "amount": amount
-        }
+        return self.process_expense_text(transcription, category_lookup)
+
+    def process_expense_audio_batch(self, audio_file_paths: list, category_lookup=None) -> list:
+        """Batched counterpart of process_expense_audio, one result per input file."""
+        transcriptions = self.transcribe_audio_batch(audio_file_paths)
+        categories = [
+            category_lookup(text) if category_lookup and text else None
+            for text in transcriptions
+        ]
+        misses = [i for i, text in enumerate(transcriptions) if text and categories[i] is None]
+        for i, category in zip(misses, self.classify_texts([transcriptions[i] for i in misses])):
+            categories[i] = category
+        results = []
+        for transcription, category in zip(transcriptions, categories):
+            if not transcription:
+                results.append({
+                    "description": "Could not understand audio",
+                    "category": "Other",
+                    "amount": 0.0
+                })
+                continue
+            results.append({
+                "description": transcription,
+                "category": category,
+                "amount": self.extract_amount(transcription)
+            })
+        return results
 
 # This makes the AIProcessor a singleton, ensuring we only ever have one instance.
 ai_processor = AIProcessor()
\ No newline at end of file
@@ -0,0 +1,28 @@
+# backend/services/amount_parser.py
+
+import re
+
+_CURRENCY_WORDS = re.compile(r'\b(rupees?|dollars?|usd|pkr|inr)\b', re.IGNORECASE)
+_COMMA_NUMBER = re.compile(r'\b\d{1,3}(?:,\d{3})+(?:\.\d+)?\b')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def parse_amount(text: str):
+    """
+    Extracts the amount from free text, handling commas and currency words.
+    Returns None when the text has no number. Kept free of model imports so the
+    statement importer can use it without loading the AI pipeline.
+    """
+    # Remove common currency words and symbols
+    text = _CURRENCY_WORDS.sub('', text)
+    
+    # Numbers with commas (e.g., "50,000", "1,234.56")
+    comma_match = _COMMA_NUMBER.search(text)
+    if comma_match:
+        return float(comma_match.group(0).replace(',', ''))
+    
+    # Regular numbers (e.g., "50000", "123.45"); the largest is most likely the amount
+    amounts = [float(match) for match in _NUMBER.findall(text)]
+    if amounts:
+        return max(amounts)
+    return None
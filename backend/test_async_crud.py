@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+AsyncSession data layer: async driver URLs and pool class, the async CRUD
+functions, and sync CRUD run on an AsyncSession through run_sync().
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import async_crud, crud, database, models, schemas
+from app.pool_metrics import InstrumentedAsyncAdaptedQueuePool
+
+
+def test_async_driver_and_pool():
+    assert database.async_url("mysql+pymysql://user:secret@db/expenses").drivername == "mysql+aiomysql"
+    assert database.async_url("sqlite:///expenses.db").drivername == "sqlite+aiosqlite"
+    options = database.async_engine_options("mysql+pymysql://user:secret@db/expenses")
+    assert options["poolclass"] is InstrumentedAsyncAdaptedQueuePool
+    assert options["pool_pre_ping"] is True
+
+
+async def _exercise(url: str):
+    engine = create_async_engine(url, **database.async_engine_options(url))
+    Session = async_sessionmaker(engine, sync_session_class=database.AppSession, expire_on_commit=False)
+    try:
+        async with Session() as db:
+            user = await async_crud.create_user(db, schemas.UserCreate(email="a@b.c", password="secret1"))
+            assert (await async_crud.get_user_by_email(db, "a@b.c")).id == user.id
+
+            expense = await async_crud.run_sync(
+                db, crud.create_expense_for_user,
+                expense=schemas.ExpenseCreate(amount=12.5, category="Food", description="lunch"), user_id=user.id
+            )
+            await async_crud.run_sync(
+                db, crud.create_income_for_user,
+                income=schemas.IncomeCreate(amount=100, category="Salary", description="pay"), user_id=user.id
+            )
+            assert await async_crud.get_running_balance(db, user.id) == 87.5
+            summary = await async_crud.get_monthly_summary(db, user.id, expense.date.year, expense.date.month)
+            assert (summary.total_income, summary.total_expenses) == (100, 12.5)
+
+            budget = schemas.BudgetCreate(category="Food", amount=200, year=2026, month=1)
+            await async_crud.create_or_update_budget(db, budget, user.id)
+            budget.amount = 250
+            await async_crud.create_or_update_budget(db, budget, user.id)
+            assert [b.amount for b in await async_crud.get_budgets_for_month(db, user.id, 2026, 1)] == [250]
+
+            goal = await async_crud.create_goal(db, schemas.GoalCreate(name="car", target_amount=1000), user.id)
+            await async_crud.update_goal_progress(db, goal.id, user.id, 50)
+            assert (await async_crud.get_goals(db, user.id))[0].current_amount == 50
+            assert await async_crud.delete_goal(db, goal.id, user.id + 1) is None
+            assert await async_crud.delete_goal(db, goal.id, user.id) is not None
+    finally:
+        await engine.dispose()
+
+
+def test_async_crud_round_trip():
+    path = Path(tempfile.mkdtemp()) / "async.db"
+    models.Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    asyncio.run(_exercise(f"sqlite+aiosqlite:///{path}"))
+
+
+if __name__ == "__main__":
+    test_async_driver_and_pool()
+    test_async_crud_round_trip()
+    print("Async data layer works")
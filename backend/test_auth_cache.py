@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Auth caches behind get_current_user: verified token subjects until expiry, and
+user principals dropped when the email or password changes.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from jose import JWTError, jwt
+
+from app import auth_cache, models, security, user_crud
+
+
+def test_token_subjects_are_cached_until_expiry():
+    auth_cache.clear()
+    token = security.create_access_token({"sub": "a@example.com"})
+    assert auth_cache.token_subject(token) == "a@example.com"
+    assert auth_cache._subjects.get(token) == "a@example.com"
+
+    expired = jwt.encode(
+        {"sub": "a@example.com", "exp": datetime.now(timezone.utc) - timedelta(minutes=1)},
+        security.SECRET_KEY, algorithm=security.ALGORITHM
+    )
+    for bad in (expired, token + "x"):
+        try:
+            auth_cache.token_subject(bad)
+            assert False, "expected a JWTError"
+        except JWTError:
+            pass
+    assert auth_cache._subjects.get(expired) is None
+
+
+def test_principals_are_dropped_on_credential_changes(db):
+    auth_cache.clear()
+    user = models.User(email="old@example.com", hashed_password="x", full_name="A")
+    db.add(user)
+    db.commit()
+
+    principal = auth_cache.remember(user)
+    assert auth_cache.get_principal("old@example.com") == principal
+    assert not hasattr(principal, "hashed_password")
+
+    user_crud.update_user_email(db, user.id, "new@example.com")
+    assert auth_cache.get_principal("old@example.com") is None
+
+    auth_cache.remember(user)
+    user_crud.update_user_password(db, user.id, "secret2")
+    assert auth_cache.get_principal("new@example.com") is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
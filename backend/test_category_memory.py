@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Per-user category memory: repeat phrases answered from the user's history,
+corrections reused, deleted expenses forgotten, and one user's cold-start build
+not blocking another user's lookups.
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.category_memory import CategoryMemory, category_memory, normalize_description
+
+
+def add_second_user(db):
+    db.add(models.User(id=2, email="other@example.com", hashed_password="x"))
+    db.commit()
+
+
+def expense(description, category, amount=10):
+    return schemas.ExpenseCreate(amount=amount, category=category, description=description)
+
+
+def test_normalize_description():
+    assert normalize_description("Lunch at KFC 500 rupees") == "lunch at kfc"
+    assert normalize_description("lunch at kfc for 650") == "lunch at kfc"
+    assert normalize_description("  ") == ""
+
+
+def test_repeat_phrases_and_corrections(db):
+    add_second_user(db)
+    category_memory.forget_user(1)
+    first = crud.create_expense_for_user(db, expense("Lunch at KFC 500", "Food & Drinks"), user_id=1)
+    assert category_memory.lookup(db, 1, "lunch at kfc for 650") == "Food & Drinks"
+    assert category_memory.lookup(db, 1, "flight to karachi") is None
+    assert category_memory.lookup(db, 2, "lunch at kfc") is None
+
+    crud.update_expense_for_user(db, first.id, expense("Lunch at KFC 500", "Entertainment"), user_id=1)
+    assert category_memory.lookup(db, 1, "lunch at kfc 300") == "Entertainment"
+
+
+def test_deleted_expense_is_forgotten(db):
+    category_memory.forget_user(1)
+    older = crud.create_expense_for_user(db, expense("taxi home", "Transport"), user_id=1)
+    correction = crud.create_expense_for_user(db, expense("taxi home", "Shopping"), user_id=1)
+    assert category_memory.lookup(db, 1, "taxi home") == "Shopping"
+
+    # The deleted correction stops being reused; the remaining history answers again
+    crud.delete_expense_for_user(db, correction.id, user_id=1)
+    assert category_memory.lookup(db, 1, "taxi home") == "Transport"
+    crud.delete_expense_for_user(db, older.id, user_id=1)
+    assert category_memory.lookup(db, 1, "taxi home") is None
+
+
+def test_cold_start_only_blocks_its_own_user(make_engine):
+    memory = CategoryMemory()
+    build = memory._build
+    building = threading.Event()
+    release = threading.Event()
+
+    def slow_build(db, user_id):
+        if user_id == 1:
+            building.set()
+            release.wait(5)
+        return build(db, user_id)
+
+    memory._build = slow_build
+    db_one, db_two = sessionmaker(bind=make_engine())(), sessionmaker(bind=make_engine())()
+    add_second_user(db_two)
+    crud.create_expense_for_user(db_two, expense("coffee", "Food & Drinks"), user_id=2)
+
+    thread = threading.Thread(target=memory.lookup, args=(db_one, 1, "coffee"))
+    thread.start()
+    assert building.wait(5)
+    try:
+        # Answered while user 1's index is still being built
+        assert memory.lookup(db_two, 2, "coffee") == "Food & Drinks"
+    finally:
+        release.set()
+        thread.join(5)
+    assert memory.get_stats()["lookups"] == 2
+    assert memory._build_locks == {}
+    db_one.close()
+    db_two.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Conditional GETs through the app: the ETag dependency answers a matching
+If-None-Match with an empty 304 before the endpoint's query runs, and the next
+write to the user's data changes the ETag.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, schemas
+
+USER_1 = {"Authorization": "Bearer 1"}
+
+
+def test_unchanged_list_is_answered_with_304(client, engine, session_factory):
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    first = client.get("/expenses/", headers=USER_1)
+    assert first.status_code == 200 and first.json() == []
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    ran = len(queries)
+    assert ran > 0
+    repeat = client.get("/expenses/", headers={**USER_1, "If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert repeat.headers["etag"] == etag
+    assert len(queries) == ran, "the endpoint ran for a 304"
+
+    # Other parameters are another representation
+    assert client.get("/expenses/?limit=5", headers={**USER_1, "If-None-Match": etag}).status_code == 200
+
+    with session_factory() as db:
+        crud.create_expense_for_user(db, schemas.ExpenseCreate(amount=4, category="Food", description="tea"), user_id=1)
+
+    changed = client.get("/expenses/", headers={**USER_1, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert [expense["description"] for expense in changed.json()] == ["tea"]
+    assert changed.headers["etag"] != etag
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV and Parquet/Arrow exports.
+
+Fills the app database (in-memory SQLite unless DATABASE_URL says otherwise) with
+EXPORT_TEST_ROWS transactions and checks that the export generator quotes fields
+correctly, yields its first chunk before reading everything, and keeps Python
+memory flat while it streams the rest. The columnar checks run when pyarrow is
+installed.
+"""
+
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import arrow_export, crud, csv_export, models
+from app.database import Base, SessionLocal, engine
+
+ROWS = int(os.getenv("EXPORT_TEST_ROWS", "200000"))
+CHUNK = 50000
+# Building the whole file would take tens of MB; streaming needs a few batches
+MAX_PEAK_BYTES = 4 * 1024 * 1024
+
+_ready = False
+
+
+def populate():
+    global _ready
+    if _ready:
+        return
+    Base.metadata.create_all(engine)
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "email": "export@example.com", "hashed_password": "x"}])
+        conn.execute(models.Income.__table__.insert(), [
+            {"amount": 100.0, "category": "Salary", "description": 'pay, "bonus"', "income_date": start - timedelta(days=1), "user_id": 1}
+        ])
+        for offset in range(0, ROWS, CHUNK):
+            conn.execute(models.Expense.__table__.insert(), [
+                {
+                    "amount": 1.5,
+                    "category": "Food",
+                    "description": f"lunch {i}, with friends",
+                    "date": start + timedelta(minutes=i),
+                    "user_id": 1,
+                }
+                for i in range(offset, min(offset + CHUNK, ROWS))
+            ])
+    _ready = True
+
+
+def export_statement():
+    db = SessionLocal()
+    try:
+        return crud.transactions_statement(db, user_id=1)
+    finally:
+        db.close()
+
+
+def test_export_is_valid_csv():
+    populate()
+    content = b"".join(csv_export.stream_transactions_csv(export_statement())).decode()
+    rows = list(csv.reader(io.StringIO(content)))
+
+    assert rows[0] == csv_export.CSV_HEADER
+    assert len(rows) == ROWS + 2
+    assert rows[1][3] == f"lunch {ROWS - 1}, with friends"
+    assert rows[1][4] == "-$1.50"
+    assert rows[-1] == ["2019-12-31", "Income", "Salary", 'pay, "bonus"', "+$100.00"]
+
+
+def test_export_streams_in_constant_memory():
+    populate()
+    chunks = csv_export.stream_transactions_csv(export_statement())
+    tracemalloc.start()
+    began = time.perf_counter()
+    next(chunks)
+    first_chunk = time.perf_counter() - began
+    total = sum(len(chunk) for chunk in chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   first chunk after {first_chunk * 1000:.0f} ms, {total / 1024 / 1024:.1f} MiB streamed, peak {peak / 1024:.0f} KiB")
+
+    assert peak < MAX_PEAK_BYTES
+
+
+def test_columnar_exports_are_typed_and_smaller():
+    if not arrow_export.PYARROW_AVAILABLE:
+        print("   pyarrow not installed, skipping")
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    populate()
+    csv_size = sum(len(chunk) for chunk in csv_export.stream_transactions_csv(export_statement()))
+    parquet = b"".join(arrow_export.stream_transactions(export_statement(), "parquet"))
+    arrow = b"".join(arrow_export.stream_transactions(export_statement(), "arrow"))
+    print(f"   csv {csv_size / 1024:.0f} KiB, parquet {len(parquet) / 1024:.0f} KiB, arrow {len(arrow) / 1024:.0f} KiB")
+
+    table = pq.read_table(io.BytesIO(parquet))
+    assert table.num_rows == ROWS + 1
+    assert table.schema == arrow_export.transaction_schema()
+    assert pq.ParquetFile(io.BytesIO(parquet)).num_row_groups == -(-(ROWS + 1) // arrow_export.ROW_GROUP_SIZE)
+    assert pa.ipc.open_stream(io.BytesIO(arrow)).read_all().num_rows == ROWS + 1
+    assert len(parquet) * 3 < csv_size
+
+
+def test_bad_filters_are_rejected(client):
+    headers = {"Authorization": "Bearer 1"}
+    response = client.post("/transactions/export/filtered", json={"type": "transfers"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown transaction type: transfers"
+    assert client.post("/transactions/export/filtered", json={"startDate": "last week"}, headers=headers).status_code == 400
+    assert client.post("/transactions/export/filtered", json={"format": "xlsx"}, headers=headers).status_code == 400
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-s"]))
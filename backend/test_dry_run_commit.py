@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Dry-run result tokens: a preview is committed from the cached result without
+re-running inference, only once, only by the user who made it, and only until
+the token expires.
+"""
+
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import cache, models
+
+USER_1 = {"Authorization": "Bearer 1"}
+USER_2 = {"Authorization": "Bearer 2"}
+
+
+def dry_run(client, text, headers=USER_1):
+    response = client.post("/process-text-dry-run/", json={"text": text}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_commit_uses_the_cached_result_once(client, ai_processor, db):
+    preview = dry_run(client, "lunch 20")
+    assert preview["result_token"]
+    ai_processor.classified.clear()
+
+    response = client.post("/process-voice/commit/", json={"result_token": preview["result_token"], "amount": 25}, headers=USER_1)
+    assert response.status_code == 200
+    assert (response.json()["description"], response.json()["amount"]) == ("lunch 20", 25.0)
+    assert ai_processor.classified == []
+
+    # A double tap does not create a second expense
+    again = client.post("/process-voice/commit/", json={"result_token": preview["result_token"]}, headers=USER_1)
+    assert again.status_code == 404
+    assert db.query(models.Expense).count() == 1
+
+
+def test_failed_commit_keeps_the_token(client, db):
+    token = dry_run(client, "lunch 20")["result_token"]
+    assert client.post("/process-voice/commit/", json={"result_token": token, "amount": 0}, headers=USER_1).status_code == 400
+    assert client.post("/process-voice/commit/", json={"result_token": token}, headers=USER_1).status_code == 200
+
+
+def test_only_the_owner_can_commit(client, db):
+    db.add(models.User(id=2, email="other@example.com", hashed_password="x"))
+    db.commit()
+    token = dry_run(client, "lunch 20")["result_token"]
+
+    assert client.post("/process-voice/commit/", json={"result_token": token}, headers=USER_2).status_code == 404
+    assert client.post("/process-voice/commit/", json={"result_token": token}).status_code == 401
+    assert db.query(models.Expense).count() == 0
+
+    # The other user's attempt did not use the token up
+    assert client.post("/process-voice/commit/", json={"result_token": token}, headers=USER_1).status_code == 200
+    assert db.query(models.Expense).one().user_id == 1
+
+
+def test_anonymous_dry_runs_get_no_token(client):
+    assert dry_run(client, "lunch 20", headers={})["result_token"] is None
+
+
+def test_expired_token_is_refused(client, monkeypatch, db):
+    from app.main import DRY_RUN_RESULT_TTL_SECONDS  # after the client fixture stubbed the AI pipeline
+
+    token = dry_run(client, "lunch 20")["result_token"]
+    later = cache.time.monotonic() + DRY_RUN_RESULT_TTL_SECONDS + 1
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: later))
+    assert client.post("/process-voice/commit/", json={"result_token": token}, headers=USER_1).status_code == 404
+    assert db.query(models.Expense).count() == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Batch expense mutations: one transaction, per-item status, and idempotency keys
+that make a retried batch replay its outcomes instead of applying them twice.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import batch_crud, crud, models, schemas
+from app.response_cache import response_cache
+
+
+def operation(**fields):
+    return schemas.ExpenseOperation(**fields)
+
+
+def test_batch_applies_and_replays(db):
+    existing = crud.create_expense_for_user(db, schemas.ExpenseCreate(amount=3, category="Food", description="old"), user_id=1)
+    operations = [
+        operation(op="create", idempotency_key="a", expense=schemas.ExpenseCreate(amount=5, category="Food", description="pizza")),
+        operation(op="update", idempotency_key="b", id=existing.id, expense=schemas.ExpenseCreate(amount=7, category="Transport", description="bus")),
+        operation(op="delete", idempotency_key="c", id=12345),
+        operation(op="delete", idempotency_key="d"),
+    ]
+
+    items = batch_crud.apply_expense_batch(db, user_id=1, operations=operations)
+    assert [(item.status, item.replayed) for item in items] == [
+        ("created", False), ("updated", False), ("not_found", False), ("invalid", False)
+    ]
+    assert items[0].expense.description == "pizza"
+    assert db.query(models.Expense).count() == 2
+
+    # The client never saw the response and sends everything again
+    replay = batch_crud.apply_expense_batch(db, user_id=1, operations=operations)
+    assert [(item.status, item.replayed) for item in replay[:3]] == [
+        ("created", True), ("updated", True), ("not_found", True)
+    ]
+    assert replay[0].expense.id == items[0].expense.id
+    assert db.query(models.Expense).count() == 2
+    assert db.query(models.MonthlySummary).one().total_expenses == 12.0
+
+
+def test_keys_are_per_user(db):
+    db.add(models.User(id=2, email="other@example.com", hashed_password="x"))
+    db.commit()
+    create = operation(op="create", idempotency_key="same", expense=schemas.ExpenseCreate(amount=1, category="Food", description="tea"))
+
+    assert batch_crud.apply_expense_batch(db, user_id=1, operations=[create])[0].replayed is False
+    assert batch_crud.apply_expense_batch(db, user_id=2, operations=[create])[0].replayed is False
+    assert db.query(models.Expense).count() == 2
+
+
+def test_database_errors_are_not_returned_to_the_client(db):
+    add_expense = crud._add_expense
+
+    def failing_add(db, expense, user_id):
+        if expense.description == "bad":
+            raise OperationalError("INSERT INTO expenses ...", {}, Exception("disk I/O error"))
+        return add_expense(db, expense, user_id)
+
+    crud._add_expense = failing_add
+    try:
+        items = batch_crud.apply_expense_batch(db, user_id=1, operations=[
+            operation(op="create", idempotency_key="ok", expense=schemas.ExpenseCreate(amount=1, category="Food", description="tea")),
+            operation(op="create", idempotency_key="bad", expense=schemas.ExpenseCreate(amount=1, category="Food", description="bad")),
+        ])
+    finally:
+        crud._add_expense = add_expense
+    assert [item.status for item in items] == ["created", "failed"]
+    assert items[1].detail == "Could not apply operation"
+    assert db.query(models.Expense).count() == 1
+
+
+
+def test_only_key_conflicts_are_reported_as_in_progress(db, monkeypatch):
+    add_expense = crud._add_expense
+
+    def add_with_conflicts(db, expense, user_id):
+        if expense.description == "raced":
+            # Another request stored the same key first
+            db.add(models.IdempotencyKey(user_id=user_id, key="raced", result="{}"))
+        if expense.description == "no category":
+            db.add(models.Expense(amount=expense.amount, category=None, user_id=user_id))
+            db.flush()
+        return add_expense(db, expense, user_id)
+
+    monkeypatch.setattr(crud, "_add_expense", add_with_conflicts)
+    items = batch_crud.apply_expense_batch(db, user_id=1, operations=[
+        operation(op="create", idempotency_key="raced", expense=schemas.ExpenseCreate(amount=1, category="Food", description="raced")),
+        operation(op="create", idempotency_key="bad", expense=schemas.ExpenseCreate(amount=1, category="Food", description="no category")),
+    ])
+    assert [(item.status, item.detail) for item in items] == [
+        ("failed", "Operation is already being applied"),
+        ("invalid", "Expense was rejected by the database"),
+    ]
+    assert db.query(models.Expense).count() == 0
+
+
+def test_cache_is_bumped_once_per_batch(db, monkeypatch):
+    bumps = []
+    monkeypatch.setattr(response_cache, "bump", bumps.append)
+    existing = crud.create_expense_for_user(db, schemas.ExpenseCreate(amount=3, category="Food", description="old"), user_id=1)
+    bumps.clear()
+
+    batch_crud.apply_expense_batch(db, user_id=1, operations=[
+        operation(op="create", idempotency_key=str(i), expense=schemas.ExpenseCreate(amount=1, category="Food", description="tea"))
+        for i in range(3)
+    ] + [operation(op="delete", idempotency_key="d", id=existing.id)])
+    assert bumps == [1]
+
+    batch_crud.apply_expense_batch(db, user_id=1, operations=[operation(op="delete", idempotency_key="d2", id=existing.id + 1)])
+    assert bumps == [1, 1]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+The lean list read path: Core row tuples encoded by app.fast_json give the same
+JSON as ORM instances serialized through the response models, with and without
+orjson.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from pydantic import TypeAdapter
+
+from app import crud, fast_json, models, schemas
+
+
+def add_rows(db):
+    db.add_all([
+        models.Expense(amount=12.5, category="Food", description="Pizza at Luigi's", date=datetime(2026, 3, 1, 12, 30), user_id=1),
+        models.Expense(amount=3.0, category="Transport", description="Bus ticket", date=datetime(2026, 3, 2, 8, 0, 0, 125000), user_id=1),
+        models.Income(amount=100, category="Salary", description=None, income_date=datetime(2026, 3, 1), user_id=1),
+        models.Income(amount=20, category="Gift", description="Café voucher", income_date=datetime(2026, 3, 5), user_id=1),
+    ])
+    db.commit()
+
+
+def model_json(schema, objects) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    content = adapter.dump_python(adapter.validate_python(objects), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def test_rows_match_the_response_models(db):
+    add_rows(db)
+    cases = [
+        (schemas.Expense, crud.get_expenses_for_user(db, 1), crud.get_expense_rows_for_user(db, 1)),
+        (schemas.Expense, crud.get_expenses_for_user(db, 1, search="pizza"), crud.get_expense_rows_for_user(db, 1, search="pizza")),
+        (schemas.Expense, crud.get_expenses_for_user(db, 1, skip=1, limit=1), crud.get_expense_rows_for_user(db, 1, skip=1, limit=1)),
+        (schemas.Income, crud.get_incomes_for_user(db, 1), crud.get_income_rows_for_user(db, 1)),
+    ]
+    for schema, objects, rows in cases:
+        expected = model_json(schema, objects)
+        assert fast_json.dumps_rows(rows) == expected
+        available, fast_json.ORJSON_AVAILABLE = fast_json.ORJSON_AVAILABLE, False
+        try:
+            assert fast_json.dumps_rows(rows) == expected
+        finally:
+            fast_json.ORJSON_AVAILABLE = available
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
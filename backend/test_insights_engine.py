@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Background insights: documents computed from monthly summaries and grouped
+category totals, recomputed for users marked dirty by writes, and read back
+with their freshness.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import insights_engine, models
+from app.insights_engine import MAX_REFRESH_ATTEMPTS, InsightsEngine, compute_insights
+
+
+def test_compute_insights(session_factory):
+    now = datetime(2026, 3, 10, 12, 0)
+    with session_factory() as db:
+        db.add_all([
+            models.Expense(amount=90, category="Food", description="groceries", date=datetime(2026, 3, 2), user_id=1),
+            models.Expense(amount=30, category="Transport", description="train", date=datetime(2026, 3, 5), user_id=1),
+            models.Expense(amount=200, category="Food", description="groceries", date=datetime(2026, 2, 10), user_id=1),
+            models.Budget(category="Food", amount=100, year=2026, month=3, user_id=1),
+            models.MonthlySummary(year=2026, month=3, total_income=0, total_expenses=120, user_id=1),
+            models.MonthlySummary(year=2026, month=2, total_income=0, total_expenses=200, user_id=1),
+        ])
+        db.commit()
+
+        document = compute_insights(db, 1, now=now)
+    assert document["category_analysis"] == {"current": {"Food": 90, "Transport": 30}, "previous": {"Food": 200}}
+    assert (document["current_month_total"], document["previous_month_total"]) == (120, 200)
+    assert [insight["title"] for insight in document["insights"]] == [
+        "Next Month Forecast", "Budget Alert", "Top Spending Category", "Great Savings!"
+    ]
+    assert "21 days left" in document["insights"][1]["message"]
+    assert document["generated_at"] == now.isoformat()
+
+
+def test_dirty_users_are_recomputed_and_stored(session_factory):
+    engine = InsightsEngine(session_factory=session_factory)
+
+    with session_factory() as db:
+        first = engine.get(db, 1)
+        assert first["insights"] == [] and first["stale"] is False
+        db.add(models.Expense(amount=40, category="Food", description="lunch", date=datetime.now(), user_id=1))
+        db.commit()
+
+        # Until the worker runs the stored document is served, flagged as stale
+        engine._dirty[1] = 1
+        assert engine.get(db, 1)["stale"] is True
+        assert engine.get(db, 1)["generated_at"] == first["generated_at"]
+
+        engine.flush()
+        refreshed = engine.get(db, 1)
+        assert refreshed["stale"] is False
+        assert refreshed["category_analysis"]["current"] == {"Food": 40}
+        assert db.query(models.InsightDocument).count() == 1
+
+        # A document from an earlier day is recomputed on read
+        row = db.query(models.InsightDocument).one()
+        row.computed_at -= timedelta(days=1)
+        row.document = json.dumps({**json.loads(row.document), "current_month_total": -1})
+        db.commit()
+        assert engine.get(db, 1)["current_month_total"] != -1
+    assert engine.recomputed == 3
+
+
+def test_mark_made_during_a_refresh_is_kept(session_factory):
+    engine = InsightsEngine(session_factory=session_factory)
+    engine._dirty[1] = 1
+    refresh = engine.refresh
+
+    def refresh_with_concurrent_write(db, user_id):
+        engine._dirty[user_id] += 1
+        return refresh(db, user_id)
+
+    engine.refresh = refresh_with_concurrent_write
+    engine.flush()
+    assert engine.is_dirty(1)
+
+
+def test_failing_refresh_is_given_up_after_a_few_attempts(session_factory):
+    engine = InsightsEngine(session_factory=session_factory)
+    engine._dirty[1] = 1
+
+    def failing_refresh(db, user_id):
+        raise RuntimeError("database unavailable")
+
+    engine.refresh = failing_refresh
+    for _ in range(MAX_REFRESH_ATTEMPTS - 1):
+        engine.flush()
+        assert engine.is_dirty(1)
+    engine.flush()
+    assert not engine.is_dirty(1)
+    assert engine.errors == MAX_REFRESH_ATTEMPTS
+
+
+
+def test_failed_refresh_is_retried_without_another_write(session_factory, monkeypatch):
+    monkeypatch.setattr(insights_engine, "REFRESH_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(insights_engine, "REFRESH_RETRY_SECONDS", 0.05)
+    engine = InsightsEngine(session_factory=session_factory)
+    refresh = engine.refresh
+    attempts = []
+
+    def fails_once(db, user_id):
+        attempts.append(user_id)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        return refresh(db, user_id)
+
+    engine.refresh = fails_once
+    engine.mark_dirty(1)
+    deadline = time.monotonic() + 5
+    while engine.is_dirty(1) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not engine.is_dirty(1)
+    assert (len(attempts), engine.errors, engine.recomputed) == (2, 1, 1)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Password hashing pool and login throttling: the pool's queue bound, rehashing
+when BCRYPT_ROUNDS changes, and per-IP / per-account attempt limits.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import Request
+from passlib.context import CryptContext
+
+from app import security
+from app.login_throttle import LoginThrottle, _FixedWindowCounter, client_ip
+from app.password_hashing import HasherBusy, PasswordHasher
+
+
+def test_hashes_are_upgraded_when_the_cost_changes():
+    hasher = PasswordHasher(workers=1, max_queue=4)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret1")
+
+    valid, new_hash = asyncio.run(hasher.verify_and_update("secret1", old_hash))
+    assert valid and new_hash.startswith(f"$2b${security.BCRYPT_ROUNDS:02d}$")
+    assert asyncio.run(hasher.verify_and_update("secret1", new_hash)) == (True, None)
+    assert asyncio.run(hasher.verify_and_update("wrong", old_hash)) == (False, None)
+    assert hasher.get_stats()["hashes_upgraded"] == 1
+
+
+def test_queue_is_bounded():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    async def burst():
+        return await asyncio.gather(*(hasher._submit(time.sleep, 0.05) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, HasherBusy) for result in results) == 1
+    stats = hasher.get_stats()
+    assert (stats["completed"], stats["rejected"], stats["peak_pending"]) == (2, 1, 2)
+    assert stats["queue_wait_ms"]["max"] >= 40
+
+
+def test_login_throttling():
+    throttle = LoginThrottle()
+    throttle.by_ip = _FixedWindowCounter(limit=3, window=60)
+    throttle.by_account = _FixedWindowCounter(limit=2, window=60)
+
+    # Failures lock the account for the IP they came from; success clears them
+    assert throttle.check("a@example.com", "10.0.0.1") == 0
+    throttle.failed("a@example.com", "10.0.0.1")
+    throttle.succeeded("a@example.com", "10.0.0.1")
+    for _ in range(2):
+        assert throttle.check("A@example.com", "10.0.0.2") == 0
+        throttle.failed("A@example.com", "10.0.0.2")
+    assert throttle.check("a@example.com", "10.0.0.2") > 0
+    # The owner, from another address, can still sign in
+    assert throttle.check("a@example.com", "10.0.0.3") == 0
+
+    # Every attempt counts against the IP, across accounts
+    assert throttle.check("b@example.com", "10.0.0.1") == 0
+    assert throttle.check("c@example.com", "10.0.0.1") == 0
+    assert 0 < throttle.check("d@example.com", "10.0.0.1") <= 60
+    assert throttle.get_stats()["rejected"] == {"ip": 1, "account": 1, "account_all_ips": 0}
+
+
+def test_guesses_spread_over_ips_hit_the_account_ceiling():
+    throttle = LoginThrottle()
+    throttle.by_account = _FixedWindowCounter(limit=2, window=60)
+    throttle.by_account_all_ips = _FixedWindowCounter(limit=5, window=60)
+
+    for i in range(5):
+        ip = f"10.0.1.{i}"
+        assert throttle.check("a@example.com", ip) == 0
+        throttle.failed("a@example.com", ip)
+    # A fresh address is still refused, and a login elsewhere does not lift it
+    throttle.succeeded("a@example.com", "10.0.1.0")
+    assert 0 < throttle.check("A@example.com", "10.0.2.1") <= 60
+    assert throttle.check("b@example.com", "10.0.2.1") == 0
+    assert throttle.get_stats()["rejected"]["account_all_ips"] == 1
+
+
+def test_client_ip_trusts_only_configured_proxies():
+    def request(peer, forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+    proxies = frozenset({"10.0.0.1"})
+    assert client_ip(request("203.0.113.9", "1.2.3.4"), proxies) == "203.0.113.9"
+    assert client_ip(request("10.0.0.1", "1.2.3.4"), proxies) == "1.2.3.4"
+    # The left-most entries are whatever the client sent
+    assert client_ip(request("10.0.0.1", "6.6.6.6, 1.2.3.4"), proxies) == "1.2.3.4"
+    assert client_ip(request("10.0.0.1"), proxies) == "10.0.0.1"
+
+
+if __name__ == "__main__":
+    test_hashes_are_upgraded_when_the_cost_changes()
+    test_queue_is_bounded()
+    test_login_throttling()
+    test_guesses_spread_over_ips_hit_the_account_ceiling()
+    test_client_ip_trusts_only_configured_proxies()
+    print("Password hashing controls work")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Connection pool settings and telemetry: per-dialect defaults, and the counters
+kept by InstrumentedQueuePool for overflow, timeouts and invalidations.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import config, database
+from app.pool_metrics import InstrumentedQueuePool, instrument_engine
+
+
+def test_mysql_defaults():
+    options = database.engine_options("mysql+pymysql://user:secret@db/expenses")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_pre_ping"] is True
+    assert options["pool_recycle"] < 8 * 3600
+    assert database.engine_options("sqlite:///expenses.db") == {"poolclass": InstrumentedQueuePool}
+    assert database.engine_options("sqlite://") == {}
+
+
+def test_pool_events_are_counted():
+    path = Path(tempfile.mkdtemp()) / "pool.db"
+    engine = create_engine(f"sqlite:///{path}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.1)
+    metrics = instrument_engine(engine)
+
+    first, second = engine.connect(), engine.connect()
+    try:
+        engine.connect()
+        assert False, "expected a pool timeout"
+    except exc.TimeoutError:
+        pass
+    first.invalidate()
+    first.close()
+    second.close()
+    engine.dispose()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    stats = metrics.get_stats(engine.pool)
+    assert (stats["checkouts"], stats["timeouts"], stats["invalidations"]) == (3, 1, 1)
+    assert (stats["overflow_checkouts"], stats["peak_overflow"]) == (1, 1)
+    assert stats["checkout_wait_ms"]["max"] >= 0
+    assert stats["pool"]["checked_out"] == 0
+
+
+def test_metrics_need_the_token(client, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_TOKEN", None)
+    assert client.get("/metrics/db-pool").status_code == 404
+
+    monkeypatch.setattr(config, "METRICS_TOKEN", "s3cret")
+    for path in ("/metrics/db-pool", "/metrics/response-cache", "/metrics/password-hashing"):
+        assert client.get(path).status_code == 403
+        # A signed-in user is not enough
+        assert client.get(path, headers={"Authorization": "Bearer 1", "X-Metrics-Token": "guess"}).status_code == 403
+        assert client.get(path, headers={"X-Metrics-Token": "s3cret"}).status_code == 200
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Transcripts made on the device: /process-text-dry-run/ previews and /process-text/
+saves, with only classification and amount extraction run on the server.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import models
+
+USER_1 = {"Authorization": "Bearer 1"}
+
+
+def test_process_text_saves_the_expense(client, ai_processor, db):
+    response = client.post("/process-text/", json={"text": " Lunch with Sam 12.50 "}, headers=USER_1)
+    assert response.status_code == 200
+    expense = response.json()
+    assert (expense["description"], expense["category"], expense["amount"]) == ("Lunch with Sam 12.50", "Food & Drinks", 12.5)
+    assert [(e.user_id, e.amount) for e in db.query(models.Expense)] == [(1, 12.5)]
+
+    # The phrase is now in the user's history: answered without the classifier
+    ai_processor.classified.clear()
+    assert client.post("/process-text/", json={"text": "lunch with sam 9"}, headers=USER_1).json()["category"] == "Food & Drinks"
+    assert ai_processor.classified == []
+
+
+def test_process_text_rejects_bad_input(client, db):
+    assert client.post("/process-text/", json={"text": "lunch 5"}).status_code == 401
+    assert client.post("/process-text/", json={"text": "   "}, headers=USER_1).status_code == 400
+    response = client.post("/process-text/", json={"text": "lunch with Sam"}, headers=USER_1)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Could not find an amount in the text"
+    assert db.query(models.Expense).count() == 0
+
+
+def test_dry_run_does_not_save(client, db):
+    response = client.post("/process-text-dry-run/", json={"text": "taxi 30"})
+    assert response.status_code == 200
+    assert response.json() == {"description": "taxi 30", "category": "Other", "amount": 30.0, "result_token": None}
+    assert db.query(models.Expense).count() == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Guards the month/range and search queries against full scans.
+
+Runs the real CRUD functions against an in-memory SQLite database, captures the
+SQL they send and checks EXPLAIN QUERY PLAN for the (user_id, date) indexes.
+"""
+
+import os
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, summary_crud, text_search
+from app.pagination import encode_cursor, encode_transaction_cursor
+
+EXPENSE_INDEX = "ix_expenses_user_id_date"
+INCOME_INDEX = "ix_incomes_user_id_income_date"
+SUMMARY_INDEX = "uq_monthly_summaries_user_year_month"
+
+
+def capture_selects(engine, fn):
+    """Runs fn() and returns the (sql, params) of every SELECT it issued."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def query_plan(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def assert_uses_index(engine, statements, table, index_name):
+    plans = [query_plan(engine, sql, params) for sql, params in statements if f"FROM {table}" in sql]
+    assert plans, f"no query against {table} was captured"
+    for plan in plans:
+        print(f"   {table}: {plan}")
+        assert index_name in plan, f"expected {index_name} in plan: {plan}"
+        assert f"SCAN {table}" not in plan, f"full scan of {table}: {plan}"
+
+
+def test_expenses_by_month_uses_index(engine, db):
+    statements = capture_selects(engine, lambda: crud.get_expenses_by_month(db, user_id=1, year=2025, month=3))
+    assert_uses_index(engine, statements, "expenses", EXPENSE_INDEX)
+
+
+def test_monthly_summary_is_single_indexed_lookup(engine, db):
+    statements = capture_selects(engine, lambda: summary_crud.get_monthly_summary(db, user_id=1, year=2025, month=3))
+    assert len(statements) == 1
+    assert_uses_index(engine, statements, "monthly_summaries", SUMMARY_INDEX)
+
+
+def test_historical_summary_is_two_grouped_queries(engine, db):
+    for months in (1, 24):
+        statements = capture_selects(engine, lambda: summary_crud.get_historical_summary(db, user_id=1, months=months))
+        assert len(statements) == 2, f"{len(statements)} queries for months={months}"
+    assert_uses_index(engine, statements, "expenses", EXPENSE_INDEX)
+    assert_uses_index(engine, statements, "incomes", INCOME_INDEX)
+
+
+def test_search_uses_fts_and_ranks(engine, db):
+    for description in ("pizza hut dinner", "uber ride", "pizza pizza pizza", "pizzeria"):
+        db.add(models.Expense(amount=1.0, category="Food", description=description, date=datetime(2025, 3, 1), user_id=1))
+    db.commit()
+
+    statements = capture_selects(engine, lambda: crud.get_expenses_for_user(db, user_id=1, search="pizz"))
+    plan = query_plan(engine, *statements[-1])
+    print(f"   search: {plan}")
+    assert "expenses_fts VIRTUAL TABLE" in plan, f"search does not use the FTS index: {plan}"
+
+    results = [e.description for e in crud.get_expenses_for_user(db, user_id=1, search="pizz")]
+    assert results[0] == "pizza pizza pizza"
+    assert set(results) == {"pizza hut dinner", "pizza pizza pizza", "pizzeria"}
+    assert [e.description for e in crud.get_expenses_for_user(db, user_id=1, search="piz din")] == ["pizza hut dinner"]
+
+
+def test_search_falls_back_to_like_without_trigram_support(db, make_engine):
+    assert crud.get_expenses_for_user(db, user_id=1, search="pizza") == []
+
+    # As on SQLite < 3.34: no FTS tables, and a second in-memory engine must not
+    # reuse what was found for the first
+    text_search.SQLITE_TRIGRAM_AVAILABLE = False
+    try:
+        like_db = sessionmaker(bind=make_engine())()
+        tables = {name for name, in like_db.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+        assert "expenses_fts" not in tables
+        text_search.SQLITE_TRIGRAM_AVAILABLE = True
+        like_db.add(models.Expense(amount=1.0, category="Food", description="Lunch at KFC", date=datetime(2025, 3, 1), user_id=1))
+        like_db.commit()
+        assert [e.description for e in crud.get_expenses_for_user(like_db, user_id=1, search="lunch at")] == ["Lunch at KFC"]
+    finally:
+        text_search.SQLITE_TRIGRAM_AVAILABLE = True
+
+
+def test_transactions_union_uses_both_indexes(engine, db):
+    cursor = encode_transaction_cursor(datetime(2025, 3, 1), "expense", 500)
+    statements = capture_selects(engine, lambda: crud.get_transactions_page(
+        db, user_id=1, limit=50, cursor=cursor, start_date=date(2024, 1, 1), category="Food"
+    ))
+    assert len(statements) == 1
+    plan = query_plan(engine, *statements[0])
+    print(f"   transactions: {plan}")
+    assert EXPENSE_INDEX in plan and INCOME_INDEX in plan, f"expected both indexes in plan: {plan}"
+    assert "SCAN expenses" not in plan and "SCAN incomes" not in plan, f"full scan: {plan}"
+
+
+def test_keyset_page_uses_index_without_sort(engine, db):
+    cursor = encode_cursor(datetime(2025, 3, 1), 500)
+    statements = capture_selects(engine, lambda: crud.get_expenses_page(db, user_id=1, limit=50, cursor=cursor))
+    assert_uses_index(engine, statements, "expenses", EXPENSE_INDEX)
+    plan = query_plan(engine, *statements[0])
+    assert "TEMP B-TREE" not in plan, f"page is sorted in memory: {plan}"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-s"]))
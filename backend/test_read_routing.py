@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Read-replica routing with two SQLite files: reads go to the replica, users who
+just wrote are pinned to the primary, and a lagging replica is bypassed.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models, read_routing
+from app.database import Base
+
+
+def with_replica(test):
+    """Runs test(replica_sessionmaker) with a second SQLite file configured as the replica."""
+    replica_engine = create_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / 'replica.db'}")
+    Base.metadata.create_all(replica_engine)
+    saved = (database.replica_engine, database.ReadSessionLocal, read_routing.replica_monitor)
+    database.replica_engine = replica_engine
+    database.ReadSessionLocal = sessionmaker(bind=replica_engine)
+    read_routing.replica_monitor = read_routing.ReplicaMonitor(replica_engine, max_lag=5, interval=0)
+    try:
+        test(database.ReadSessionLocal)
+    finally:
+        database.replica_engine, database.ReadSessionLocal, read_routing.replica_monitor = saved
+        replica_engine.dispose()
+
+
+def test_reads_use_primary_without_replica():
+    assert read_routing.read_sessionmaker(1) is database.SessionLocal
+
+
+def test_reads_go_to_replica():
+    def check(replica):
+        assert read_routing.read_sessionmaker(101) is replica
+        assert read_routing.replica_monitor.get_stats()["routed"]["replica"] == 1
+    with_replica(check)
+
+
+def test_writer_is_pinned_to_primary():
+    def check(replica):
+        Base.metadata.create_all(database.engine)
+        db = database.SessionLocal()
+        db.info["user_id"] = 102
+        db.add(models.User(id=102, email="pinned@example.com", hashed_password="x"))
+        db.commit()
+        db.close()
+
+        assert read_routing.read_sessionmaker(102) is database.SessionLocal
+        assert read_routing.read_sessionmaker(103) is replica
+    with_replica(check)
+
+
+def test_lagging_replica_is_bypassed():
+    def check(replica):
+        read_routing.replica_monitor.max_lag = -1  # any measured lag is too much
+        assert read_routing.read_sessionmaker(104) is database.SessionLocal
+        assert read_routing.replica_monitor.get_stats()["routed"]["primary_lagging"] == 1
+    with_replica(check)
+
+
+
+def test_failed_lag_check_does_not_expose_the_driver_message():
+    def unreachable(connection):
+        raise RuntimeError("could not connect to replica-db.internal:3306 as app_user")
+
+    saved = read_routing.replica_lag_seconds
+    read_routing.replica_lag_seconds = unreachable
+    try:
+        monitor = read_routing.ReplicaMonitor(create_engine("sqlite://"), interval=0)
+        assert not monitor.healthy()
+        assert monitor.get_stats()["error"] == "RuntimeError"
+    finally:
+        read_routing.replica_lag_seconds = saved
+
+
+if __name__ == "__main__":
+    test_reads_use_primary_without_replica()
+    test_reads_go_to_replica()
+    test_writer_is_pinned_to_primary()
+    test_lagging_replica_is_bypassed()
+    test_failed_lag_check_does_not_expose_the_driver_message()
+    print("Read routing works")
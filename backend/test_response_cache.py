@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Per-user response cache: hits for repeat lookups, exact invalidation when a
+user's data version is bumped by a write, pluggable storage, and the ETags
+derived from the same version.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import budget_crud, crud, schemas
+from app.response_cache import ResponseCache, etag_matches, response_cache
+
+
+class DictStorage:
+    """Stand-in for an external store: no TTL, no eviction."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+    def pop(self, key, default=None):
+        return self.data.pop(key, default)
+
+
+def test_versions_invalidate_exactly():
+    cache = ResponseCache(storage=DictStorage(), versions=DictStorage())
+    key, value = cache.lookup(1, "summary.month", year=2026, month=1)
+    assert value is None
+    cache.store(key, {"total": 10})
+    assert cache.lookup(1, "summary.month", month=1, year=2026)[1] == {"total": 10}
+    assert cache.lookup(1, "summary.month", year=2026, month=2)[1] is None
+    assert cache.lookup(2, "summary.month", year=2026, month=1)[1] is None
+
+    # Another user's write leaves this user's entries alone
+    cache.bump(2)
+    assert cache.lookup(1, "summary.month", year=2026, month=1)[1] == {"total": 10}
+
+    # A write committed while a miss is being computed: the result is not served
+    key, _ = cache.lookup(1, "summary.balance")
+    cache.bump(1)
+    cache.store(key, {"total_balance": 0})
+    assert cache.lookup(1, "summary.balance")[1] is None
+    assert cache.lookup(1, "summary.month", year=2026, month=1)[1] is None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["invalidations"]) == (2, 2)
+
+
+def test_forgotten_version_is_not_reused():
+    versions = DictStorage()
+    cache = ResponseCache(storage=DictStorage(), versions=versions)
+    key, _ = cache.lookup(1, "analytics.stats")
+    cache.store(key, {"count": 1})
+    versions.data.clear()
+    assert cache.lookup(1, "analytics.stats")[1] is None
+
+
+def test_etags_follow_the_version():
+    cache = ResponseCache(storage=DictStorage(), versions=DictStorage())
+    etag = cache.etag(1, "/expenses/", query=[("limit", "100")])
+    assert etag.startswith('W/"')
+    assert cache.etag(1, "/expenses/", query=[("limit", "100")]) == etag
+    assert cache.etag(1, "/expenses/", query=[("limit", "5")]) != etag
+    assert cache.etag(2, "/expenses/", query=[("limit", "100")]) != etag
+    cache.bump(1)
+    assert cache.etag(1, "/expenses/", query=[("limit", "100")]) != etag
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"abc", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abc"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_crud_writes_bump_the_version(db):
+    version = response_cache.version(1)
+    expense = crud.create_expense_for_user(db, schemas.ExpenseCreate(amount=5, category="Food", description="tea"), 1)
+    assert response_cache.version(1) != version
+
+    version = response_cache.version(1)
+    crud.delete_expense_for_user(db, expense.id, 1)
+    assert response_cache.version(1) != version
+
+    version = response_cache.version(1)
+    budget_crud.create_or_update_budget(db, schemas.BudgetCreate(category="Food", amount=50, year=2026, month=1), 1)
+    assert response_cache.version(1) != version
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
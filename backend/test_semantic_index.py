@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Semantic index over expense descriptions: queued writes and deletes, search,
+backfill on first search, dropping a user, and the index switching itself off
+when no embedding model is installed. Uses a bag-of-words embedder in place of
+MiniLM.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pytest
+
+from app import models
+from app.semantic_index import SemanticIndex
+
+VOCABULARY = ["pizza", "burger", "food", "bus", "taxi", "transport", "rent", "flat"]
+# Words that mean the same thing share a dimension
+SYNONYMS = {"food": "pizza", "burger": "pizza", "transport": "bus", "taxi": "bus", "flat": "rent"}
+
+
+def embed(texts):
+    vectors = np.zeros((len(texts), len(VOCABULARY)), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            word = SYNONYMS.get(word, word)
+            if word in VOCABULARY:
+                vectors[row, VOCABULARY.index(word)] += 1
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+@pytest.fixture
+def db(db):
+    # Three expenses of user 1 to backfill from
+    db.add_all([
+        models.Expense(id=1, amount=12, category="Food", description="pizza delivery", user_id=1),
+        models.Expense(id=2, amount=3, category="Transport", description="bus ticket", user_id=1),
+        models.Expense(id=3, amount=500, category="Rent", description="rent for the flat", user_id=1),
+    ])
+    db.commit()
+    return db
+
+
+def test_backfill_search_and_queued_writes(db):
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = SemanticIndex(index_dir=index_dir, embedder=embed)
+
+        # No index yet: the write is skipped, the first search embeds the history
+        index._apply([("add", 1, 1, "pizza delivery")])
+        assert index._get_user(1, create=False) is None
+        assert [expense_id for expense_id, _ in index.search(db, 1, "food", k=1)] == [1]
+        assert (Path(index_dir) / "user_1.npz").exists()
+
+        index._apply([("add", 1, 4, "taxi to airport"), ("delete", 1, 1, None)])
+        assert {expense_id for expense_id, _ in index.search(db, 1, "transport", k=2)} == {2, 4}
+        assert 1 not in [expense_id for expense_id, _ in index.search(db, 1, "food", k=10)]
+
+        # A fresh instance loads what was flushed to disk
+        index.flush()
+        reloaded = SemanticIndex(index_dir=index_dir, embedder=embed)
+        assert sorted(reloaded._get_user(1, create=False).position) == [2, 3, 4]
+
+        index.drop_user(1)
+        assert not (Path(index_dir) / "user_1.npz").exists()
+        assert index._get_user(1, create=False) is None
+
+
+def test_write_racing_the_backfill_is_kept(db):
+    with tempfile.TemporaryDirectory() as index_dir:
+        embedding = threading.Event()
+        release = threading.Event()
+
+        def slow_embed(texts):
+            if len(texts) > 1:  # the backfill
+                embedding.set()
+                release.wait(5)
+            return embed(texts)
+
+        index = SemanticIndex(index_dir=index_dir, embedder=slow_embed)
+        search = threading.Thread(target=index.backfill, args=(db, 1))
+        search.start()
+        assert embedding.wait(5)
+
+        # Committed after the backfill's query: applied once the backfill is done
+        writer = threading.Thread(target=index._apply, args=([("add", 1, 9, "burger")],))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()  # waiting on the user's lock, not skipped
+        release.set()
+        search.join(5)
+        writer.join(5)
+        assert sorted(index._get_user(1, create=False).position) == [1, 2, 3, 9]
+
+
+def test_missing_model_disables_the_index(db):
+    def no_model(texts):
+        raise ImportError("No module named 'torch'")
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = SemanticIndex(index_dir=index_dir, embedder=no_model)
+        assert index.available
+        try:
+            index.search(db, 1, "food")
+        except ImportError:
+            pass
+        else:
+            raise AssertionError("search should fail without a model")
+        assert not index.available
+
+        # Nothing is queued once disabled
+        index.enqueue(1, 5, "pizza")
+        index.enqueue_delete(1, 5)
+        assert index._queue.empty() and index._worker is None
+
+
+
+def test_user_without_descriptions_is_backfilled_once(db):
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = SemanticIndex(index_dir=index_dir, embedder=embed)
+        backfill = index.backfill
+        queries = []
+
+        def counting_backfill(db, user_id):
+            queries.append(user_id)
+            backfill(db, user_id)
+
+        index.backfill = counting_backfill
+
+        assert index.search(db, 2, "food") == []
+        assert index.search(db, 2, "food") == []
+        assert queries == [2]
+
+        # The empty index takes the user's next writes
+        index._apply([("add", 2, 7, "burger")])
+        assert [expense_id for expense_id, _ in index.search(db, 2, "food")] == [7]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
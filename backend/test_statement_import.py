@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Bank statement import: CSV/OFX parsing, debit/credit signs, batched classification
+and the monthly totals written alongside the bulk inserts.
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import models, statement_import, summary_crud
+
+CSV_STATEMENT = """Date,Description,Amount,Category
+2025-01-03,"Coffee, large",-4.50,
+2025-01-04,Salary January,"2,500.00",Salary
+2025-01-05,Train ticket,(12.00),
+2025-01-06,Refund,0,
+not a date,Broken row,-1,
+2025-02-01,Cinema,15.00 DR,Entertainment
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250105120000[-5:EST]<TRNAMT>-42.10<NAME>GROCERY MART<MEMO>card 1234
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20250106
+<TRNAMT>1500.00
+<NAME>PAYROLL
+</STMTTRN>
+</BANKTRANLIST></OFX>
+"""
+
+
+def test_csv_import(db):
+    batches = []
+
+    def classify(texts):
+        batches.append(list(texts))
+        return ["Transport" if "train" in text.lower() else "Food & Drinks" for text in texts]
+
+    result = statement_import.import_statement(
+        db, 1, statement_import.parse_csv(CSV_STATEMENT.splitlines(keepends=True)), classify=classify
+    )
+
+    assert (result["expenses"], result["incomes"], result["skipped"]) == (3, 1, 2)
+    assert batches == [["Coffee, large", "Train ticket"]]
+    expenses = {e.description: (e.amount, e.category) for e in db.query(models.Expense)}
+    assert expenses == {
+        "Coffee, large": (4.5, "Food & Drinks"),
+        "Train ticket": (12.0, "Transport"),
+        "Cinema": (15.0, "Entertainment"),
+    }
+    income = db.query(models.Income).one()
+    assert (income.amount, income.category) == (2500.0, "Salary")
+
+    january = summary_crud.get_monthly_summary(db, user_id=1, year=2025, month=1)
+    assert (january.total_income, january.total_expenses) == (2500.0, 16.5)
+
+
+def test_ofx_import(db):
+    records = list(statement_import.parse_ofx(OFX_STATEMENT.splitlines(keepends=True)))
+    assert records[0][1] == (datetime(2025, 1, 5, 12, 0), "GROCERY MART card 1234", -42.10, None)
+    assert records[1][1] == (datetime(2025, 1, 6), "PAYROLL", 1500.0, None)
+
+    result = statement_import.import_statement(db, 1, records)
+    assert (result["expenses"], result["incomes"]) == (1, 1)
+    assert db.query(models.Expense).one().category == statement_import.DEFAULT_CATEGORY
+
+
+def test_debit_credit_columns():
+    lines = ["Posted Date,Payee,Debit,Credit\n", "05/01/2025,Shop,10.00,\n", "06/01/2025,Employer,,900\n"]
+    amounts = [record[2] for _, record in statement_import.parse_csv(lines)]
+    assert amounts == [-10.0, 900.0]
+
+
+def test_malformed_csv_is_a_value_error():
+    lines = ["Date,Description,Amount\n", "2025-01-03,Coffee,-4.50\n", "2025-01-04,\"" + "x" * 200000 + "\",-1\n"]
+    try:
+        list(statement_import.parse_csv(lines))
+    except ValueError as e:
+        assert "line" in str(e)
+    else:
+        raise AssertionError("an oversized field should be rejected")
+
+
+
+def test_missing_description_is_left_blank(db):
+    lines = ["Date,Description,Amount\n", "2025-01-03,,-4.50\n"]
+    classified = []
+
+    def classify(texts):
+        classified.extend(texts)
+        return ["Food & Drinks"] * len(texts)
+
+    result = statement_import.import_statement(db, 1, statement_import.parse_csv(lines), classify=classify)
+    assert result["expenses"] == 1
+    expense = db.query(models.Expense).one()
+    assert (expense.description, expense.category) == ("", statement_import.DEFAULT_CATEGORY)
+    assert classified == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Batch voice uploads: clips sent as several files or one .zip are saved in one
+go with a status each, and the clip count and size limits are enforced before
+anything is decompressed or run through the models.
+"""
+
+import io
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from app import config, models
+
+USER_1 = {"Authorization": "Bearer 1"}
+
+
+def zip_of(clips):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in clips.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def upload(client, files):
+    return client.post("/process-voice-batch/", files=[("files", file) for file in files], headers=USER_1)
+
+
+def test_files_and_zip_are_processed(client, db):
+    response = upload(client, [("a.m4a", b"lunch 12"), ("b.m4a", b""), ("c.m4a", b"no amount")])
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (1, 2)
+    assert [(item["filename"], item["status"]) for item in result["items"]] == [
+        ("a.m4a", "created"), ("b.m4a", "failed"), ("c.m4a", "failed")
+    ]
+
+    archive = zip_of({"notes/taxi.wav": b"taxi 30", "notes/readme.txt": b"not audio 5", "notes/": b""})
+    result = upload(client, [("notes.zip", archive)]).json()
+    assert [(item["filename"], item["status"]) for item in result["items"]] == [("taxi.wav", "created")]
+    assert sorted(e.amount for e in db.query(models.Expense)) == [12.0, 30.0]
+
+
+def test_clip_count_is_limited(client, monkeypatch, db):
+    from app import main  # after the client fixture stubbed the AI pipeline
+
+    monkeypatch.setattr(main, "MAX_BATCH_CLIPS", 2)
+    assert upload(client, [("a.m4a", b"lunch 1"), ("b.m4a", b"lunch 2")]).status_code == 200
+    assert upload(client, [("a.m4a", b"lunch 1"), ("b.m4a", b"lunch 2"), ("c.m4a", b"lunch 3")]).status_code == 400
+    archive = zip_of({"a.wav": b"lunch 1", "b.wav": b"lunch 2", "c.wav": b"lunch 3"})
+    assert upload(client, [("notes.zip", archive)]).status_code == 400
+    assert db.query(models.Expense).count() == 2
+
+
+def test_sizes_are_limited(client, monkeypatch, ai_processor, db):
+    monkeypatch.setattr(config, "VOICE_BATCH_MAX_CLIP_BYTES", 100)
+    monkeypatch.setattr(config, "VOICE_BATCH_MAX_TOTAL_BYTES", 150)
+
+    assert upload(client, [("big.m4a", b"lunch 1".ljust(101))]).status_code == 413
+    assert upload(client, [("a.m4a", b"lunch 1".ljust(80)), ("b.m4a", b"lunch 2".ljust(80))]).status_code == 413
+
+    # Highly compressible members are judged by their uncompressed size
+    archive = zip_of({"a.wav": b"lunch 1" + b" " * 10_000})
+    assert zipfile.ZipFile(io.BytesIO(archive)).infolist()[0].compress_size < 100
+    response = upload(client, [("notes.zip", archive)])
+    assert response.status_code == 413
+    assert ai_processor.classified == []
+    assert db.query(models.Expense).count() == 0
+
+
+def test_invalid_zip_is_rejected(client):
+    response = upload(client, [("notes.zip", b"not a zip")])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "notes.zip is not a valid zip archive"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))